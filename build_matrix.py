@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+Derleme matrisi ve nicemleme (quantization) taraması
+Her temel model × nicemleme düzeyi için ayrı bir shopify-gpt varyantı
+oluşturur (derleme önbelleği sayesinde değişmeyen varyantlar yeniden
+derlenmez), ardından değerlendirme paketini her varyantta çalıştırır.
+Kalite değerlendirmeleri RAM bütçesine sığan varyant grupları hâlinde paralel
+yürütülür; gecikme ise gruptaki diğer varyantlardan etkilenmesin diye ayrı
+bir geçişte, her varyant bellekte tek başınayken ve önbelleksiz ölçülür.
+Sonuç gecikme-kalite Pareto tablosudur: kalite eşiğini geçen en hızlı model
+önerilir.
+
+Örnek:
+  python build_matrix.py --bases llama3.2:3b-instruct-fp16 qwen2.5:3b-instruct-fp16 \\
+      --quants q4_K_M q5_K_M q8_0 --min-score 0.6
+"""
+
+import argparse
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+from model_residency import FOOTPRINT_OVERHEAD, default_memory_budget, format_size, parse_size
+from model_trainer import DEFAULT_EVAL_SUITE, ModelEvaluator, OllamaModelTrainer, load_test_suite
+from ollama_client import OllamaClient, OllamaError
+
+# Nicemleme yapılmadan temel ağırlıkların kullanıldığı düzey
+SOURCE_QUANT = "source"
+# Gecikme geçişinde varyant başına çalıştırılan vaka sayısı
+DEFAULT_BENCH_CASES = 8
+
+
+def variant_name(model_name, base_model, quantization):
+    """shopify-gpt + temel model + düzey → Ollama'da geçerli model adı"""
+    raw = f"{model_name}-{base_model}-{quantization}".lower()
+    return re.sub(r'[^a-z0-9._-]+', '-', raw).strip('-')
+
+
+class BuildMatrix:
+    """Temel model × nicemleme varyantlarını derle, değerlendir, karşılaştır"""
+
+    def __init__(self, base_models, quantizations, model_name="shopify-gpt", suite_path=None,
+                 budget_bytes=None, eval_workers=None, bench_cases=DEFAULT_BENCH_CASES,
+                 output_dir="model_training_data/evaluations"):
+        self.base_models = base_models
+        self.quantizations = quantizations
+        self.model_name = model_name
+        self.suite_path = suite_path
+        self.budget_bytes = budget_bytes or default_memory_budget()
+        self.eval_workers = eval_workers
+        self.bench_cases = bench_cases
+        self.output_dir = output_dir
+        self.modelfile_dir = "model_training_data/modelfiles"
+        self.client = OllamaClient()
+        self.variants = []
+
+    # Derleme
+
+    def build_variant(self, base_model, quantization):
+        """Varyantı derle (güncelse atla); varyant bilgisini döndür"""
+        trainer = OllamaModelTrainer()
+        trainer.model_name = variant_name(self.model_name, base_model, quantization)
+        trainer.base_model = base_model
+        trainer.quantization = None if quantization == SOURCE_QUANT else quantization
+        trainer.modelfile_path = os.path.join(self.modelfile_dir, f"Modelfile_{trainer.model_name}")
+        variant = {'model': trainer.model_name, 'base_model': base_model, 'quantization': quantization}
+
+        base_digest = trainer.get_model_digest(base_model)
+        if base_digest is None:
+            if not trainer.download_base_model(base_model):
+                return dict(variant, status='pull_failed')
+            base_digest = trainer.get_model_digest(base_model)
+
+        modelfile_content = trainer.render_modelfile(base_model)
+        build_key = trainer.build_key(modelfile_content, base_digest)
+        if os.getenv('FORCE_REBUILD') != '1' and trainer.is_build_current(build_key):
+            print(f"⏭️ {trainer.model_name} güncel, derleme atlandı")
+            return dict(variant, status='cached', build_key=build_key)
+
+        os.makedirs(self.modelfile_dir, exist_ok=True)
+        trainer.create_modelfile(base_model)
+        start = time.perf_counter()
+        if not trainer.fine_tune_with_ollama():
+            return dict(variant, status='build_failed')
+        build = trainer.record_build(build_key, modelfile_content, base_digest, time.perf_counter() - start)
+        return dict(variant, status='built', build_key=build_key, build_seconds=build['build_seconds'])
+
+    def build_all(self):
+        print(f"🔢 Derleme matrisi: {len(self.base_models)} temel model × {len(self.quantizations)} düzey")
+        # Derlemeler sıralı: 'ollama create' disk ve CPU'yu zaten doyurur
+        for base_model in self.base_models:
+            for quantization in self.quantizations:
+                variant = self.build_variant(base_model, quantization)
+                print(f"📦 {variant['model']}: {variant['status']}")
+                self.variants.append(variant)
+        return self.variants
+
+    # Değerlendirme
+
+    def attach_sizes(self):
+        try:
+            sizes = {model['name']: model.get('size', 0) for model in self.client.list_models()}
+        except OllamaError:
+            sizes = {}
+        for variant in self.variants:
+            variant['size'] = sizes.get(f"{variant['model']}:latest", sizes.get(variant['model'], 0))
+
+    def plan_waves(self, variants):
+        """Tahmini bellek ayak izleri bütçeye sığan varyant grupları"""
+        waves, current, used = [], [], 0
+        for variant in sorted(variants, key=lambda v: v['size'], reverse=True):
+            footprint = variant['size'] * FOOTPRINT_OVERHEAD
+            if current and used + footprint > self.budget_bytes:
+                waves.append(current)
+                current, used = [], 0
+            current.append(variant)
+            used += footprint
+        if current:
+            waves.append(current)
+        return waves
+
+    def evaluate_variant(self, variant):
+        evaluator = ModelEvaluator(model_name=variant['model'], suite_path=self.suite_path,
+                                   max_workers=self.eval_workers)
+        try:
+            evaluator.evaluate_model_performance()
+            variant['summary'] = evaluator.last_report['summary']
+        except Exception as e:
+            variant['error'] = str(e)
+            print(f"❌ Değerlendirme hatası {variant['model']}: {e}")
+
+    def benchmark_prompts(self):
+        """Gecikme geçişi için paketten eşit aralıklı istemler"""
+        prompts = [case['prompt'] for case in load_test_suite(self.suite_path or os.getenv('EVAL_SUITE', DEFAULT_EVAL_SUITE))]
+        step = max(1, len(prompts) // self.bench_cases)
+        return prompts[::step][:self.bench_cases]
+
+    def benchmark_variant(self, variant, prompts):
+        """Varyant bellekte tek başınayken sıralı ve önbelleksiz gecikme ölçümü"""
+        model = variant['model']
+        try:
+            # Yükleme süresi ölçüme katılmasın
+            self.client.generate(model, "Hello", options={'num_predict': 8})
+            latencies, speeds = [], []
+            for prompt in prompts:
+                start = time.perf_counter()
+                result = self.client.generate(model, prompt)
+                latencies.append(time.perf_counter() - start - result['load_seconds'])
+                if result['eval_seconds']:
+                    speeds.append(result.get('eval_count', 0) / result['eval_seconds'])
+            variant['benchmark'] = {
+                'cases': len(latencies),
+                'latency_p50': round(float(np.percentile(latencies, 50)), 3) if latencies else None,
+                'latency_p95': round(float(np.percentile(latencies, 95)), 3) if latencies else None,
+                'tokens_per_second': round(float(np.median(speeds)), 2) if speeds else None
+            }
+        except OllamaError as e:
+            variant['benchmark_error'] = str(e)
+            print(f"❌ Gecikme ölçümü hatası {model}: {e}")
+        finally:
+            try:
+                self.client.unload(model)
+            except OllamaError:
+                pass
+
+    def evaluate_all(self):
+        ready = [variant for variant in self.variants if variant['status'] in ('built', 'cached')]
+        self.attach_sizes()
+        waves = self.plan_waves(ready)
+        print(f"🧪 {len(ready)} varyant {len(waves)} grupta değerlendirilecek (bütçe {format_size(self.budget_bytes)})")
+
+        # Kalite: gruplar paralel (puan zamanlamadan bağımsızdır); grup gecikmeleri yalnızca bilgi amaçlı
+        for number, wave in enumerate(waves, 1):
+            print(f"🔄 Grup {number}: {', '.join(variant['model'] for variant in wave)}")
+            for variant in wave:
+                variant['wave'] = number
+                variant['wave_size'] = len(wave)
+            threads = [threading.Thread(target=self.evaluate_variant, args=(variant,)) for variant in wave]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            # Sonraki grup için bellek boşaltılır
+            for variant in wave:
+                try:
+                    self.client.unload(variant['model'])
+                except OllamaError:
+                    pass
+
+        # Gecikme: her varyant tek başına, böylece tablo satırları karşılaştırılabilir
+        prompts = self.benchmark_prompts()
+        print(f"⏱️ Gecikme geçişi: {len(ready)} varyant sırayla, varyant başına {len(prompts)} vaka")
+        for variant in ready:
+            self.benchmark_variant(variant, prompts)
+
+    # Rapor
+
+    @staticmethod
+    def pareto_front(rows):
+        """Daha hızlı ve en az aynı kalitede başka bir varyantı olmayanlar"""
+        front = []
+        for row in rows:
+            dominated = any(
+                other is not row
+                and other['latency_p50'] <= row['latency_p50'] and other['avg_score'] >= row['avg_score']
+                and (other['latency_p50'] < row['latency_p50'] or other['avg_score'] > row['avg_score'])
+                for other in rows
+            )
+            if not dominated:
+                front.append(row['model'])
+        return front
+
+    def report(self, min_score=None):
+        rows = []
+        for variant in self.variants:
+            summary, benchmark = variant.get('summary'), variant.get('benchmark')
+            if not summary or not benchmark or benchmark['latency_p50'] is None:
+                continue
+            rows.append({
+                'model': variant['model'],
+                'base_model': variant['base_model'],
+                'quantization': variant['quantization'],
+                'size': variant.get('size', 0),
+                'avg_score': summary['avg_score'],
+                'latency_p50': benchmark['latency_p50'],
+                'latency_p95': benchmark['latency_p95'],
+                'tokens_per_second': benchmark['tokens_per_second'],
+                'wave': variant.get('wave')
+            })
+        rows.sort(key=lambda row: row['latency_p50'])
+        front = set(self.pareto_front(rows))
+        for row in rows:
+            row['pareto'] = row['model'] in front
+
+        qualified = [row for row in rows if min_score is None or row['avg_score'] >= min_score]
+        recommended = qualified[0]['model'] if qualified else None
+
+        report = {
+            'timestamp': datetime.now().isoformat(),
+            'base_models': self.base_models,
+            'quantizations': self.quantizations,
+            'min_score': min_score,
+            'recommended': recommended,
+            'rows': rows,
+            'variants': self.variants
+        }
+        os.makedirs(self.output_dir, exist_ok=True)
+        report_path = os.path.join(self.output_dir, f"build_matrix_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+        self.print_table(rows, recommended, min_score)
+        print(f"💾 Matris raporu: {report_path}")
+        return report
+
+    @staticmethod
+    def print_table(rows, recommended, min_score):
+        print("\n📊 Gecikme - kalite tablosu (★ = Pareto; gecikme varyant tek başınayken ölçüldü)")
+        print(f"{'Model':<48} {'Boyut':>8} {'Puan':>6} {'p50 sn':>8} {'p95 sn':>8} {'tok/sn':>8}")
+        print("-" * 90)
+        for row in rows:
+            marker = "★" if row['pareto'] else " "
+            speed = f"{row['tokens_per_second']:.1f}" if row['tokens_per_second'] else "-"
+            print(f"{marker}{row['model']:<47} {format_size(row['size']):>8} {row['avg_score']:>6.2f} "
+                  f"{row['latency_p50']:>8.2f} {row['latency_p95']:>8.2f} {speed:>8}")
+        if recommended:
+            bar = f" (puan ≥ {min_score})" if min_score is not None else ""
+            print(f"\n✅ Önerilen{bar}: {recommended}")
+        elif rows:
+            print(f"\n⚠️ Kalite eşiğini ({min_score}) geçen varyant yok")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Temel model × nicemleme derleme matrisi")
+    parser.add_argument("--bases", nargs="+", required=True, help="Temel modeller (nicemleme için FP16 etiketleri)")
+    parser.add_argument("--quants", nargs="+", default=["q4_K_M", "q5_K_M", "q8_0"],
+                        help=f"Nicemleme düzeyleri; '{SOURCE_QUANT}' temel ağırlıkları olduğu gibi kullanır")
+    parser.add_argument("--suite", help="Değerlendirme paketi (varsayılan EVAL_SUITE)")
+    parser.add_argument("--min-score", type=float, help="Kabul edilebilir en düşük ortalama puan")
+    parser.add_argument("--budget", help="Paralel değerlendirme RAM bütçesi (ör. 24GB)")
+    parser.add_argument("--eval-workers", type=int, help="Varyant başına paralel vaka sayısı")
+    parser.add_argument("--bench-cases", type=int, default=DEFAULT_BENCH_CASES,
+                        help="Gecikme geçişinde varyant başına vaka sayısı")
+    args = parser.parse_args()
+
+    budget = args.budget or os.getenv('MODEL_RAM_BUDGET')
+    matrix = BuildMatrix(args.bases, args.quants, suite_path=args.suite,
+                         budget_bytes=parse_size(budget) if budget else None, eval_workers=args.eval_workers,
+                         bench_cases=args.bench_cases)
+    matrix.build_all()
+    matrix.evaluate_all()
+    matrix.report(args.min_score)
+
+
+if __name__ == "__main__":
+    main()
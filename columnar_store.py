@@ -0,0 +1,169 @@
+"""
+Sütunlu (Parquet/Arrow) eğitim verisi deposu
+Eğitim örneklerini sıkıştırılmış Parquet dosyasına, her satır grubu tek bir
+görev türü içerecek şekilde yazar. Okuyucu dosyayı bellek eşlemeli (mmap)
+açar; yalnızca istenen sütunları ve görev türlerini okur. Uzunluk sütunları
+önceden hesaplandığı için istatistik ve örnekleme metin ayrıştırmadan yapılır.
+"""
+
+import random
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+TEXT_COLUMNS = ['id', 'product_id', 'task_type', 'category', 'instruction', 'input', 'output']
+LENGTH_COLUMNS = ['instruction_length', 'input_length', 'output_length']
+TOKEN_COLUMNS = ['input_tokens', 'output_tokens', 'token_count']
+STATS_COLUMNS = ['task_type', 'category'] + LENGTH_COLUMNS + ['token_count']
+
+
+def _require_pyarrow():
+    if not PYARROW_AVAILABLE:
+        raise RuntimeError("Parquet desteği için: pip install pyarrow")
+
+
+def training_schema():
+    _require_pyarrow()
+    return pa.schema(
+        [(name, pa.string()) for name in TEXT_COLUMNS] +
+        [(name, pa.int32()) for name in LENGTH_COLUMNS + TOKEN_COLUMNS]
+    )
+
+
+def _to_table(examples, schema):
+    columns = {name: [] for name in schema.names}
+    for example in examples:
+        for name in TEXT_COLUMNS:
+            value = example.get(name)
+            columns[name].append(None if value is None else str(value))
+        for name in LENGTH_COLUMNS:
+            columns[name].append(len(example.get(name.replace('_length', ''), '') or ''))
+        for name in TOKEN_COLUMNS:
+            columns[name].append(example.get(name))
+    return pa.Table.from_pydict(columns, schema=schema)
+
+
+def write_parquet(examples, filepath, compression='zstd', row_group_size=50000):
+    """
+    Örnekleri Parquet'e yaz. Örnekler görev türüne göre tamponlanır ve her
+    tampon ayrı satır grubu olarak yazılır; böylece görev türü filtresi
+    ilgisiz satır gruplarını hiç okumadan atlar.
+    """
+    schema = training_schema()
+    buffers = {}
+    written = 0
+
+    with pq.ParquetWriter(filepath, schema, compression=compression) as writer:
+        for example in examples:
+            task_type = example.get('task_type', 'unknown')
+            buffer = buffers.setdefault(task_type, [])
+            buffer.append(example)
+            if len(buffer) >= row_group_size:
+                writer.write_table(_to_table(buffer, schema), row_group_size=row_group_size)
+                written += len(buffer)
+                buffers[task_type] = []
+
+        for task_type in sorted(buffers):
+            if buffers[task_type]:
+                writer.write_table(_to_table(buffers[task_type], schema), row_group_size=row_group_size)
+                written += len(buffers[task_type])
+
+    return written
+
+
+def read_parquet(filepath, columns=None, task_types=None, filters=None):
+    """Bellek eşlemeli okuma; yalnızca istenen sütunlar ve görev türleri"""
+    _require_pyarrow()
+    conditions = list(filters or [])
+    if task_types:
+        conditions.append(('task_type', 'in', list(task_types)))
+    return pq.read_table(filepath, columns=columns, filters=conditions or None, memory_map=True)
+
+
+def iter_parquet_examples(filepath, columns=None, task_types=None, batch_size=10000):
+    """Satır gruplarını sırayla okuyup örnekleri sözlük olarak üret"""
+    _require_pyarrow()
+    parquet_file = pq.ParquetFile(filepath, memory_map=True)
+    for index in _matching_row_groups(parquet_file, task_types):
+        table = parquet_file.read_row_group(index, columns=columns)
+        for batch in table.to_batches(max_chunksize=batch_size):
+            yield from batch.to_pylist()
+
+
+def _matching_row_groups(parquet_file, task_types=None):
+    """Satır grubu istatistiklerine göre görev türü eşleşen grupların sırası"""
+    if not task_types:
+        return list(range(parquet_file.num_row_groups))
+
+    wanted = set(task_types)
+    column_index = parquet_file.schema_arrow.get_field_index('task_type')
+    matching = []
+    for index in range(parquet_file.num_row_groups):
+        statistics = parquet_file.metadata.row_group(index).column(column_index).statistics
+        if statistics is None or not statistics.has_min_max:
+            matching.append(index)
+        elif any(statistics.min <= task <= statistics.max for task in wanted):
+            matching.append(index)
+    return matching
+
+
+def sample_parquet(filepath, count, columns=None, task_types=None, seed=None):
+    """Yalnızca seçilen satırların bulunduğu satır gruplarını okuyarak rastgele örnekle"""
+    _require_pyarrow()
+    parquet_file = pq.ParquetFile(filepath, memory_map=True)
+    groups = _matching_row_groups(parquet_file, task_types)
+    sizes = [parquet_file.metadata.row_group(index).num_rows for index in groups]
+    total = sum(sizes)
+    if total == 0:
+        return []
+
+    rng = random.Random(seed)
+    # Görev türü filtresinden sonra eksik kalmasın diye fazladan çek
+    picks = sorted(rng.sample(range(total), min(total, count * 2 if task_types else count)))
+
+    samples = []
+    offset = 0
+    pick_index = 0
+    for group, size in zip(groups, sizes):
+        local = []
+        while pick_index < len(picks) and picks[pick_index] < offset + size:
+            local.append(picks[pick_index] - offset)
+            pick_index += 1
+        if local:
+            table = parquet_file.read_row_group(group, columns=columns).take(local)
+            samples.extend(
+                row for row in table.to_pylist()
+                if not task_types or row.get('task_type', next(iter(task_types))) in task_types
+            )
+        offset += size
+
+    rng.shuffle(samples)
+    return samples[:count]
+
+
+def parquet_statistics(filepath):
+    """Metin sütunlarını okumadan, uzunluk sütunlarından istatistik üret"""
+    _require_pyarrow()
+    from dataset_stats import DatasetStatistics
+
+    parquet_file = pq.ParquetFile(filepath, memory_map=True)
+    # Token sütunu olmayan eski dosyalar da okunabilsin
+    columns = [name for name in STATS_COLUMNS if name in parquet_file.schema_arrow.names]
+    table = read_parquet(filepath, columns=columns)
+    token_counts = table['token_count'].drop_null().to_numpy() if 'token_count' in columns else None
+
+    stats = DatasetStatistics()
+    stats.update_columns(
+        table['instruction_length'].to_numpy() + table['input_length'].to_numpy(),
+        table['output_length'].to_numpy(),
+        {
+            'task_type': table['task_type'].fill_null('unknown').to_numpy(zero_copy_only=False),
+            'category': table['category'].fill_null('-').to_numpy(zero_copy_only=False)
+        },
+        token_counts
+    )
+    return stats.to_dict()
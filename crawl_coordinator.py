@@ -0,0 +1,449 @@
+#!/usr/bin/env python3
+"""
+Çok düğümlü tarama koordinasyonu
+Alan adları ve ürün URL'leri paylaşılan bir depodan süreli kiralama (lease)
+ile dağıtılır; böylece birden fazla ShopifyDataCollector aynı mağazaları
+tekrar taramadan işi bölüşebilir.
+
+Arka uçlar:
+- SQLiteLeaseBackend: paylaşılan bir diskteki tek SQLite dosyası
+- RedisLeaseBackend: Redis uyumlu herhangi bir istemci (redis-py, fakeredis vb.)
+"""
+
+import argparse
+import glob
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+DOMAIN = "domain"
+URL = "url"
+
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+# Süresi dolanları kuyruğa geri alıp yenilerini kiralayan tek atomik adım.
+# KEYS: kuyruk, kiralamalar, sahipler, öğeler; ARGV: şimdi, bitiş, limit, işçi
+REDIS_LEASE_SCRIPT = """
+local expired = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ARGV[1])
+for _, key in ipairs(expired) do
+    redis.call('ZREM', KEYS[2], key)
+    redis.call('HDEL', KEYS[3], key)
+    redis.call('RPUSH', KEYS[1], key)
+end
+local leased = {}
+for _ = 1, tonumber(ARGV[3]) do
+    local key = redis.call('LPOP', KEYS[1])
+    if not key then
+        break
+    end
+    redis.call('ZADD', KEYS[2], ARGV[2], key)
+    redis.call('HSET', KEYS[3], key, ARGV[4])
+    table.insert(leased, key)
+    table.insert(leased, redis.call('HGET', KEYS[4], key) or '')
+end
+return leased
+"""
+
+
+class LeaseBackend:
+    """Kiralama deposu arayüzü"""
+
+    def add_items(self, kind, items):
+        """(anahtar, payload) çiftlerini ekle, eklenen yeni öğe sayısını döndür"""
+        raise NotImplementedError
+
+    def lease(self, kind, worker_id, ttl, limit=1):
+        """Bekleyen ya da süresi dolmuş öğeleri kirala: [(anahtar, payload)]"""
+        raise NotImplementedError
+
+    def heartbeat(self, kind, keys, worker_id, ttl):
+        """Kiralamaları uzat, hâlâ bu işçiye ait olan anahtarları döndür"""
+        raise NotImplementedError
+
+    def complete(self, kind, key, worker_id):
+        raise NotImplementedError
+
+    def fail(self, kind, key, worker_id, max_attempts=3):
+        raise NotImplementedError
+
+    def counts(self, kind):
+        """Durum bazında öğe sayıları"""
+        raise NotImplementedError
+
+
+class SQLiteLeaseBackend(LeaseBackend):
+    """Paylaşılan birim üzerindeki SQLite dosyası ile kiralama"""
+
+    def __init__(self, db_path="crawl_coordinator.db", timeout=30):
+        self.db_path = db_path
+        self.timeout = timeout
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS work_items (
+                    kind TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    payload TEXT,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    owner TEXT,
+                    lease_expires REAL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    updated_at REAL,
+                    PRIMARY KEY (kind, key)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_work_status ON work_items (kind, status, lease_expires)")
+
+    def _connect(self):
+        # Ağ dosya sistemlerinde WAL güvenilir değil, varsayılan journal modu kullanılır
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=self.timeout, isolation_level=None)
+            self._local.conn = conn
+        return _Transaction(conn)
+
+    def add_items(self, kind, items):
+        now = time.time()
+        added = 0
+        with self._connect() as conn:
+            for key, payload in items:
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO work_items (kind, key, payload, status, updated_at) VALUES (?, ?, ?, ?, ?)",
+                    (kind, key, json.dumps(payload, ensure_ascii=False), PENDING, now)
+                )
+                added += cursor.rowcount
+        return added
+
+    def lease(self, kind, worker_id, ttl, limit=1):
+        now = time.time()
+        with self._connect() as conn:
+            rows = conn.execute(
+                """SELECT key, payload FROM work_items
+                   WHERE kind = ? AND (status = ? OR (status = ? AND lease_expires < ?))
+                   ORDER BY updated_at LIMIT ?""",
+                (kind, PENDING, LEASED, now, limit)
+            ).fetchall()
+            for key, _ in rows:
+                conn.execute(
+                    "UPDATE work_items SET status = ?, owner = ?, lease_expires = ?, updated_at = ? WHERE kind = ? AND key = ?",
+                    (LEASED, worker_id, now + ttl, now, kind, key)
+                )
+        return [(key, json.loads(payload) if payload else None) for key, payload in rows]
+
+    def heartbeat(self, kind, keys, worker_id, ttl):
+        now = time.time()
+        alive = []
+        with self._connect() as conn:
+            for key in keys:
+                cursor = conn.execute(
+                    "UPDATE work_items SET lease_expires = ? WHERE kind = ? AND key = ? AND status = ? AND owner = ?",
+                    (now + ttl, kind, key, LEASED, worker_id)
+                )
+                if cursor.rowcount:
+                    alive.append(key)
+        return alive
+
+    def complete(self, kind, key, worker_id):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE work_items SET status = ?, lease_expires = NULL, updated_at = ? WHERE kind = ? AND key = ? AND owner = ?",
+                (DONE, time.time(), kind, key, worker_id)
+            )
+
+    def fail(self, kind, key, worker_id, max_attempts=3):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT attempts FROM work_items WHERE kind = ? AND key = ? AND owner = ?",
+                (kind, key, worker_id)
+            ).fetchone()
+            if not row:
+                return
+            attempts = row[0] + 1
+            status = FAILED if attempts >= max_attempts else PENDING
+            conn.execute(
+                "UPDATE work_items SET status = ?, owner = NULL, lease_expires = NULL, attempts = ?, updated_at = ? WHERE kind = ? AND key = ?",
+                (status, attempts, time.time(), kind, key)
+            )
+
+    def counts(self, kind):
+        now = time.time()
+        counts = {PENDING: 0, LEASED: 0, DONE: 0, FAILED: 0}
+        with self._connect() as conn:
+            rows = conn.execute(
+                """SELECT CASE WHEN status = ? AND lease_expires < ? THEN ? ELSE status END AS s, COUNT(*)
+                   FROM work_items WHERE kind = ? GROUP BY s""",
+                (LEASED, now, PENDING, kind)
+            ).fetchall()
+        for status, count in rows:
+            counts[status] = count
+        return counts
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ile yazma kilidini baştan alan bağlam yöneticisi"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.conn.execute("COMMIT")
+        else:
+            self.conn.execute("ROLLBACK")
+        return False
+
+
+class RedisLeaseBackend(LeaseBackend):
+    """
+    Redis uyumlu kiralama deposu.
+    Kiralama (LPOP + ZADD + HSET) bir Lua betiğiyle atomik yapılır; işçi iki
+    komut arasında çökerse öğe kuyruktan düşüp kaybolmaz. İstemcinin EVALSHA
+    desteklemesi gerekir (fakeredis için lupa kurulu olmalı).
+    """
+
+    def __init__(self, client, namespace="shopify_crawl"):
+        self.client = client
+        self.namespace = namespace
+        self._lease_script = client.register_script(REDIS_LEASE_SCRIPT)
+
+    def _key(self, kind, name):
+        return f"{self.namespace}:{kind}:{name}"
+
+    @staticmethod
+    def _text(value):
+        return value.decode('utf-8') if isinstance(value, bytes) else value
+
+    def add_items(self, kind, items):
+        added = 0
+        for key, payload in items:
+            if self.client.hsetnx(self._key(kind, "items"), key, json.dumps(payload, ensure_ascii=False)):
+                self.client.rpush(self._key(kind, "queue"), key)
+                added += 1
+        return added
+
+    def lease(self, kind, worker_id, ttl, limit=1):
+        now = time.time()
+        result = self._lease_script(
+            keys=[self._key(kind, "queue"), self._key(kind, "leases"),
+                  self._key(kind, "owners"), self._key(kind, "items")],
+            args=[repr(now), repr(now + ttl), limit, worker_id]
+        )
+        leased = []
+        for key, payload in zip(result[::2], result[1::2]):
+            payload = self._text(payload)
+            leased.append((self._text(key), json.loads(payload) if payload else None))
+        return leased
+
+    def heartbeat(self, kind, keys, worker_id, ttl):
+        alive = []
+        for key in keys:
+            owner = self._text(self.client.hget(self._key(kind, "owners"), key))
+            if owner == worker_id and self.client.zscore(self._key(kind, "leases"), key) is not None:
+                self.client.zadd(self._key(kind, "leases"), {key: time.time() + ttl}, xx=True)
+                alive.append(key)
+        return alive
+
+    def _release(self, kind, key, worker_id):
+        owner = self._text(self.client.hget(self._key(kind, "owners"), key))
+        if owner != worker_id:
+            return False
+        self.client.zrem(self._key(kind, "leases"), key)
+        self.client.hdel(self._key(kind, "owners"), key)
+        return True
+
+    def complete(self, kind, key, worker_id):
+        if self._release(kind, key, worker_id):
+            self.client.sadd(self._key(kind, "done"), key)
+
+    def fail(self, kind, key, worker_id, max_attempts=3):
+        if not self._release(kind, key, worker_id):
+            return
+        attempts = self.client.hincrby(self._key(kind, "attempts"), key, 1)
+        if attempts >= max_attempts:
+            self.client.sadd(self._key(kind, "failed"), key)
+        else:
+            self.client.rpush(self._key(kind, "queue"), key)
+
+    def counts(self, kind):
+        now = time.time()
+        expired = self.client.zcount(self._key(kind, "leases"), "-inf", now)
+        return {
+            PENDING: self.client.llen(self._key(kind, "queue")) + expired,
+            LEASED: self.client.zcount(self._key(kind, "leases"), now, "+inf"),
+            DONE: self.client.scard(self._key(kind, "done")),
+            FAILED: self.client.scard(self._key(kind, "failed"))
+        }
+
+
+class CrawlCoordinator:
+    """Bir işçinin kiraladığı alan adı/URL'leri yönetir ve heartbeat gönderir"""
+
+    def __init__(self, backend, worker_id=None, lease_ttl=180, heartbeat_interval=30, max_attempts=3):
+        self.backend = backend
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.lease_ttl = lease_ttl
+        self.heartbeat_interval = heartbeat_interval
+        self.max_attempts = max_attempts
+        self.held = {DOMAIN: set(), URL: set()}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._heartbeat_thread = threading.Thread(target=self._heartbeat_loop, daemon=True)
+        self._heartbeat_thread.start()
+
+    def _heartbeat_loop(self):
+        while not self._stop.wait(self.heartbeat_interval):
+            for kind in (DOMAIN, URL):
+                with self._lock:
+                    keys = list(self.held[kind])
+                if not keys:
+                    continue
+                try:
+                    alive = set(self.backend.heartbeat(kind, keys, self.worker_id, self.lease_ttl))
+                    lost = set(keys) - alive
+                    if lost:
+                        print(f"⚠️ {len(lost)} kiralama başka işçiye geçti ({kind})")
+                        with self._lock:
+                            self.held[kind] -= lost
+                except Exception as e:
+                    print(f"⚠️ Heartbeat hatası: {e}")
+
+    def _lease(self, kind, limit):
+        items = self.backend.lease(kind, self.worker_id, self.lease_ttl, limit)
+        with self._lock:
+            self.held[kind].update(key for key, _ in items)
+        return items
+
+    def add_domains(self, domains):
+        """Alan adlarını iş kuyruğuna ekle (zaten varsa yok sayılır)"""
+        return self.backend.add_items(DOMAIN, [(domain, {'site_url': domain}) for domain in domains])
+
+    def add_urls(self, domain, urls):
+        """Bir alan adından bulunan ürün URL'lerini iş kuyruğuna ekle"""
+        return self.backend.add_items(URL, [(url, {'domain': domain}) for url in urls])
+
+    def lease_domain(self):
+        items = self._lease(DOMAIN, 1)
+        return items[0][0] if items else None
+
+    def lease_urls(self, limit=10):
+        return [key for key, _ in self._lease(URL, limit)]
+
+    def complete(self, kind, key):
+        self.backend.complete(kind, key, self.worker_id)
+        with self._lock:
+            self.held[kind].discard(key)
+
+    def fail(self, kind, key):
+        self.backend.fail(kind, key, self.worker_id, self.max_attempts)
+        with self._lock:
+            self.held[kind].discard(key)
+
+    def is_drained(self):
+        """Bekleyen ya da kiralanmış hiçbir iş kalmadı mı?"""
+        for kind in (DOMAIN, URL):
+            counts = self.backend.counts(kind)
+            if counts[PENDING] or counts[LEASED]:
+                return False
+        return True
+
+    def status(self):
+        return {kind: self.backend.counts(kind) for kind in (DOMAIN, URL)}
+
+    def close(self):
+        self._stop.set()
+        self._heartbeat_thread.join(timeout=1)
+
+
+def create_backend(db_path=None, redis_url=None):
+    """SQLite yolu ya da Redis URL'sinden arka uç oluştur"""
+    if redis_url:
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("Redis arka ucu için: pip install redis")
+        return RedisLeaseBackend(redis.Redis.from_url(redis_url))
+    return SQLiteLeaseBackend(db_path or "crawl_coordinator.db")
+
+
+def create_coordinator_from_env():
+    """CRAWL_COORDINATOR_DB / CRAWL_COORDINATOR_REDIS_URL ortam değişkenlerinden koordinatör oluştur"""
+    db_path = os.getenv('CRAWL_COORDINATOR_DB')
+    redis_url = os.getenv('CRAWL_COORDINATOR_REDIS_URL')
+    if not db_path and not redis_url:
+        return None
+    return CrawlCoordinator(
+        create_backend(db_path, redis_url),
+        worker_id=os.getenv('CRAWL_WORKER_ID') or None,
+        lease_ttl=int(os.getenv('CRAWL_LEASE_TTL', '180'))
+    )
+
+
+def merge_shards(shard_paths, output_file):
+    """İşçi parçalarını URL bazında birleştir, aynı URL için en yeni kaydı tut"""
+    merged = {}
+    for path in shard_paths:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                records = json.load(f)
+        except Exception as e:
+            print(f"❌ Parça okunamadı {path}: {e}")
+            continue
+        for record in records if isinstance(records, list) else [records]:
+            key = record.get('url') or json.dumps(record, sort_keys=True)
+            current = merged.get(key)
+            if current is None or record.get('scraped_at', '') > current.get('scraped_at', ''):
+                merged[key] = record
+
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(list(merged.values()), f, ensure_ascii=False, indent=2)
+
+    print(f"💾 {len(shard_paths)} parça birleştirildi: {len(merged)} kayıt → {output_file}")
+    return len(merged)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Çok düğümlü Shopify tarama koordinatörü")
+    parser.add_argument('--db', default=os.getenv('CRAWL_COORDINATOR_DB', 'crawl_coordinator.db'))
+    parser.add_argument('--redis-url', default=os.getenv('CRAWL_COORDINATOR_REDIS_URL'))
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    seed = subparsers.add_parser('seed', help="Alan adlarını kuyruğa ekle")
+    seed.add_argument('domains', nargs='+')
+
+    subparsers.add_parser('status', help="Kuyruk durumunu göster")
+
+    merge = subparsers.add_parser('merge', help="İşçi parçalarını birleştir")
+    merge.add_argument('--shards', default="shopify_training_data/shard_*.json")
+    merge.add_argument('--output', default=f"shopify_training_data/shopify_products_merged_{time.strftime('%Y%m%d_%H%M')}.json")
+
+    args = parser.parse_args()
+
+    if args.command == 'merge':
+        merge_shards(sorted(glob.glob(args.shards)), args.output)
+        return
+
+    coordinator = CrawlCoordinator(create_backend(args.db, args.redis_url), worker_id="cli")
+    try:
+        if args.command == 'seed':
+            added = coordinator.add_domains(args.domains)
+            print(f"✅ {added} yeni alan adı kuyruğa eklendi")
+        elif args.command == 'status':
+            for kind, counts in coordinator.status().items():
+                print(f"📊 {kind}: {counts}")
+    finally:
+        coordinator.close()
+
+
+if __name__ == "__main__":
+    main()
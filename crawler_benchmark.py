@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Tarayıcı (crawler) performans ölçümü
+Yerel mağaza simülatörüne karşı her toplayıcı modunu çalıştırır ve işçi
+başına ürün/sn, bayt/ürün, CPU süresi ve en yüksek RSS değerini raporlar.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import time
+from datetime import datetime
+
+from storefront_simulator import StorefrontSimulator
+
+MODES = ["static", "products_json", "selenium"]
+
+
+def _peak_rss_mb():
+    # Linux'ta ru_maxrss KB, macOS'ta bayt cinsindendir
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if os.uname().sysname == "Darwin" else peak / 1024
+
+
+def _benchmark_worker(mode, site_url, worker_index, worker_count, max_products, result_queue):
+    """Tek bir işçi süreci: kendi payına düşen ürünleri toplar ve ölçümleri gönderir"""
+    from data_collector import ShopifyDataCollector
+
+    # Kıyaslama ham indirme hızını ölçer: kalite filtresi ve AI zenginleştirmesi kapalı
+    collector = ShopifyDataCollector(mode=mode, delay_range=(0, 0),
+                                     output_dir=os.path.join("benchmark_output", mode), enrich=False)
+    products = 0
+    errors = 0
+
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+
+    try:
+        if mode == "products_json":
+            # Sayfalar işçiler arasında dönüşümlü paylaştırılır
+            page, limit = worker_index + 1, 250
+            while products < max_products:
+                page_products = collector.fetch_products_json(site_url, page=page, limit=limit)
+                products += len(page_products)
+                if len(page_products) < limit:
+                    break
+                page += worker_count
+        else:
+            if mode == "selenium" and not collector.driver:
+                raise RuntimeError("Selenium WebDriver kullanılamıyor")
+            urls = collector.scrape_product_urls_from_site(site_url)
+            for url in urls[worker_index::worker_count][:max_products]:
+                if collector.scrape_shopify_product(url):
+                    products += 1
+                else:
+                    errors += 1
+        status = "ok"
+    except Exception as e:
+        status = f"error: {e}"
+    finally:
+        collector.close()
+
+    wall = time.perf_counter() - wall_start
+    bytes_downloaded = collector.bytes_downloaded
+    if mode == "selenium" and collector.driver:
+        bytes_downloaded = None  # Tarayıcı trafiği süreç içinden ölçülemiyor
+
+    result_queue.put({
+        'mode': mode,
+        'worker': worker_index,
+        'status': status,
+        'products': products,
+        'errors': errors,
+        'wall_seconds': wall,
+        'cpu_seconds': time.process_time() - cpu_start,
+        'peak_rss_mb': _peak_rss_mb(),
+        'bytes_downloaded': bytes_downloaded,
+        'products_per_sec': products / wall if wall > 0 else 0,
+        'bytes_per_product': bytes_downloaded / products if products and bytes_downloaded else None
+    })
+
+
+def run_mode(mode, site_url, workers, max_products):
+    """Bir modu verilen işçi sayısıyla çalıştır, işçi sonuçlarını ve toplamı döndür"""
+    result_queue = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(target=_benchmark_worker, args=(mode, site_url, i, workers, max_products, result_queue))
+        for i in range(workers)
+    ]
+
+    wall_start = time.perf_counter()
+    for process in processes:
+        process.start()
+    worker_results = [result_queue.get() for _ in processes]
+    for process in processes:
+        process.join()
+    wall = time.perf_counter() - wall_start
+
+    worker_results.sort(key=lambda r: r['worker'])
+    total_products = sum(r['products'] for r in worker_results)
+    measured_bytes = [r['bytes_downloaded'] for r in worker_results if r['bytes_downloaded'] is not None]
+
+    summary = {
+        'mode': mode,
+        'workers': workers,
+        'products': total_products,
+        'wall_seconds': wall,
+        'products_per_sec': total_products / wall if wall > 0 else 0,
+        'bytes_per_product': sum(measured_bytes) / total_products if total_products and measured_bytes else None,
+        'cpu_seconds_per_worker': sum(r['cpu_seconds'] for r in worker_results) / workers,
+        'peak_rss_mb_per_worker': max(r['peak_rss_mb'] for r in worker_results),
+        'failed_workers': [r['status'] for r in worker_results if r['status'] != "ok"]
+    }
+    return summary, worker_results
+
+
+def print_report(summaries):
+    print("\n📊 Tarayıcı Performans Raporu")
+    print("=" * 96)
+    print(f"{'Mod':<15}{'İşçi':>6}{'Ürün':>8}{'Ürün/sn':>10}{'Bayt/ürün':>12}{'CPU sn/işçi':>13}{'RSS MB/işçi':>13}  Durum")
+    print("-" * 96)
+    for s in summaries:
+        bytes_per_product = f"{s['bytes_per_product']:.0f}" if s['bytes_per_product'] else "-"
+        status = "✅" if not s['failed_workers'] else f"❌ {s['failed_workers'][0]}"
+        print(f"{s['mode']:<15}{s['workers']:>6}{s['products']:>8}{s['products_per_sec']:>10.1f}"
+              f"{bytes_per_product:>12}{s['cpu_seconds_per_worker']:>13.2f}{s['peak_rss_mb_per_worker']:>13.1f}  {status}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Toplayıcı modlarını yerel simülatöre karşı ölç")
+    parser.add_argument('--modes', default="static,products_json", help=f"Virgülle ayrılmış modlar ({', '.join(MODES)})")
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--products', type=int, default=300, help="Simülatördeki ürün sayısı")
+    parser.add_argument('--max-products', type=int, default=1000, help="İşçi başına en fazla ürün")
+    parser.add_argument('--latency-ms', type=float, default=20)
+    parser.add_argument('--jitter-ms', type=float, default=10)
+    parser.add_argument('--rate-limit-ratio', type=float, default=0.0)
+    parser.add_argument('--error-ratio', type=float, default=0.0)
+    parser.add_argument('--site-url', help="Simülatör yerine mevcut bir sunucuya karşı ölç")
+    parser.add_argument('--output', help="Sonuçların yazılacağı JSON dosyası")
+    args = parser.parse_args()
+
+    simulator = None
+    site_url = args.site_url
+    if not site_url:
+        simulator = StorefrontSimulator(
+            product_count=args.products, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+            rate_limit_ratio=args.rate_limit_ratio, error_ratio=args.error_ratio
+        ).start()
+        site_url = simulator.base_url
+        print(f"🛍️ Simülatör: {site_url} ({args.products} ürün)")
+
+    summaries = []
+    details = []
+    try:
+        for mode in [m.strip() for m in args.modes.split(',') if m.strip()]:
+            print(f"🔄 Mod ölçülüyor: {mode} ({args.workers} işçi)")
+            summary, worker_results = run_mode(mode, site_url, args.workers, args.max_products)
+            summaries.append(summary)
+            details.extend(worker_results)
+    finally:
+        if simulator:
+            simulator.stop()
+
+    print_report(summaries)
+
+    output = args.output or f"benchmark_output/crawler_benchmark_{datetime.now().strftime('%Y%m%d_%H%M')}.json"
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({'site_url': site_url, 'summaries': summaries, 'workers': details}, f, ensure_ascii=False, indent=2)
+    print(f"💾 Sonuçlar kaydedildi: {output}")
+
+
+if __name__ == "__main__":
+    main()
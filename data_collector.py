@@ -15,20 +15,58 @@ from selenium.common.exceptions import TimeoutException, NoSuchElementException
 import pandas as pd
 from datetime import datetime
 import subprocess
+from crawl_coordinator import DOMAIN, URL, create_coordinator_from_env
+from quality_filter import ProductQualityFilter
+from html import unescape
+import re
+
+SITEMAP_LOC_PATTERN = re.compile(r'<loc>\s*([^<]+?)\s*</loc>')
+
+
+def sitemap_locations(xml):
+    """<loc> değerleri; XML varlıkları (&amp; vb.) çözülür"""
+    return [unescape(loc) for loc in SITEMAP_LOC_PATTERN.findall(xml or '')]
+
+
+# Yeniden denenmeyecek HTTP durumları (ürün kaldırılmış)
+PERMANENT_HTTP_STATUSES = {404, 410}
+
+
+def is_permanent_error(error):
+    """Kalıcı hata mı (404/410)? Zaman aşımı, 429 ve 5xx geçicidir"""
+    response = getattr(error, 'response', None)
+    return isinstance(error, requests.HTTPError) and response is not None \
+        and response.status_code in PERMANENT_HTTP_STATUSES
+
+# Anahtar kelimeler - kategoriler
+DEFAULT_KEYWORDS = [
+    "fashion+clothing",
+    "beauty+cosmetics", 
+    "electronics+gadgets",
+    "home+decor",
+    "fitness+sports",
+    "jewelry+accessories",
+    "kitchen+appliances",
+    "baby+kids",
+    "books+media",
+    "toys+games"
+]
 
 class ShopifyDataCollector:
-    def __init__(self):
+    def __init__(self, coordinator=None, mode="selenium", delay_range=(2, 5),
+                 output_dir="shopify_training_data", enrich=True):
         self.data = []
         self.scraped_urls = set()
-        self.output_dir = "shopify_training_data"
+        self.output_dir = output_dir
         self.ensure_output_dir()
         
-        # Selenium setup
-        self.setup_selenium()
+        # Çok düğümlü tarama koordinatörü (opsiyonel)
+        self.coordinator = coordinator
         
-        # AI model configuration
-        self.available_models = self.get_available_ollama_models()
-        self.selected_ai_model = None
+        # Toplama modu: selenium, static (requests + BeautifulSoup) veya products_json
+        self.mode = mode
+        self.delay_range = delay_range
+        self.bytes_downloaded = 0
         
         # User agents for rotation
         self.user_agents = [
@@ -36,6 +74,24 @@ class ShopifyDataCollector:
             "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
             "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
         ]
+        
+        # Selenium setup
+        self.driver = None
+        self.session = requests.Session()
+        if self.mode == "selenium":
+            self.setup_selenium()
+        
+        # AI model configuration
+        self.available_models = self.get_available_ollama_models() if enrich else []
+        self.selected_ai_model = None
+        
+        # AI zenginleştirmesinden önce ucuz kalite filtresi (enrich=False: ham kayıtlar, ör. kıyaslama)
+        self.quality_filter = None
+        if enrich:
+            self.quality_filter = ProductQualityFilter()
+            seeded = self.quality_filter.seed_from_directory(self.output_dir)
+            if seeded:
+                print(f"✅ Kalite filtresi {seeded} kayıtlı ürünle başlatıldı")
     
     def ensure_output_dir(self):
         """Çıktı dizinini oluştur"""
@@ -126,6 +182,18 @@ class ShopifyDataCollector:
             print(f"⚠️ Ollama hatası: {e}")
             return None
     
+    def finalize_product(self, product_data):
+        """Kalite filtresinden geçen ürünü AI ile zenginleştir, geçmeyeni ele"""
+        if self.quality_filter is None:
+            return product_data
+        
+        accepted, reason = self.quality_filter.check(product_data)
+        if not accepted:
+            print(f"🚫 Ürün elendi ({reason}): {product_data.get('url', '')[:50]}")
+            return None
+        
+        return self.enhance_product_data_with_ai(product_data)
+    
     def enhance_product_data_with_ai(self, product_data):
         """Ürün verisini AI ile zenginleştir"""
         if not self.selected_ai_model or not product_data:
@@ -170,12 +238,15 @@ Provide only the enhanced description, no additional text."""
             print(f"⚠️ Selenium ayarlanamadı: {e}")
             self.driver = None
     
-    def scrape_shopify_product(self, url):
-        """Shopify ürün sayfasından veri çek"""
+    def scrape_shopify_product(self, url, raise_errors=False):
+        """Shopify ürün sayfasından veri çek (raise_errors: indirme hataları çağırana iletilir)"""
+        if self.mode == "static":
+            return self.scrape_shopify_product_static(url, raise_errors)
+        
         try:
             if self.driver:
                 self.driver.get(url)
-                time.sleep(random.uniform(2, 5))
+                self.wait()
                 
                 # Ürün başlığı
                 title = ""
@@ -254,16 +325,173 @@ Provide only the enhanced description, no additional text."""
                         'scraped_at': datetime.now().isoformat()
                     }
                     
-                    # AI ile zenginleştir
-                    product_data = self.enhance_product_data_with_ai(product_data)
-                    
-                    return product_data
+                    # Kalite filtresi ve AI ile zenginleştirme
+                    return self.finalize_product(product_data)
                     
         except Exception as e:
+            if raise_errors:
+                raise
             print(f"❌ Hata oluştu {url}: {e}")
         
         return None
     
+    def wait(self, scale=1.0):
+        """İstekler arasında rastgele bekle (rate limiting)"""
+        low, high = self.delay_range
+        if high > 0:
+            time.sleep(random.uniform(low, high) * scale)
+    
+    def fetch_page(self, url, max_retries=3):
+        """Sayfayı HTTP ile indir, 429 yanıtlarında Retry-After kadar bekle"""
+        for attempt in range(max_retries + 1):
+            response = self.session.get(url, headers={'User-Agent': random.choice(self.user_agents)}, timeout=30)
+            self.bytes_downloaded += len(response.content)
+            
+            if response.status_code == 429 and attempt < max_retries:
+                retry_after = response.headers.get('Retry-After', '1')
+                time.sleep(float(retry_after) if retry_after.replace('.', '', 1).isdigit() else 1)
+                continue
+            
+            response.raise_for_status()
+            return response.text
+        
+        return None
+    
+    def scrape_shopify_product_static(self, url, raise_errors=False):
+        """Ürün sayfasını tarayıcı olmadan (requests + BeautifulSoup) çek"""
+        try:
+            html = self.fetch_page(url)
+            if not html:
+                return None
+            
+            soup = BeautifulSoup(html, 'html.parser')
+            
+            title_element = soup.select_one("h1, .product-title, [class*='title'], [class*='name']")
+            title = title_element.get_text(strip=True) if title_element else ""
+            
+            description = ""
+            for selector in [".product-description", ".product-content", "[class*='description']", ".rte", ".product-single__description"]:
+                desc_element = soup.select_one(selector)
+                if desc_element and desc_element.decode_contents().strip():
+                    description = desc_element.decode_contents()
+                    break
+            
+            price = ""
+            for selector in [".price", ".product-price", "[class*='price']", ".money"]:
+                price_element = soup.select_one(selector)
+                if price_element and price_element.get_text(strip=True):
+                    price = price_element.get_text(strip=True)
+                    break
+            
+            breadcrumb = soup.select(".breadcrumb a, nav a")
+            category = " > ".join([b.get_text(strip=True) for b in breadcrumb if b.get_text(strip=True)])
+            
+            feature_elements = soup.select(".product-features li, .product-details li, ul li")
+            features = [f.get_text(strip=True) for f in feature_elements if f.get_text(strip=True)]
+            
+            if title and description:
+                product_data = {
+                    'url': url,
+                    'title': title,
+                    'description': self.clean_html(description),
+                    'price': price,
+                    'category': category,
+                    'features': features,
+                    'scraped_at': datetime.now().isoformat()
+                }
+                return self.finalize_product(product_data)
+        
+        except Exception as e:
+            if raise_errors:
+                raise
+            print(f"❌ Hata oluştu {url}: {e}")
+        
+        return None
+    
+    def fetch_products_json(self, site_url, page=1, limit=250):
+        """
+        Shopify /products.json uç noktasından bir sayfa ürünü ham kayıt olarak
+        çek (kalite filtresi ve AI uygulanmaz). İndirme hataları çağırana iletilir.
+        """
+        json_url = urljoin(site_url.rstrip('/') + '/', f"products.json?limit={limit}&page={page}")
+        body = self.fetch_page(json_url)
+        if not body:
+            return []
+        
+        products = []
+        for product in json.loads(body).get('products', []):
+            variants = product.get('variants') or [{}]
+            tags = product.get('tags', [])
+            if isinstance(tags, str):
+                tags = [tag.strip() for tag in tags.split(',') if tag.strip()]
+            
+            products.append({
+                'url': urljoin(site_url.rstrip('/') + '/', f"products/{product.get('handle', '')}"),
+                'title': product.get('title', ''),
+                'description': self.clean_html(product.get('body_html', '')),
+                'price': str(variants[0].get('price', '')),
+                'category': product.get('product_type', ''),
+                'features': tags,
+                'scraped_at': datetime.now().isoformat()
+            })
+        
+        return products
+    
+    def scrape_products_json_site(self, site_url, max_products=250, limit=250):
+        """
+        Bir sitenin products.json sayfalarını gez. Daha önce görülen URL'ler
+        atlanır; kalite filtresi ve AI zenginleştirmesi yalnızca kotaya giren
+        ürünlere uygulanır. Sayfalama ham sayfa boyutuna göre durur.
+        """
+        products = []
+        page = 1
+        
+        while len(products) < max_products:
+            page_products = self.fetch_products_json(site_url, page=page, limit=limit)
+            for product_data in page_products:
+                if len(products) >= max_products:
+                    break
+                if product_data['url'] in self.scraped_urls:
+                    continue
+                if not product_data['title'] or not product_data['description']:
+                    continue
+                product_data = self.finalize_product(product_data)
+                if product_data:
+                    self.scraped_urls.add(product_data['url'])
+                    products.append(product_data)
+            
+            # Eksik sayfa son sayfadır (filtrelenen ürünler sayfalamayı etkilemez)
+            if len(page_products) < limit:
+                break
+            page += 1
+            self.wait(0.5)
+        
+        return products
+    
+    def scrape_product_urls_static(self, site_url):
+        """Sitemap ve koleksiyon sayfalarından tarayıcı olmadan ürün URL'lerini çek"""
+        product_urls = []
+        
+        try:
+            # Önce sitemap'i dene
+            sitemap = self.fetch_page(urljoin(site_url.rstrip('/') + '/', "sitemap.xml"))
+            if sitemap:
+                for href in sitemap_locations(sitemap):
+                    if 'sitemap_products' in href:
+                        product_urls.extend(sitemap_locations(self.fetch_page(href)))
+            
+            if not product_urls:
+                soup = BeautifulSoup(self.fetch_page(site_url) or '', 'html.parser')
+                for link in soup.select("a[href*='/products/'], a[href*='/product/']"):
+                    full_url = urljoin(site_url, link['href'])
+                    if full_url not in product_urls:
+                        product_urls.append(full_url)
+        
+        except Exception as e:
+            print(f"❌ Site tarama hatası {site_url}: {e}")
+        
+        return product_urls
+    
     def clean_html(self, html_content):
         """HTML içeriğini temizle"""
         if not html_content:
@@ -329,12 +557,15 @@ Provide only the enhanced description, no additional text."""
     
     def scrape_product_urls_from_site(self, site_url):
         """Bir siteden ürün URL'lerini çek"""
+        if self.mode == "static":
+            return self.scrape_product_urls_static(site_url)
+        
         product_urls = []
         
         try:
             if self.driver:
                 self.driver.get(site_url)
-                time.sleep(random.uniform(3, 6))
+                self.wait(1.3)
                 
                 # Ürün linklerini bul
                 product_selectors = [
@@ -384,23 +615,23 @@ Provide only the enhanced description, no additional text."""
         
         return product_urls
     
-    def collect_training_data(self, keywords, max_products_per_keyword=50):
-        """Eğitim verisi topla"""
-        print("🚀 Shopify eğitim verisi toplama başlıyor...")
-        
-        # AI model seçimi
-        self.selected_ai_model = self.select_ai_model()
-        
+    def iter_products(self, keywords, max_products_per_keyword=50):
+        """Shopify sitelerini tara ve toplanan her ürünü hemen üret (akış modu için)"""
         # Shopify sitelerini bul
         print("🔍 Shopify siteleri aranıyor...")
         shopify_sites = self.find_shopify_sites(keywords)
         print(f"✅ {len(shopify_sites)} Shopify sitesi bulundu")
         
-        total_collected = 0
-        
         for site in shopify_sites[:10]:  # İlk 10 site
             try:
                 print(f"📋 Site taranıyor: {site}")
+                
+                if self.mode == "products_json":
+                    # Ürünler doğrudan JSON uç noktasından gelir, sayfa gezmeye gerek yok
+                    # Görülen URL'ler site taramasında atlanır
+                    yield from self.scrape_products_json_site(site, max_products_per_keyword)
+                    continue
+                
                 product_urls = self.scrape_product_urls_from_site(site)
                 print(f"✅ {len(product_urls)} ürün URL'si bulundu")
                 
@@ -412,23 +643,119 @@ Provide only the enhanced description, no additional text."""
                     print(f"📝 Ürün verisi çekiliyor: {url[:50]}...")
                     product_data = self.scrape_shopify_product(url)
                     
+                    if product_data:
+                        self.scraped_urls.add(url)
+                        yield product_data
+                    
+                    # Rate limiting
+                    self.wait()
+                    
+            except Exception as e:
+                print(f"❌ Site işleme hatası {site}: {e}")
+    
+    def collect_training_data(self, keywords, max_products_per_keyword=50):
+        """Eğitim verisi topla"""
+        print("🚀 Shopify eğitim verisi toplama başlıyor...")
+        
+        # AI model seçimi
+        self.selected_ai_model = self.select_ai_model()
+        
+        total_collected = 0
+        
+        for product_data in self.iter_products(keywords, max_products_per_keyword):
+            self.data.append(product_data)
+            total_collected += 1
+            print(f"✅ Veri toplandı ({total_collected} toplam)")
+            
+            # Her 10 üründe bir kaydet
+            if total_collected % 10 == 0:
+                self.save_data()
+        
+        print(f"🎉 Toplanan veri sayısı: {total_collected}")
+        if self.quality_filter is not None:
+            print(f"📊 Kalite filtresi: {self.quality_filter.summary()}")
+        self.save_data()
+        self.close()
+        
+        return total_collected
+    
+    def collect_coordinated(self, seed_sites=None, max_products_per_site=50, idle_wait=10):
+        """Koordinatörden kiralanan alan adı ve URL'lerle veri topla"""
+        coordinator = self.coordinator
+        print(f"🚀 Koordineli tarama başlıyor (işçi: {coordinator.worker_id})")
+        
+        if seed_sites:
+            added = coordinator.add_domains(seed_sites)
+            print(f"✅ {added} yeni alan adı kuyruğa eklendi")
+        
+        total_collected = 0
+        
+        while True:
+            # Önce ürün URL'lerini işle, yoksa yeni bir alan adı kirala
+            urls = coordinator.lease_urls(limit=10)
+            
+            if not urls:
+                site = coordinator.lease_domain()
+                if site:
+                    try:
+                        print(f"📋 Site taranıyor: {site}")
+
+                        if self.mode == "products_json":
+                            products = self.scrape_products_json_site(site, max_products_per_site)
+                            self.data.extend(products)
+                            total_collected += len(products)
+                            print(f"✅ Veri toplandı ({total_collected} toplam)")
+                            self.save_data()
+                            coordinator.complete(DOMAIN, site)
+                            continue
+
+                        product_urls = self.scrape_product_urls_from_site(site)[:max_products_per_site]
+                        added = coordinator.add_urls(site, product_urls)
+                        print(f"✅ {len(product_urls)} ürün URL'si bulundu ({added} yeni)")
+                        coordinator.complete(DOMAIN, site)
+                    except Exception as e:
+                        print(f"❌ Site işleme hatası {site}: {e}")
+                        coordinator.fail(DOMAIN, site)
+                    continue
+                
+                if coordinator.is_drained():
+                    break
+                
+                # Diğer işçiler hâlâ site tarıyor olabilir
+                time.sleep(idle_wait)
+                continue
+            
+            for url in urls:
+                try:
+                    print(f"📝 Ürün verisi çekiliyor: {url[:50]}...")
+                    product_data = self.scrape_shopify_product(url, raise_errors=True)
+                    
                     if product_data:
                         self.data.append(product_data)
                         self.scraped_urls.add(url)
                         total_collected += 1
                         print(f"✅ Veri toplandı ({total_collected} toplam)")
                         
-                        # Her 10 üründe bir kaydet
                         if total_collected % 10 == 0:
                             self.save_data()
                     
-                    # Rate limiting
-                    time.sleep(random.uniform(2, 5))
-                    
-            except Exception as e:
-                print(f"❌ Site işleme hatası {site}: {e}")
+                    coordinator.complete(URL, url)
+                except Exception as e:
+                    if is_permanent_error(e):
+                        # Kaldırılmış ürün yeniden denenmez
+                        print(f"🚫 Ürün bulunamadı {url}: {e}")
+                        coordinator.complete(URL, url)
+                    else:
+                        # Geçici hata: kira bırakılır, max_attempts'e kadar yeniden denenir
+                        print(f"❌ Ürün işleme hatası {url}: {e}")
+                        coordinator.fail(URL, url)
+                
+                # Rate limiting
+                self.wait()
         
-        print(f"🎉 Toplanan veri sayısı: {total_collected}")
+        print(f"🎉 Bu işçinin topladığı veri: {total_collected}")
+        if self.quality_filter is not None:
+            print(f"📊 Kalite filtresi: {self.quality_filter.summary()}")
         self.save_data()
         self.close()
         
@@ -439,6 +766,14 @@ Provide only the enhanced description, no additional text."""
         if not self.data:
             return
         
+        if self.coordinator:
+            # Koordineli modda her işçi kendi parçasını yazar, sonra birleştirilir
+            shard_file = os.path.join(self.output_dir, f"shard_{self.coordinator.worker_id}.json")
+            with open(shard_file, 'w', encoding='utf-8') as f:
+                json.dump(self.data, f, ensure_ascii=False, indent=2)
+            print(f"💾 Parça kaydedildi: {shard_file} ({len(self.data)} kayıt)")
+            return
+        
         # JSON formatında kaydet
         json_file = os.path.join(self.output_dir, f"shopify_products_{datetime.now().strftime('%Y%m%d_%H%M')}.json")
         with open(json_file, 'w', encoding='utf-8') as f:
@@ -456,27 +791,25 @@ Provide only the enhanced description, no additional text."""
         """Kaynakları temizle"""
         if self.driver:
             self.driver.quit()
+        if self.coordinator:
+            self.coordinator.close()
 
 def main():
     """Ana fonksiyon"""
-    collector = ShopifyDataCollector()
+    # CRAWL_COORDINATOR_DB veya CRAWL_COORDINATOR_REDIS_URL tanımlıysa koordineli mod
+    coordinator = create_coordinator_from_env()
+    collector = ShopifyDataCollector(coordinator=coordinator, mode=os.getenv('COLLECTOR_MODE', 'selenium'))
     
-    # Anahtar kelimeler - kategoriler
-    keywords = [
-        "fashion+clothing",
-        "beauty+cosmetics", 
-        "electronics+gadgets",
-        "home+decor",
-        "fitness+sports",
-        "jewelry+accessories",
-        "kitchen+appliances",
-        "baby+kids",
-        "books+media",
-        "toys+games"
-    ]
+    keywords = DEFAULT_KEYWORDS
     
     try:
-        total_collected = collector.collect_training_data(keywords, max_products_per_keyword=30)
+        if coordinator:
+            seed_sites = os.getenv('CRAWL_SEED_SITES', '')
+            seed_sites = [site.strip() for site in seed_sites.split(',') if site.strip()]
+            collector.selected_ai_model = collector.select_ai_model()
+            total_collected = collector.collect_coordinated(seed_sites, max_products_per_site=30)
+        else:
+            total_collected = collector.collect_training_data(keywords, max_products_per_keyword=30)
         print(f"🎉 Veri toplama tamamlandı! Toplam: {total_collected} ürün")
     except KeyboardInterrupt:
         print("\n⚠️ İşlem kullanıcı tarafından durduruldu")
@@ -1,36 +1,226 @@
 import json
+import hashlib
 import pandas as pd
 import os
+import time
+import multiprocessing
+import shutil
+from collections import deque
+from itertools import chain, islice
 from datetime import datetime
 import re
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator
+from near_duplicate import NearDuplicateRemover
+from dataset_stats import DatasetStatistics
+import columnar_store
+from jsonl_index import JsonlIndex
+from token_counter import TokenBudget, get_tokenizer
+from sequence_packer import pack_examples
+from dataset_store import DatasetStore
+
+# Artımlı JSON ayrıştırıcı (opsiyonel); yoksa standart kütüphane ile parça parça okunur
+try:
+    import ijson
+    IJSON_AVAILABLE = True
+except ImportError:
+    IJSON_AVAILABLE = False
+
+READ_CHUNK_SIZE = 1 << 16
+
+# Metin temizleme desenleri (her çağrıda yeniden derlenmesin)
+HTML_TAG_PATTERN = re.compile(r'<[^>]+>')
+WHITESPACE_PATTERN = re.compile(r'\s+')
+SPECIAL_CHAR_PATTERN = re.compile(r'[^\w\s\.,!?;:()-]')
+PRICE_PATTERN = re.compile(r'[\d,]+\.?\d*')
+
+# Ürünün tüm örneklerinde aynı olan alanlar; yalnızca bunlarla tabakalanabilir
+PRODUCT_LEVEL_FIELDS = ('category', 'product_id')
+
+def iter_json_array(f, chunk_size=READ_CHUNK_SIZE):
+    """Bir JSON dizisinin elemanlarını dosyayı tamamen belleğe almadan üret"""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    eof = False
+    started = False
+    
+    while True:
+        # Boşlukları ve ayırıcıları atla
+        while pos < len(buffer) and (buffer[pos].isspace() or (started and buffer[pos] == ',')):
+            pos += 1
+        
+        if pos >= len(buffer):
+            if eof:
+                return
+            buffer = buffer[pos:] + f.read(chunk_size)
+            pos = 0
+            eof = len(buffer) == 0 or eof
+            if not buffer:
+                return
+            continue
+        
+        if not started:
+            if buffer[pos] != '[':
+                raise ValueError("JSON dizisi bekleniyordu")
+            started = True
+            pos += 1
+            continue
+        
+        if buffer[pos] == ']':
+            return
+        
+        try:
+            item, end = decoder.raw_decode(buffer, pos)
+            # Sayı gibi değerler parça sonunda kesilmiş olabilir ("1." veya "1.5e" gibi);
+            # değerden sonra ayırıcı görülmeden kabul etme
+            if not eof and (end == len(buffer) or not (buffer[end] in ',]' or buffer[end].isspace())):
+                raise ValueError("parça sonu")
+        except ValueError:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                if eof:
+                    raise
+                eof = True
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            continue
+        
+        yield item
+        pos = end
+        
+        # İşlenen kısmı at, bellek kullanımı sabit kalsın
+        if pos > chunk_size:
+            buffer = buffer[pos:]
+            pos = 0
+
+def file_sha256(filepath, chunk_size=1 << 20):
+    """Dosya içeriğinin SHA-256 özeti"""
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(chunk_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def example_id(example):
+    """Eğitim örneğinin içerik tabanlı kararlı kimliği"""
+    key = json.dumps(
+        [example.get('instruction', ''), example.get('input', ''), example.get('output', ''), example.get('task_type', '')],
+        ensure_ascii=False
+    )
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+
+def product_key(product_data):
+    """Ürünün kararlı kimliği: URL, yoksa başlık"""
+    identity = product_data.get('url') or product_data.get('title') or json.dumps(product_data, sort_keys=True)
+    return hashlib.sha1(str(identity).encode('utf-8')).hexdigest()[:16]
+
+def iter_jsonl_file(filepath):
+    """JSONL dosyasındaki kayıtları uzantısına bakmadan sırayla üret"""
+    with open(filepath, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+def split_bucket(key, salt=""):
+    """Anahtarı [0, 1) aralığında kararlı bir değere eşle"""
+    digest = hashlib.sha1(f"{salt}{key}".encode('utf-8')).hexdigest()
+    return int(digest[:15], 16) / float(16 ** 15)
+
+def iter_chunks(iterable, chunk_size):
+    """Yinelenebilir nesneyi sabit boyutlu listelere böl"""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+# İşçi süreçlerinde bir kez oluşturulan ön işlemci
+_worker_preprocessor = None
+
+def _init_worker(data_dir, tokenizer, max_tokens, overflow):
+    global _worker_preprocessor
+    _worker_preprocessor = DataPreprocessor(data_dir, tokenizer, max_tokens, overflow)
+
+def _process_chunk(chunk):
+    """Bir kayıt parçasını işçi süreçte eğitim örneklerine dönüştür"""
+    examples = []
+    for product in chunk:
+        try:
+            examples.extend(_worker_preprocessor.create_training_prompts(product))
+        except Exception as e:
+            print(f"❌ Ürün işleme hatası: {e}")
+    return len(chunk), examples, _worker_preprocessor.token_budget.pop_counts()
 
 class DataPreprocessor:
-    def __init__(self, data_dir="shopify_training_data"):
+    def __init__(self, data_dir="shopify_training_data", tokenizer=None, max_tokens=None, overflow='truncate'):
         self.data_dir = data_dir
         self.processed_data = []
+        # Örnek başına token bütçesi (varsayılan: Modelfile num_ctx, yoksa 4096)
+        self.tokenizer_spec = tokenizer
+        self.token_budget = TokenBudget(get_tokenizer(tokenizer), max_tokens, overflow)
+    
+    def list_raw_files(self):
+        """Ham veri dizinindeki JSON/JSONL dosyalarını sıralı listele"""
+        if not os.path.isdir(self.data_dir):
+            return []
+        
+        return [
+            os.path.join(self.data_dir, filename)
+            for filename in sorted(os.listdir(self.data_dir))
+            if filename.endswith(('.json', '.jsonl'))
+        ]
+    
+    def iter_file_records(self, filepath) -> Iterator[Dict[str, Any]]:
+        """Tek bir dosyadaki kayıtları sırayla üret (JSON dizisi, tek nesne veya JSONL)"""
+        with open(filepath, 'r', encoding='utf-8') as f:
+            if filepath.endswith('.jsonl'):
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        yield json.loads(line)
+                return
+            
+            # İlk anlamlı karaktere bakarak dizi mi tek nesne mi olduğunu anla
+            first_char = ''
+            while True:
+                char = f.read(1)
+                if not char or not char.isspace():
+                    first_char = char
+                    break
+            f.seek(0)
+            
+            if first_char != '[':
+                data = json.load(f)
+                yield data
+                return
+            
+            if IJSON_AVAILABLE:
+                yield from ijson.items(f, 'item', use_float=True)
+            else:
+                yield from iter_json_array(f)
+    
+    def iter_raw_records(self, files=None) -> Iterator[Dict[str, Any]]:
+        """Ham kayıtları dosya dosya, bellekte biriktirmeden üret"""
+        total = 0
         
+        for filepath in files if files is not None else self.list_raw_files():
+            count = 0
+            try:
+                for record in self.iter_file_records(filepath):
+                    count += 1
+                    yield record
+                print(f"✅ Yüklendi: {filepath} ({count} kayıt)")
+            except Exception as e:
+                print(f"❌ Yükleme hatası {filepath}: {e}")
+            total += count
+        
+        print(f"📊 Toplam ham veri: {total} kayıt")
+    
     def load_raw_data(self):
         """Ham verileri yükle"""
-        all_data = []
-        
-        # JSON dosyalarını yükle
-        for filename in os.listdir(self.data_dir):
-            if filename.endswith('.json'):
-                filepath = os.path.join(self.data_dir, filename)
-                try:
-                    with open(filepath, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-                        if isinstance(data, list):
-                            all_data.extend(data)
-                        else:
-                            all_data.append(data)
-                    print(f"✅ Yüklendi: {filepath} ({len(data) if isinstance(data, list) else 1} kayıt)")
-                except Exception as e:
-                    print(f"❌ Yükleme hatası {filepath}: {e}")
-        
-        print(f"📊 Toplam ham veri: {len(all_data)} kayıt")
-        return all_data
+        return list(self.iter_raw_records())
     
     def clean_text(self, text):
         """Metni temizle ve normalize et"""
@@ -38,13 +228,13 @@ class DataPreprocessor:
             return ""
         
         # HTML etiketlerini kaldır
-        text = re.sub(r'<[^>]+>', ' ', text)
+        text = HTML_TAG_PATTERN.sub(' ', text)
         
         # Fazla boşlukları temizle
-        text = re.sub(r'\s+', ' ', text)
+        text = WHITESPACE_PATTERN.sub(' ', text)
         
         # Özel karakterleri temizle
-        text = re.sub(r'[^\w\s\.,!?;:()-]', ' ', text)
+        text = SPECIAL_CHAR_PATTERN.sub(' ', text)
         
         # Baştan ve sondan boşlukları kaldır
         text = text.strip()
@@ -64,7 +254,7 @@ class DataPreprocessor:
         # Fiyat işleme
         if features['price']:
             # Fiyattan sadece sayıları çıkar
-            price_match = re.search(r'[\d,]+\.?\d*', str(features['price']))
+            price_match = PRICE_PATTERN.search(str(features['price']))
             if price_match:
                 features['price_numeric'] = float(price_match.group().replace(',', ''))
             else:
@@ -135,31 +325,258 @@ class DataPreprocessor:
                 'task_type': 'feature_description'
             })
         
-        return training_examples
-    
-    def process_data(self):
-        """Verileri işle ve eğitim formatına dönüştür"""
-        print("🔄 Veri işleme başlıyor...")
+        # Ayırma ve tabakalama için ürün kimliği ve kategori
+        product_id = product_key(product_data)
+        for example in training_examples:
+            example['product_id'] = product_id
+            example['category'] = features['category']
         
-        raw_data = self.load_raw_data()
-        all_training_examples = []
+        # Bağlama sığmayan örnekler kırpılır veya atılır
+        budgeted = (self.token_budget.apply(example) for example in training_examples)
+        return [example for example in budgeted if example is not None]
+    
+    def iter_training_examples(self, records=None):
+        """Ham kayıtlar okundukça eğitim örneklerini üret"""
+        if records is None:
+            records = self.iter_raw_records()
         
-        for i, product in enumerate(raw_data):
+        for i, product in enumerate(records):
             try:
-                training_examples = self.create_training_prompts(product)
-                all_training_examples.extend(training_examples)
+                yield from self.create_training_prompts(product)
                 
                 if (i + 1) % 100 == 0:
                     print(f"📋 İşlenen ürün sayısı: {i + 1}")
                     
             except Exception as e:
                 print(f"❌ Ürün işleme hatası {i}: {e}")
+    
+    def iter_training_examples_parallel(self, records=None, workers=None, chunk_size=500, max_pending=None):
+        """
+        Kayıt akışını parçalara bölüp süreç havuzunda işle.
+        Sonuçlar gönderim sırasıyla alındığı için çıktı sıralı işlemle aynıdır.
+        Aynı anda en fazla max_pending (varsayılan 2 × işçi) parça havuzdadır.
+        """
+        if records is None:
+            records = self.iter_raw_records()
+        workers = workers or os.cpu_count() or 1
+        max_pending = max_pending or 2 * workers
+        
+        processed = 0
+        initargs = (self.data_dir, self.tokenizer_spec, self.token_budget.max_tokens, self.token_budget.overflow)
+        with multiprocessing.Pool(workers, initializer=_init_worker, initargs=initargs) as pool:
+            # imap girdi yineleyicisini arka planda sonuna kadar okur; tüketici
+            # yavaşsa tüm parçalar kuyrukta birikir. Pencere dolunca en eski
+            # sonucun alınması beklenir, böylece okuma işlemeden ileri gitmez.
+            pending = deque()
+            chunks = iter_chunks(records, chunk_size)
+            while True:
+                for chunk in islice(chunks, max_pending - len(pending)):
+                    pending.append(pool.apply_async(_process_chunk, (chunk,)))
+                if not pending:
+                    break
+                record_count, examples, budget_counts = pending.popleft().get()
+                processed += record_count
+                self.token_budget.counts.update(budget_counts)
+                yield from examples
+                print(f"📋 İşlenen ürün sayısı: {processed}")
+    
+    def process_data(self, workers=1, chunk_size=500):
+        """Verileri işle ve eğitim örneklerini akış hâlinde üret (workers > 1 ise paralel)"""
+        print(f"🔄 Veri işleme başlıyor... ({workers or os.cpu_count()} işçi)")
+        
+        start_time = time.perf_counter()
+        record_count = 0
+        example_count = 0
+        
+        def counted(records):
+            nonlocal record_count
+            for record in records:
+                record_count += 1
+                yield record
+        
+        records = counted(self.iter_raw_records())
+        if workers == 1:
+            examples = self.iter_training_examples(records)
+        else:
+            examples = self.iter_training_examples_parallel(records, workers, chunk_size)
+        
+        for example in examples:
+            example_count += 1
+            yield example
+        
+        elapsed = time.perf_counter() - start_time
+        throughput = record_count / elapsed if elapsed > 0 else 0
+        
+        print(f"✅ Toplam eğitim örneği: {example_count}")
+        self.print_token_budget()
+        print(f"⚡ İşlem hızı: {throughput:.0f} kayıt/sn ({record_count} kayıt, {elapsed:.2f} sn)")
+    
+    def load_manifest(self, manifest_path):
+        """Önceki çalıştırmanın dosya manifestosunu yükle"""
+        if os.path.exists(manifest_path):
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        return {'version': 1, 'files': {}}
+    
+    def save_manifest(self, manifest, manifest_path):
+        manifest['updated_at'] = datetime.now().isoformat()
+        temp_path = manifest_path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, manifest_path)
+    
+    def detect_changed_files(self, manifest):
+        """(yeni/değişmiş dosyalar, silinmiş dosyalar, güncel dosya bilgileri) döndür"""
+        changed = []
+        current = {}
+        
+        for filepath in self.list_raw_files():
+            stat = os.stat(filepath)
+            previous = manifest['files'].get(filepath)
+            
+            # Boyut ve zaman aynıysa özeti yeniden hesaplama
+            if previous and previous['size'] == stat.st_size and previous['mtime'] == stat.st_mtime:
+                current[filepath] = previous
+                continue
+            
+            digest = file_sha256(filepath)
+            info = {'sha256': digest, 'size': stat.st_size, 'mtime': stat.st_mtime}
+            
+            if previous and previous['sha256'] == digest:
+                info['example_ids'] = previous.get('example_ids', [])
+            else:
+                changed.append(filepath)
+            current[filepath] = info
         
-        print(f"✅ Toplam eğitim örneği: {len(all_training_examples)}")
-        return all_training_examples
+        removed = [filepath for filepath in manifest['files'] if filepath not in current]
+        return changed, removed, current
+    
+    def process_incremental(self, dataset_file="model_training_data/shopify_training_dataset.jsonl",
+                            manifest_path="model_training_data/preprocess_manifest.json", workers=1, chunk_size=500):
+        """
+        Yalnızca yeni veya değişmiş ham dosyaları işle ve birleşik veri setine ekle.
+        Değişen/silinen dosyalara ait eski örnekler, başka bir dosya tarafından
+        da üretilmiyorsa veri setinden çıkarılır.
+        """
+        os.makedirs(os.path.dirname(dataset_file) or ".", exist_ok=True)
+        manifest = self.load_manifest(manifest_path)
+        settings = self.token_budget.settings()
+        
+        # Veri seti silinmişse manifestoya güvenme, baştan oluştur
+        if not os.path.exists(dataset_file):
+            manifest = {'version': 1, 'files': {}}
+        
+        # Tokenizer veya bütçe değiştiyse tüm örnekler yeniden üretilmeli
+        elif manifest.get('settings') != settings:
+            print("🔄 Token ayarları değişti, veri seti baştan oluşturuluyor")
+            os.remove(dataset_file)
+            manifest = {'version': 1, 'files': {}}
+        
+        changed, removed, current = self.detect_changed_files(manifest)
+        
+        if not changed and not removed:
+            print(f"✅ Ham veride değişiklik yok, veri seti güncel: {dataset_file}")
+            return dataset_file
+        
+        print(f"🔄 Artımlı işleme: {len(changed)} yeni/değişmiş, {len(removed)} silinmiş dosya")
+        start_time = time.perf_counter()
+        
+        # Artık hiçbir dosyanın üretmediği örnekleri bul
+        stale_ids = set()
+        for filepath in changed + removed:
+            stale_ids.update(manifest['files'].get(filepath, {}).get('example_ids', []))
+        for filepath, info in current.items():
+            if filepath not in changed:
+                stale_ids.difference_update(info.get('example_ids', []))
+        
+        existing_ids = set()
+        for filepath, info in current.items():
+            if filepath not in changed:
+                existing_ids.update(info.get('example_ids', []))
+        
+        temp_file = dataset_file + ".tmp"
+        if stale_ids:
+            # Eski örnekleri ayıklayarak veri setini yeniden yaz
+            out = open(temp_file, 'w', encoding='utf-8')
+            if os.path.exists(dataset_file):
+                for example in self.iter_file_records(dataset_file):
+                    if example.get('id') not in stale_ids:
+                        out.write(json.dumps(example, ensure_ascii=False) + '\n')
+        else:
+            # Yalnızca ekleme: mevcut dosyaya dokunmadan sona yaz
+            out = open(dataset_file, 'a', encoding='utf-8')
+        
+        # Değişen dosyaları işle; yeni örnekler üretildikçe yazılır, bellekte birikmez
+        new_count = 0
+        with out:
+            for filepath in changed:
+                records = self.iter_raw_records(files=[filepath])
+                if workers == 1:
+                    examples = self.iter_training_examples(records)
+                else:
+                    examples = self.iter_training_examples_parallel(records, workers, chunk_size)
+                
+                file_ids = []
+                for example in examples:
+                    example['id'] = example_id(example)
+                    file_ids.append(example['id'])
+                    if example['id'] not in existing_ids:
+                        existing_ids.add(example['id'])
+                        out.write(json.dumps(example, ensure_ascii=False) + '\n')
+                        new_count += 1
+                current[filepath]['example_ids'] = file_ids
+        
+        if stale_ids:
+            os.replace(temp_file, dataset_file)
+        
+        manifest['files'] = current
+        manifest['dataset_file'] = dataset_file
+        manifest['settings'] = settings
+        self.save_manifest(manifest, manifest_path)
+        
+        # Ekleme yapıldıysa yalnızca yeni satırlar, yeniden yazıldıysa tümü indekslenir
+        self.update_index(dataset_file)
+        
+        elapsed = time.perf_counter() - start_time
+        print(f"✅ {new_count} yeni örnek eklendi, {len(stale_ids)} eski örnek çıkarıldı ({elapsed:.2f} sn)")
+        self.print_token_budget()
+        return dataset_file
+    
+    def print_token_budget(self):
+        """Token bütçesi sonuçlarını yazdır"""
+        summary = self.token_budget.summary()
+        print(f"🔢 Token bütçesi ({summary['tokenizer']}, {summary['max_tokens']} token): "
+              f"{summary['kept']} sığdı, {summary['truncated']} kırpıldı, {summary['dropped']} atıldı, "
+              f"toplam {summary['tokens']} token")
+    
+    def update_index(self, dataset_file):
+        """JSONL dosyasının bayt konumu indeksini güncelle (rastgele erişim/örnekleme için)"""
+        index = JsonlIndex(dataset_file)
+        added = index.refresh()
+        index.close()
+        print(f"🗂️ İndeks güncellendi: {dataset_file} ({len(index)} kayıt, {added} yeni)")
+        return index
     
-    def save_training_data(self, training_data, format_type="alpaca"):
-        """Eğitim verisini kaydet"""
+    def remove_near_duplicates(self, training_data, threshold=0.8, per_task_type=True, report_file=None):
+        """
+        MinHash/LSH ile yakın kopya örnekleri akış hâlinde çıkar; kaldırılan
+        kümelerin raporu akış tükendiğinde yazılır.
+        """
+        remover = NearDuplicateRemover(threshold=threshold, per_task_type=per_task_type)
+        yield from remover.filter(training_data)
+        report = remover.report()
+        
+        print(f"🧹 Yakın kopya temizliği: {report['removed']} örnek kaldırıldı, "
+              f"{report['cluster_count']} küme (eşik {threshold})")
+        
+        if report_file:
+            os.makedirs(os.path.dirname(report_file) or ".", exist_ok=True)
+            with open(report_file, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            print(f"📄 Kopya raporu: {report_file}")
+    
+    def save_training_data(self, training_data, format_type="alpaca", filepath=None):
+        """Eğitim verisini kaydet (filepath verilirse zaman damgalı ad yerine o yol üzerine yazılır)"""
         output_dir = "model_training_data"
         os.makedirs(output_dir, exist_ok=True)
         
@@ -168,7 +585,7 @@ class DataPreprocessor:
         if format_type == "alpaca":
             # Alpaca formatında kaydet
             filename = f"shopify_alpaca_training_{timestamp}.json"
-            filepath = os.path.join(output_dir, filename)
+            filepath = filepath or os.path.join(output_dir, filename)
             
             with open(filepath, 'w', encoding='utf-8') as f:
                 json.dump(training_data, f, ensure_ascii=False, indent=2)
@@ -176,7 +593,7 @@ class DataPreprocessor:
         elif format_type == "jsonl":
             # JSONL formatında kaydet (her satırda bir JSON)
             filename = f"shopify_training_{timestamp}.jsonl"
-            filepath = os.path.join(output_dir, filename)
+            filepath = filepath or os.path.join(output_dir, filename)
             
             with open(filepath, 'w', encoding='utf-8') as f:
                 for example in training_data:
@@ -185,99 +602,252 @@ class DataPreprocessor:
         elif format_type == "csv":
             # CSV formatında kaydet
             filename = f"shopify_training_{timestamp}.csv"
-            filepath = os.path.join(output_dir, filename)
+            filepath = filepath or os.path.join(output_dir, filename)
             
             df = pd.DataFrame(training_data)
             df.to_csv(filepath, index=False, encoding='utf-8')
         
+        elif format_type == "parquet":
+            # Parquet formatında kaydet (zstd, görev türü başına satır grubu)
+            filename = f"shopify_training_{timestamp}.parquet"
+            filepath = filepath or os.path.join(output_dir, filename)
+            
+            # Okuyucular yarım yazılmış dosya görmesin
+            temp_path = filepath + ".tmp"
+            columnar_store.write_parquet(training_data, temp_path)
+            os.replace(temp_path, filepath)
+        
+        elif format_type == "packed":
+            # Sabit uzunluklu paketlenmiş token dizileri (memmap parçaları)
+            # Kimlikler modelin sözlüğüyle eşleşmeli; tahmini tokenizer ile paketleme atlanır
+            # (byte kimlikleri yalnızca PREPROCESS_TOKENIZER=byte açıkça seçilirse yazılır)
+            tokenizer = self.token_budget.tokenizer
+            if not hasattr(tokenizer, 'encode'):
+                print(f"⚠️ Paketleme atlandı: {tokenizer.name} token kimliği üretmiyor "
+                      f"(PREPROCESS_TOKENIZER=tiktoken veya hf:<yol> ayarlayın)")
+                return None
+            
+            filepath = filepath or os.path.join(output_dir, f"shopify_packed_{timestamp}")
+            temp_dir = filepath + ".tmp"
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            
+            report = pack_examples(training_data, temp_dir, tokenizer, seq_len=self.token_budget.max_tokens,
+                                   overflow=self.token_budget.overflow)
+            # Önceki çalıştırmanın fazla parçaları kalmasın diye dizin bütün olarak değiştirilir
+            shutil.rmtree(filepath, ignore_errors=True)
+            os.replace(temp_dir, filepath)
+            print(f"📦 Paketleme: {report['examples']} örnek → {report['sequences']} dizi, "
+                  f"verim %{report['packing_efficiency'] * 100:.1f} (paketsiz %{report['unpacked_efficiency'] * 100:.1f})")
+        
         print(f"💾 Eğitim verisi kaydedildi: {filepath}")
         return filepath
     
-    def create_validation_split(self, training_data, validation_ratio=0.1):
-        """Eğitim ve doğrulama setlerini ayır"""
-        import random
-        
-        # Veriyi karıştır
-        random.shuffle(training_data)
+    def example_group_key(self, example):
+        """Örneğin bağlı olduğu ürün kimliği (eski verilerde çıktı metni)"""
+        return example.get('product_id') or example.get('output', '')
+    
+    def is_validation_example(self, example, validation_ratio=0.1, salt=""):
+        """
+        Örneği ürün kimliğinin özetine göre doğrulama setine ata.
+        Aynı ürünün tüm görev örnekleri aynı tarafa düşer, böylece setler
+        arası sızıntı olmaz; yeni veri eklemek mevcut atamaları değiştirmez.
+        """
+        return split_bucket(self.example_group_key(example), salt) < validation_ratio
+    
+    def stratum_key(self, example, stratify_by):
+        """
+        Örneğin tabakası. Görev türü gibi ürün içinde değişen alanlar aynı
+        ürünü iki tarafa bölebileceğinden reddedilir.
+        """
+        per_example = [field for field in stratify_by if field not in PRODUCT_LEVEL_FIELDS]
+        if per_example:
+            raise ValueError(f"Yalnızca ürün düzeyindeki alanlarla tabakalanabilir "
+                             f"({', '.join(PRODUCT_LEVEL_FIELDS)}): {', '.join(per_example)}")
+        return tuple(str(example.get(field, '')) for field in stratify_by)
+    
+    def allocate_validation_groups(self, examples, validation_ratio, stratify_by):
+        """
+        Tabakalı atama: her tabakadaki ürünler özetlerine göre sıralanır ve en
+        küçük round(oran × ürün sayısı) tanesi doğrulamaya ayrılır. Böylece her
+        tabaka oranı kesin olarak tutturur. Bellek ürün sayısıyla orantılıdır;
+        yeni ürünler eşiği kaydırabileceğinden sınırdaki birkaç ürün taraf
+        değiştirebilir. Döndürülen küme (tabaka, ürün kimliği) çiftleridir.
+        """
+        strata = {}
+        for example in examples:
+            group = self.example_group_key(example)
+            strata.setdefault(self.stratum_key(example, stratify_by), {})[group] = split_bucket(group)
+        
+        validation_groups = set()
+        for stratum, buckets in strata.items():
+            quota = round(validation_ratio * len(buckets))
+            for group in sorted(buckets, key=lambda g: (buckets[g], g))[:quota]:
+                validation_groups.add((stratum, group))
+        return validation_groups
+    
+    def create_validation_split(self, training_data, validation_ratio=0.1, stratify_by=None):
+        """Eğitim ve doğrulama setlerini ayır (kararlı, özet tabanlı)"""
+        train_data = []
+        val_data = []
         
-        # Bölme noktasını hesapla
-        split_index = int(len(training_data) * (1 - validation_ratio))
+        validation_groups = None
+        if stratify_by:
+            training_data = list(training_data)
+            validation_groups = self.allocate_validation_groups(training_data, validation_ratio, stratify_by)
         
-        train_data = training_data[:split_index]
-        val_data = training_data[split_index:]
+        for example in training_data:
+            if validation_groups is not None:
+                is_val = (self.stratum_key(example, stratify_by), self.example_group_key(example)) in validation_groups
+            else:
+                is_val = self.is_validation_example(example, validation_ratio)
+            (val_data if is_val else train_data).append(example)
         
         print(f"📊 Eğitim seti: {len(train_data)} örnek")
         print(f"📊 Doğrulama seti: {len(val_data)} örnek")
         
         return train_data, val_data
     
-    def generate_statistics(self, training_data):
-        """Veri istatistikleri oluştur"""
-        stats = {
-            'total_examples': len(training_data),
-            'task_types': {},
-            'avg_input_length': 0,
-            'avg_output_length': 0,
-            'output_length_distribution': {}
+    def write_validation_split(self, examples, train_file, val_file, validation_ratio=0.1, stratify_by=None):
+        """
+        Örnek akışını eğitim/doğrulama JSONL dosyalarına yaz. Tabakasız atama
+        tek geçişte ve sabit bellekle yapılır; görev türü ürün içinde
+        gruplandığından her görev türü oranı ürün düzeyindeki atamadan alır.
+        stratify_by verilirse akış önce geçici dosyaya yazılır, tabaka kotaları
+        hesaplanır (allocate_validation_groups) ve ikinci geçişte bölünür.
+        """
+        os.makedirs(os.path.dirname(train_file) or ".", exist_ok=True)
+        os.makedirs(os.path.dirname(val_file) or ".", exist_ok=True)
+        
+        validation_groups = None
+        # .tmp uzantısı: yarıda kalırsa eğitim verisi diye okunmasın
+        spool_file = train_file + ".unsplit.tmp"
+        if stratify_by:
+            self.stratum_key({}, stratify_by)  # Geçersiz alanları akışı yazmadan reddet
+            with open(spool_file, 'w', encoding='utf-8') as spool:
+                for example in examples:
+                    spool.write(json.dumps(example, ensure_ascii=False) + '\n')
+            validation_groups = self.allocate_validation_groups(iter_jsonl_file(spool_file),
+                                                                validation_ratio, stratify_by)
+            examples = iter_jsonl_file(spool_file)
+        
+        strata = {}
+        counts = {'train': 0, 'validation': 0}
+        
+        with open(train_file, 'w', encoding='utf-8') as train_out, open(val_file, 'w', encoding='utf-8') as val_out:
+            for example in examples:
+                if validation_groups is not None:
+                    is_val = (self.stratum_key(example, stratify_by), self.example_group_key(example)) in validation_groups
+                else:
+                    is_val = self.is_validation_example(example, validation_ratio)
+                (val_out if is_val else train_out).write(json.dumps(example, ensure_ascii=False) + '\n')
+                
+                side = 'validation' if is_val else 'train'
+                counts[side] += 1
+                stratum = f"{example.get('task_type', 'unknown')} / {example.get('category', '') or '-'}"
+                strata.setdefault(stratum, {'train': 0, 'validation': 0})[side] += 1
+        
+        if validation_groups is not None:
+            os.remove(spool_file)
+        
+        print(f"📊 Eğitim seti: {counts['train']} örnek → {train_file}")
+        print(f"📊 Doğrulama seti: {counts['validation']} örnek → {val_file}")
+        
+        self.update_index(train_file)
+        self.update_index(val_file)
+        
+        return {'validation_ratio': validation_ratio, 'stratify_by': list(stratify_by or ()),
+                'counts': counts, 'strata': strata}
+    
+    def commit_versions(self, train_file, val_file, store_dir="model_training_data/store"):
+        """
+        Eğitim/doğrulama setlerini içerik adresli depoya sürüm olarak kaydet
+        ve Alpaca dışa aktarımlarını sabit adlı dosyalara çıkar. Değişmeyen
+        kayıt parçaları yeniden yazılmaz.
+        """
+        store = DatasetStore(store_dir)
+        settings = self.token_budget.settings()
+        versions = {
+            'train': store.commit(self.iter_file_records(train_file), name='train', metadata={'split': 'train', **settings}),
+            'val': store.commit(self.iter_file_records(val_file), name='val', metadata={'split': 'val', **settings})
         }
         
-        total_input_length = 0
-        total_output_length = 0
-        output_lengths = []
+        output_dir = os.path.dirname(train_file) or "."
+        store.checkout(versions['train'], os.path.join(output_dir, "shopify_alpaca_train.json"), "alpaca")
+        store.checkout(versions['val'], os.path.join(output_dir, "shopify_alpaca_val.json"), "alpaca")
         
-        for example in training_data:
-            # Görev türü istatistikleri
-            task_type = example.get('task_type', 'unknown')
-            stats['task_types'][task_type] = stats['task_types'].get(task_type, 0) + 1
-            
-            # Uzunluk istatistikleri
-            input_length = len(example.get('input', '') + example.get('instruction', ''))
-            output_length = len(example.get('output', ''))
-            
-            total_input_length += input_length
-            total_output_length += output_length
-            output_lengths.append(output_length)
+        usage = store.disk_usage()
+        print(f"💾 Veri deposu: {usage['objects']} parça, {usage['bytes'] / 1024 / 1024:.1f} MB")
+        return versions
+    
+    def generate_statistics(self, training_data):
+        """Veri istatistikleri oluştur (liste, akış, DataFrame veya Parquet yolu; tek geçiş)"""
+        if isinstance(training_data, str) and training_data.endswith('.parquet'):
+            return columnar_store.parquet_statistics(training_data)
         
-        stats['avg_input_length'] = total_input_length / len(training_data) if training_data else 0
-        stats['avg_output_length'] = total_output_length / len(training_data) if training_data else 0
+        stats = DatasetStatistics()
         
-        # Çıktı uzunluk dağılımı
-        if output_lengths:
-            stats['min_output_length'] = min(output_lengths)
-            stats['max_output_length'] = max(output_lengths)
-            stats['median_output_length'] = sorted(output_lengths)[len(output_lengths)//2]
+        if isinstance(training_data, pd.DataFrame):
+            stats.update_dataframe(training_data)
+        else:
+            stats.update(training_data)
         
-        return stats
+        return stats.to_dict()
 
 def main():
     """Ana fonksiyon"""
     print("🚀 Shopify veri ön işleme başlıyor...")
     
-    preprocessor = DataPreprocessor()
+    max_tokens = os.getenv('PREPROCESS_MAX_TOKENS')
+    preprocessor = DataPreprocessor(
+        tokenizer=os.getenv('PREPROCESS_TOKENIZER'),
+        max_tokens=int(max_tokens) if max_tokens else None,
+        overflow=os.getenv('PREPROCESS_OVERFLOW', 'truncate')
+    )
+    workers = int(os.getenv('PREPROCESS_WORKERS', str(os.cpu_count() or 1)))
     
     try:
-        # Veriyi işle
-        training_data = preprocessor.process_data()
+        # Veriyi işle (yalnızca yeni/değişmiş ham dosyalar)
+        dataset_file = preprocessor.process_incremental(workers=workers)
         
-        if not training_data:
+        if not os.path.exists(dataset_file) or os.path.getsize(dataset_file) == 0:
             print("❌ İşlenecek veri bulunamadı!")
             return
         
-        # Eğitim ve doğrulama setlerini ayır
-        train_data, val_data = preprocessor.create_validation_split(training_data)
+        # Akış: veri seti → yakın kopya temizliği → eğitim/doğrulama yazıcısı (bellek sabit)
+        dedup_threshold = float(os.getenv('DEDUP_THRESHOLD', '0.8'))
+        training_data = preprocessor.remove_near_duplicates(
+            preprocessor.iter_file_records(dataset_file),
+            threshold=dedup_threshold,
+            report_file="model_training_data/dedup_report.json"
+        )
         
-        # Farklı formatlarda kaydet
-        print("💾 Eğitim verisi kaydediliyor...")
-        preprocessor.save_training_data(train_data, "alpaca")
-        preprocessor.save_training_data(train_data, "jsonl")
-        
-        # Doğrulama setini kaydet
-        preprocessor.save_training_data(val_data, "alpaca")
+        # Eğitim ve doğrulama setlerini ürün kimliğine göre kararlı şekilde ayır (kategori başına oran tutturulur)
+        train_file = "model_training_data/shopify_train.jsonl"
+        val_file = "model_training_data/shopify_val.jsonl"
+        split_stats = preprocessor.write_validation_split(training_data, train_file, val_file, stratify_by=('category',))
         
-        # İstatistikleri oluştur ve kaydet
-        stats = preprocessor.generate_statistics(training_data)
-        
-        stats_file = f"model_training_data/data_statistics_{datetime.now().strftime('%Y%m%d_%H%M')}.json"
+        # Sürümleri kaydet (her çalıştırmada zaman damgalı kopya yerine)
+        print("💾 Eğitim verisi kaydediliyor...")
+        versions = preprocessor.commit_versions(train_file, val_file)
+        
+        # Ek formatlar (yazıcılar eğitim dosyasını akış hâlinde okur); sabit adlar
+        # her çalıştırmada üzerine yazılır, geçmiş sürümler depoda tutulur
+        if columnar_store.PYARROW_AVAILABLE:
+            preprocessor.save_training_data(preprocessor.iter_file_records(train_file), "parquet",
+                                            "model_training_data/shopify_train.parquet")
+        if os.getenv('PACK_SEQUENCES', '').lower() in ('1', 'true', 'yes'):
+            preprocessor.save_training_data(preprocessor.iter_file_records(train_file), "packed",
+                                            "model_training_data/shopify_packed")
+        
+        # İstatistikleri oluştur ve kaydet (temizlenmiş veri = eğitim + doğrulama)
+        stats = preprocessor.generate_statistics(
+            chain(preprocessor.iter_file_records(train_file), preprocessor.iter_file_records(val_file))
+        )
+        stats['split'] = split_stats
+        stats['dataset_versions'] = versions
+        stats['token_budget'] = preprocessor.token_budget.summary()
+        
+        stats_file = "model_training_data/data_statistics.json"
         with open(stats_file, 'w', encoding='utf-8') as f:
             json.dump(stats, f, ensure_ascii=False, indent=2)
         
@@ -286,6 +856,8 @@ def main():
         print(f"  - Ortalama giriş uzunluğu: {stats['avg_input_length']:.1f}")
         print(f"  - Ortalama çıkış uzunluğu: {stats['avg_output_length']:.1f}")
         print(f"  - Görev türleri: {stats['task_types']}")
+        if stats.get('token_length_distribution'):
+            print(f"  - Ortalama token: {stats['avg_token_count']:.1f} (p95 {stats['token_length_distribution']['quantiles']['p95']})")
         
         print("✅ Veri ön işleme tamamlandı!")
         
@@ -0,0 +1,227 @@
+"""
+Eğitim verisi istatistik motoru
+Uzunluk dağılımlarını tek geçişte, NumPy ile toplu olarak hesaplar.
+Hem bellekteki listeler / sütunlu tablolar hem de akışlar üzerinde
+artımlı çalışır: sayım, ortalama, yüzdelikler (p5-p99), histogram ve
+görev türü / kategori kırılımları.
+"""
+
+import math
+
+import numpy as np
+
+QUANTILES = (0.05, 0.10, 0.25, 0.50, 0.75, 0.90, 0.95, 0.99)
+HISTOGRAM_EDGES = (0, 50, 100, 200, 400, 800, 1600, 3200, 6400)
+TOKEN_HISTOGRAM_EDGES = (0, 64, 128, 256, 512, 1024, 2048, 4096, 8192)
+LOG_BUCKET_BASE = 1.02
+BATCH_SIZE = 10000
+
+
+class LengthDistribution:
+    """
+    Tam sayı uzunlukların dağılımı.
+    exact=True: her uzunluk için ayrı sayaç (kesin yüzdelikler)
+    exact=False: %2 genişlikli logaritmik kovalar (kırılımlar için sabit bellek)
+    """
+
+    def __init__(self, exact=True):
+        self.exact = exact
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.total = 0
+        self.sum = 0
+        self.min = None
+        self.max = None
+
+    def _bucket(self, lengths):
+        if self.exact:
+            return lengths
+        return np.floor(np.log1p(lengths) / math.log(LOG_BUCKET_BASE)).astype(np.int64)
+
+    def _bucket_value(self, buckets):
+        if self.exact:
+            return buckets
+        return np.expm1(buckets * math.log(LOG_BUCKET_BASE))
+
+    def update(self, lengths):
+        lengths = np.asarray(lengths, dtype=np.int64)
+        if lengths.size == 0:
+            return
+
+        buckets = self._bucket(lengths)
+        batch_counts = np.bincount(buckets)
+        if len(batch_counts) > len(self.counts):
+            self.counts = np.pad(self.counts, (0, len(batch_counts) - len(self.counts)))
+        self.counts[:len(batch_counts)] += batch_counts
+
+        self.total += int(lengths.size)
+        self.sum += int(lengths.sum())
+        batch_min, batch_max = int(lengths.min()), int(lengths.max())
+        self.min = batch_min if self.min is None else min(self.min, batch_min)
+        self.max = batch_max if self.max is None else max(self.max, batch_max)
+
+    def merge(self, other):
+        if other.total == 0:
+            return
+        if len(other.counts) > len(self.counts):
+            self.counts = np.pad(self.counts, (0, len(other.counts) - len(self.counts)))
+        self.counts[:len(other.counts)] += other.counts
+        self.total += other.total
+        self.sum += other.sum
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+
+    @property
+    def mean(self):
+        return self.sum / self.total if self.total else 0
+
+    def quantiles(self, quantiles=QUANTILES):
+        if not self.total:
+            return {}
+        cumulative = np.cumsum(self.counts)
+        ranks = np.ceil(np.asarray(quantiles) * self.total).clip(1, self.total)
+        buckets = np.searchsorted(cumulative, ranks)
+        values = self._bucket_value(buckets)
+        cast = int if self.exact else (lambda v: float(round(v, 1)))
+        return {f"p{int(round(q * 100))}": cast(v) for q, v in zip(quantiles, values)}
+
+    def histogram(self, edges=HISTOGRAM_EDGES):
+        """Sabit sınırlı kova sayıları: {'0-49': n, ..., '6400+': n}"""
+        if not self.total:
+            return {}
+        values = self._bucket_value(np.arange(len(self.counts)))
+        positions = np.searchsorted(edges, values, side='right') - 1
+        counts = np.bincount(positions, weights=self.counts, minlength=len(edges))
+        labels = [f"{edges[i]}-{edges[i + 1] - 1}" for i in range(len(edges) - 1)] + [f"{edges[-1]}+"]
+        return {label: int(count) for label, count in zip(labels, counts)}
+
+    def summary(self):
+        return {
+            'count': self.total,
+            'mean': round(self.mean, 2),
+            'min': self.min,
+            'max': self.max,
+            'quantiles': self.quantiles(),
+            'histogram': self.histogram()
+        }
+
+
+class DatasetStatistics:
+    """Eğitim örneklerinin artımlı istatistikleri"""
+
+    def __init__(self, group_fields=('task_type', 'category')):
+        self.group_fields = group_fields
+        self.input_lengths = LengthDistribution(exact=True)
+        self.output_lengths = LengthDistribution(exact=True)
+        self.token_counts = LengthDistribution(exact=True)
+        self.groups = {field: {} for field in group_fields}
+        self.extra = {}
+
+    def _group(self, field, value):
+        groups = self.groups[field]
+        if value not in groups:
+            groups[value] = {
+                'input': LengthDistribution(exact=False),
+                'output': LengthDistribution(exact=False)
+            }
+        return groups[value]
+
+    def update_columns(self, input_lengths, output_lengths, group_values=None, token_counts=None):
+        """Sütunlu (dizi) veriyle güncelle; group_values alan -> değer dizisi"""
+        input_lengths = np.asarray(input_lengths, dtype=np.int64)
+        output_lengths = np.asarray(output_lengths, dtype=np.int64)
+        self.input_lengths.update(input_lengths)
+        self.output_lengths.update(output_lengths)
+        if token_counts is not None:
+            self.token_counts.update(token_counts)
+
+        for field, values in (group_values or {}).items():
+            if field not in self.groups:
+                continue
+            keys, codes = np.unique(np.asarray(values, dtype=object).astype(str), return_inverse=True)
+            for code, key in enumerate(keys):
+                mask = codes == code
+                group = self._group(field, str(key))
+                group['input'].update(input_lengths[mask])
+                group['output'].update(output_lengths[mask])
+
+    def update(self, examples, batch_size=BATCH_SIZE):
+        """Örnek akışını toplu parçalar halinde tüket"""
+        batch = []
+        for example in examples:
+            batch.append(example)
+            if len(batch) >= batch_size:
+                self._update_batch(batch)
+                batch = []
+        if batch:
+            self._update_batch(batch)
+        return self
+
+    def _update_batch(self, batch):
+        input_lengths = [len(e.get('input', '') or '') + len(e.get('instruction', '') or '') for e in batch]
+        output_lengths = [len(e.get('output', '') or '') for e in batch]
+        group_values = {
+            field: [e.get(field) or ('unknown' if field == 'task_type' else '-') for e in batch]
+            for field in self.group_fields
+        }
+        # Eski örneklerde token sayısı olmayabilir
+        token_counts = [e['token_count'] for e in batch if e.get('token_count') is not None]
+        self.update_columns(input_lengths, output_lengths, group_values, token_counts)
+
+    def update_dataframe(self, df):
+        """pandas DataFrame'inden sütun bazında güncelle"""
+        input_lengths = df['instruction'].fillna('').str.len().to_numpy()
+        if 'input' in df:
+            input_lengths = input_lengths + df['input'].fillna('').str.len().to_numpy()
+        output_lengths = df['output'].fillna('').str.len().to_numpy()
+        group_values = {
+            field: df[field].fillna('unknown' if field == 'task_type' else '-').to_numpy()
+            for field in self.group_fields if field in df
+        }
+        token_counts = df['token_count'].dropna().to_numpy() if 'token_count' in df else None
+        self.update_columns(input_lengths, output_lengths, group_values, token_counts)
+        return self
+
+    def to_dict(self):
+        """generate_statistics ile uyumlu sözlük"""
+        output = self.output_lengths
+        stats = {
+            'total_examples': output.total,
+            'task_types': {
+                key: group['output'].total for key, group in sorted(self.groups.get('task_type', {}).items())
+            },
+            'avg_input_length': self.input_lengths.mean,
+            'avg_output_length': output.mean,
+            'output_length_distribution': {
+                'quantiles': output.quantiles(),
+                'histogram': output.histogram()
+            },
+            'input_length_distribution': {
+                'quantiles': self.input_lengths.quantiles(),
+                'histogram': self.input_lengths.histogram()
+            }
+        }
+
+        if output.total:
+            stats['min_output_length'] = output.min
+            stats['max_output_length'] = output.max
+            stats['median_output_length'] = output.quantiles((0.5,))['p50']
+
+        tokens = self.token_counts
+        if tokens.total:
+            stats['avg_token_count'] = tokens.mean
+            stats['total_tokens'] = tokens.sum
+            stats['max_token_count'] = tokens.max
+            stats['token_length_distribution'] = {
+                'count': tokens.total,
+                'quantiles': tokens.quantiles(),
+                'histogram': tokens.histogram(TOKEN_HISTOGRAM_EDGES)
+            }
+
+        for field, groups in self.groups.items():
+            stats[f'by_{field}'] = {
+                key: {'input': group['input'].summary(), 'output': group['output'].summary()}
+                for key, group in sorted(groups.items())
+            }
+
+        stats.update(self.extra)
+        return stats
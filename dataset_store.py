@@ -0,0 +1,309 @@
+"""
+İçerik adresli veri seti sürümleme
+Kayıtlar içerik tanımlı parçalara (content-defined chunking) bölünür: parça
+sınırı, kaydın özetine göre belirlenir. Böylece araya eklenen veya silinen
+kayıtlar yalnızca komşu parçaları değiştirir, geri kalan parçalar aynı
+özetle yeniden kullanılır. Her parça bir kez, gzip ile objects/ altında
+saklanır; bir sürüm yalnızca parça özetlerinden oluşan bir manifestodur.
+Disk kullanımı çalıştırma sayısıyla değil yeni veriyle büyür; sürüm
+çıkarma (checkout) ve fark (diff) parça düzeyinde ucuzdur.
+
+Dizin yapısı:
+  objects/ab/cdef...   gzip'li JSONL parçaları (SHA-256 adlı)
+  versions/<id>.json   sürüm manifestoları
+  refs.json            adlandırılmış referanslar (ör. train -> <id>)
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+from datetime import datetime
+
+DEFAULT_STORE_DIR = "model_training_data/store"
+# Ortalama parça boyutu (kayıt); sınır olasılığı 1 / AVERAGE_CHUNK_RECORDS
+AVERAGE_CHUNK_RECORDS = 256
+MIN_CHUNK_RECORDS = 32
+MAX_CHUNK_RECORDS = 2048
+
+
+def canonical_line(record):
+    """Kaydın kararlı JSONL satırı (anahtar sırası sabit)"""
+    return json.dumps(record, ensure_ascii=False, sort_keys=True) + '\n'
+
+
+def iter_record_chunks(records, average=AVERAGE_CHUNK_RECORDS, minimum=MIN_CHUNK_RECORDS, maximum=MAX_CHUNK_RECORDS):
+    """Kayıtları içerik tanımlı parçalara (JSONL satır listelerine) böl"""
+    lines = []
+    for record in records:
+        line = canonical_line(record)
+        lines.append(line)
+
+        digest = hashlib.sha1(line.encode('utf-8')).digest()
+        at_boundary = int.from_bytes(digest[:4], 'big') % average == 0
+        if (len(lines) >= minimum and at_boundary) or len(lines) >= maximum:
+            yield lines
+            lines = []
+
+    if lines:
+        yield lines
+
+
+class DatasetStore:
+    """Parça deposu, sürüm manifestoları ve referanslar"""
+
+    def __init__(self, root=DEFAULT_STORE_DIR):
+        self.root = root
+        self.objects_dir = os.path.join(root, "objects")
+        self.versions_dir = os.path.join(root, "versions")
+        self.refs_path = os.path.join(root, "refs.json")
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.versions_dir, exist_ok=True)
+
+    # Parçalar
+
+    def _object_path(self, chunk_id):
+        return os.path.join(self.objects_dir, chunk_id[:2], chunk_id[2:])
+
+    def _write_chunk(self, lines):
+        """Parçayı yoksa yaz; (parça kimliği, yeni mi, sıkıştırılmış boyut)"""
+        data = ''.join(lines).encode('utf-8')
+        chunk_id = hashlib.sha256(data).hexdigest()
+        path = self._object_path(chunk_id)
+        if os.path.exists(path):
+            return chunk_id, False, 0
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = path + ".tmp"
+        # mtime=0: aynı içerik her zaman aynı baytlara sıkışır
+        with open(temp_path, 'wb') as f:
+            f.write(gzip.compress(data, mtime=0))
+        os.replace(temp_path, path)
+        return chunk_id, True, os.path.getsize(path)
+
+    def read_chunk(self, chunk_id):
+        with open(self._object_path(chunk_id), 'rb') as f:
+            return gzip.decompress(f.read()).decode('utf-8').splitlines(keepends=True)
+
+    # Sürümler
+
+    def commit(self, records, name=None, metadata=None):
+        """
+        Kayıt akışını sürüm olarak kaydet ve sürüm kimliğini döndür.
+        Sürüm kimliği parça listesinin özetidir: aynı veri aynı sürüm olur.
+        """
+        chunks = []
+        new_chunks = 0
+        new_bytes = 0
+        record_count = 0
+
+        for lines in iter_record_chunks(records):
+            chunk_id, is_new, size = self._write_chunk(lines)
+            chunks.append({'id': chunk_id, 'records': len(lines)})
+            new_chunks += is_new
+            new_bytes += size
+            record_count += len(lines)
+
+        version_id = hashlib.sha256(
+            json.dumps([chunk['id'] for chunk in chunks]).encode('utf-8')
+        ).hexdigest()[:16]
+
+        version_path = os.path.join(self.versions_dir, f"{version_id}.json")
+        if not os.path.exists(version_path):
+            manifest = {
+                'version': version_id,
+                'created_at': datetime.now().isoformat(),
+                'record_count': record_count,
+                'metadata': metadata or {},
+                'chunks': chunks
+            }
+            with open(version_path + ".tmp", 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, ensure_ascii=False)
+            os.replace(version_path + ".tmp", version_path)
+
+        if name:
+            self.tag(name, version_id)
+
+        print(f"📦 Sürüm {version_id}{f' ({name})' if name else ''}: {record_count} kayıt, "
+              f"{len(chunks)} parça ({new_chunks} yeni, {new_bytes / 1024:.1f} KB)")
+        return version_id
+
+    def load_version(self, ref):
+        version_id = self.resolve(ref)
+        with open(os.path.join(self.versions_dir, f"{version_id}.json"), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def list_versions(self):
+        versions = []
+        for filename in os.listdir(self.versions_dir):
+            if filename.endswith('.json'):
+                with open(os.path.join(self.versions_dir, filename), 'r', encoding='utf-8') as f:
+                    manifest = json.load(f)
+                versions.append({key: manifest[key] for key in ('version', 'created_at', 'record_count', 'metadata')})
+        return sorted(versions, key=lambda version: version['created_at'])
+
+    def iter_records(self, ref):
+        for chunk in self.load_version(ref)['chunks']:
+            for line in self.read_chunk(chunk['id']):
+                yield json.loads(line)
+
+    def checkout(self, ref, output_path, format_type="jsonl"):
+        """Sürümü dosyaya çıkar (jsonl veya alpaca JSON dizisi)"""
+        manifest = self.load_version(ref)
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        temp_path = output_path + ".tmp"
+
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            if format_type == "jsonl":
+                # Parça satırları zaten JSONL; yeniden ayrıştırmaya gerek yok
+                for chunk in manifest['chunks']:
+                    f.writelines(self.read_chunk(chunk['id']))
+            elif format_type == "alpaca":
+                f.write('[\n')
+                first = True
+                for chunk in manifest['chunks']:
+                    for line in self.read_chunk(chunk['id']):
+                        f.write(('' if first else ',\n') + line.rstrip('\n'))
+                        first = False
+                f.write('\n]\n')
+            else:
+                raise ValueError(f"Bilinmeyen format: {format_type}")
+
+        os.replace(temp_path, output_path)
+        return output_path
+
+    def diff(self, old_ref, new_ref):
+        """İki sürüm arasındaki eklenen/silinen kayıt ve parça sayıları"""
+        old = self.load_version(old_ref)
+        new = self.load_version(new_ref)
+        old_chunks = {chunk['id'] for chunk in old['chunks']}
+        new_chunks = {chunk['id'] for chunk in new['chunks']}
+
+        # Yalnızca farklı parçalar açılır; ortak parçalar aynı kayıtları içerir
+        old_records = {line for chunk_id in old_chunks - new_chunks for line in self.read_chunk(chunk_id)}
+        new_records = {line for chunk_id in new_chunks - old_chunks for line in self.read_chunk(chunk_id)}
+
+        return {
+            'old': old['version'],
+            'new': new['version'],
+            'shared_chunks': len(old_chunks & new_chunks),
+            'added_chunks': len(new_chunks - old_chunks),
+            'removed_chunks': len(old_chunks - new_chunks),
+            'added_records': len(new_records - old_records),
+            'removed_records': len(old_records - new_records)
+        }
+
+    # Referanslar
+
+    def _load_refs(self):
+        if os.path.exists(self.refs_path):
+            with open(self.refs_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        return {}
+
+    def tag(self, name, version_id):
+        refs = self._load_refs()
+        refs[name] = version_id
+        with open(self.refs_path + ".tmp", 'w', encoding='utf-8') as f:
+            json.dump(refs, f, indent=2)
+        os.replace(self.refs_path + ".tmp", self.refs_path)
+
+    def resolve(self, ref):
+        """Referans adını veya (kısa) sürüm kimliğini tam sürüm kimliğine çevir"""
+        refs = self._load_refs()
+        if ref in refs:
+            return refs[ref]
+        matches = [filename[:-5] for filename in os.listdir(self.versions_dir)
+                   if filename.endswith('.json') and filename.startswith(ref)]
+        if len(matches) == 1:
+            return matches[0]
+        raise KeyError(f"Sürüm bulunamadı veya belirsiz: {ref}")
+
+    def gc(self, keep=None):
+        """
+        Referanssız sürümleri (keep verilirse en yeni keep tanesi hariç) sil,
+        hiçbir sürümün kullanmadığı parçaları temizle.
+        """
+        referenced = set(self._load_refs().values())
+        if keep is not None:
+            versions = self.list_versions()
+            for version in versions[:max(0, len(versions) - keep)]:
+                if version['version'] not in referenced:
+                    os.remove(os.path.join(self.versions_dir, f"{version['version']}.json"))
+
+        live = set()
+        for filename in os.listdir(self.versions_dir):
+            if filename.endswith('.json'):
+                with open(os.path.join(self.versions_dir, filename), 'r', encoding='utf-8') as f:
+                    live.update(chunk['id'] for chunk in json.load(f)['chunks'])
+
+        removed = 0
+        for prefix in os.listdir(self.objects_dir):
+            for name in os.listdir(os.path.join(self.objects_dir, prefix)):
+                if prefix + name not in live:
+                    os.remove(os.path.join(self.objects_dir, prefix, name))
+                    removed += 1
+        return removed
+
+    def disk_usage(self):
+        total = 0
+        count = 0
+        for prefix in os.listdir(self.objects_dir):
+            for name in os.listdir(os.path.join(self.objects_dir, prefix)):
+                total += os.path.getsize(os.path.join(self.objects_dir, prefix, name))
+                count += 1
+        return {'objects': count, 'bytes': total}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="İçerik adresli veri seti sürümleri")
+    parser.add_argument("--store", default=os.getenv('DATASET_STORE_DIR', DEFAULT_STORE_DIR))
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    commit = subparsers.add_parser("commit", help="JSON/JSONL dosyasını sürüm olarak kaydet")
+    commit.add_argument("file")
+    commit.add_argument("--tag")
+
+    subparsers.add_parser("list", help="Sürümleri ve referansları listele")
+
+    checkout = subparsers.add_parser("checkout", help="Sürümü dosyaya çıkar")
+    checkout.add_argument("ref")
+    checkout.add_argument("output")
+    checkout.add_argument("--format", default="jsonl", choices=["jsonl", "alpaca"])
+
+    diff = subparsers.add_parser("diff", help="İki sürümü karşılaştır")
+    diff.add_argument("old")
+    diff.add_argument("new")
+
+    gc = subparsers.add_parser("gc", help="Kullanılmayan parçaları temizle")
+    gc.add_argument("--keep", type=int, help="Referanssız sürümlerden en yeni N tanesini tut")
+
+    args = parser.parse_args()
+    store = DatasetStore(args.store)
+
+    if args.command == "commit":
+        from data_preprocessor import DataPreprocessor
+        store.commit(DataPreprocessor().iter_file_records(args.file), name=args.tag,
+                     metadata={'source': os.path.basename(args.file)})
+
+    elif args.command == "list":
+        refs = store._load_refs()
+        for version in store.list_versions():
+            names = [name for name, version_id in refs.items() if version_id == version['version']]
+            print(f"{version['version']}  {version['created_at'][:19]}  {version['record_count']:>8} kayıt  {', '.join(names)}")
+        usage = store.disk_usage()
+        print(f"💾 {usage['objects']} parça, {usage['bytes'] / 1024 / 1024:.1f} MB")
+
+    elif args.command == "checkout":
+        print(f"✅ {store.checkout(args.ref, args.output, args.format)}")
+
+    elif args.command == "diff":
+        print(json.dumps(store.diff(args.old, args.new), indent=2))
+
+    elif args.command == "gc":
+        print(f"🧹 {store.gc(args.keep)} parça silindi")
+
+
+if __name__ == "__main__":
+    main()
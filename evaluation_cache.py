@@ -0,0 +1,95 @@
+"""
+Değerlendirme sonuç önbelleği
+Model çıktıları ve üretim ölçümleri (model özeti, istem özeti, örnekleme
+parametreleri özeti) anahtarıyla SQLite'ta saklanır. Model ve istem
+değişmedikçe yeniden çalıştırmalar çıkarım yapmaz; puanlama kuralları
+önbellekteki çıktılara her seferinde yeniden uygulanır, böylece kurallar
+üzerinde çalışmak çıkarım maliyeti getirmez.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_CACHE_PATH = "model_training_data/evaluation_cache.db"
+
+
+def content_hash(value):
+    """Metin veya JSON'a çevrilebilir değer için kararlı SHA-256"""
+    if not isinstance(value, str):
+        value = json.dumps(value or {}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(value.encode('utf-8')).hexdigest()
+
+
+class EvaluationCache:
+    """(model özeti, istem özeti, parametre özeti) → çıktı ve ölçümler"""
+
+    def __init__(self, db_path=DEFAULT_CACHE_PATH, timeout=30):
+        self.db_path = db_path
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._connect().execute("""
+            CREATE TABLE IF NOT EXISTS evaluations (
+                model_digest TEXT NOT NULL,
+                prompt_hash TEXT NOT NULL,
+                params_hash TEXT NOT NULL,
+                model TEXT,
+                prompt TEXT,
+                params TEXT,
+                output TEXT NOT NULL,
+                metrics TEXT,
+                created_at REAL,
+                PRIMARY KEY (model_digest, prompt_hash, params_hash)
+            )
+        """)
+
+    def _connect(self):
+        # İş parçacığı başına bir bağlantı (değerlendirici paralel çalışır)
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=self.timeout, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def get(self, model_digest, prompt, params=None):
+        """Önbellekteki {'output', 'metrics'} veya None"""
+        row = self._connect().execute(
+            "SELECT output, metrics FROM evaluations WHERE model_digest = ? AND prompt_hash = ? AND params_hash = ?",
+            (model_digest, content_hash(prompt), content_hash(params))
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return {'output': row[0], 'metrics': json.loads(row[1]) if row[1] else {}}
+
+    def put(self, model_digest, prompt, output, metrics=None, params=None, model=None):
+        self._connect().execute(
+            """INSERT OR REPLACE INTO evaluations
+               (model_digest, prompt_hash, params_hash, model, prompt, params, output, metrics, created_at)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            (model_digest, content_hash(prompt), content_hash(params), model, prompt,
+             json.dumps(params or {}, sort_keys=True), output, json.dumps(metrics or {}), time.time())
+        )
+
+    def prune(self, keep_digests):
+        """Verilen model özetleri dışındaki kayıtları sil"""
+        keep_digests = list(keep_digests)
+        placeholders = ", ".join("?" for _ in keep_digests) or "''"
+        cursor = self._connect().execute(
+            f"DELETE FROM evaluations WHERE model_digest NOT IN ({placeholders})", keep_digests
+        )
+        return cursor.rowcount
+
+    def count(self, model_digest=None):
+        if model_digest is None:
+            return self._connect().execute("SELECT COUNT(*) FROM evaluations").fetchone()[0]
+        return self._connect().execute(
+            "SELECT COUNT(*) FROM evaluations WHERE model_digest = ?", (model_digest,)
+        ).fetchone()[0]
@@ -0,0 +1,314 @@
+"""
+JSONL veri setleri için bayt konumu (offset) indeksi
+Her kaydın başlangıç ve bitiş konumu yan dosyaya (<dosya>.idx) 64 bit olarak,
+isteğe bağlı kayıt özetleri (görev türü, uzunluk, dil) <dosya>.idx.meta
+dosyasına yazılır. Dosyanın sonuna ekleme yapıldığında yalnızca yeni
+satırlar indekslenir. Okuyucu JSONL'i mmap ile açar; herhangi bir kayda
+veya filtrelenmiş alt kümeye tüm dosyayı yüklemeden sabit sürede erişir.
+"""
+
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import random
+from array import array
+
+import numpy as np
+
+from quality_filter import detect_language
+
+DEFAULT_METADATA_FIELDS = ('task_type', 'category')
+INDEX_VERSION = 2
+
+
+class JsonlIndex:
+    """JSONL dosyası üzerinde artımlı satır indeksi ve rastgele erişim"""
+
+    def __init__(self, path, metadata_fields=DEFAULT_METADATA_FIELDS, length_field='output', language=False):
+        self.path = path
+        self.index_path = path + ".idx"
+        self.meta_path = path + ".idx.meta"
+        self.info_path = path + ".idx.info"
+        self.metadata_fields = tuple(metadata_fields)
+        self.length_field = length_field
+        self.language = language
+
+        self.offsets = np.zeros(0, dtype=np.uint64)
+        self.ends = np.zeros(0, dtype=np.uint64)
+        self.metadata = []
+        self.indexed_bytes = 0
+        self._columns = {}
+        self._file = None
+        self._mmap = None
+
+    # İndeks dosyaları
+
+    def _settings(self):
+        return {
+            'version': INDEX_VERSION,
+            'metadata_fields': list(self.metadata_fields),
+            'length_field': self.length_field,
+            'language': self.language
+        }
+
+    def _load_info(self):
+        try:
+            with open(self.info_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def _is_consistent(self, info):
+        """İndeks hâlâ dosyanın bir önekini mi tarif ediyor?"""
+        if not info or info.get('settings') != self._settings():
+            return False
+        if not os.path.exists(self.index_path) or not os.path.exists(self.meta_path):
+            return False
+        if os.path.getsize(self.index_path) != info['count'] * 16:
+            return False
+        if os.path.getsize(self.path) < info['indexed_bytes']:
+            return False
+        if info['count'] == 0:
+            return True
+
+        # Son indekslenen satır değişmediyse dosya yalnızca sona eklenmiştir
+        with open(self.path, 'rb') as f:
+            f.seek(info['tail_offset'])
+            tail = f.read(info['indexed_bytes'] - info['tail_offset'])
+        return hashlib.sha1(tail).hexdigest() == info['tail_sha1']
+
+    def _record_metadata(self, record):
+        meta = {field: record.get(field) for field in self.metadata_fields}
+        if self.length_field:
+            meta['length'] = len(record.get(self.length_field, '') or '')
+        if self.language:
+            meta['language'] = detect_language(record.get(self.length_field, '') or '')
+        return meta
+
+    def refresh(self):
+        """Yeni eklenen satırları indeksle; dosya başka şekilde değiştiyse baştan kur"""
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(self.path)
+
+        info = self._load_info()
+        if not self._is_consistent(info):
+            info = {'settings': self._settings(), 'count': 0, 'indexed_bytes': 0, 'tail_offset': 0, 'tail_sha1': None}
+            for stale in (self.index_path, self.meta_path):
+                if os.path.exists(stale):
+                    os.remove(stale)
+
+        new_offsets = array('Q')
+        new_metadata = []
+        position = info['indexed_bytes']
+
+        with open(self.path, 'rb') as f:
+            f.seek(position)
+            for line in f:
+                # Yazımı süren son satır tamamlanana kadar indekslenmez
+                if not line.endswith(b'\n'):
+                    break
+                if line.strip():
+                    try:
+                        record = json.loads(line)
+                        # Bitiş de saklanır: atlanan bozuk satır önceki kaydın dilimine girmez
+                        new_offsets.extend((position, position + len(line)))
+                        new_metadata.append(self._record_metadata(record))
+                    except json.JSONDecodeError:
+                        print(f"⚠️ Bozuk satır atlandı: {self.path} @ {position}")
+                position += len(line)
+
+        loaded_count = info['count']
+        self._write_increment(info, new_offsets, new_metadata, position)
+        self._extend(loaded_count, new_offsets, new_metadata, position)
+        return len(new_metadata)
+
+    def _write_increment(self, info, new_offsets, new_metadata, position):
+        with open(self.index_path, 'ab') as f:
+            new_offsets.tofile(f)
+        with open(self.meta_path, 'a', encoding='utf-8') as f:
+            for meta in new_metadata:
+                f.write(json.dumps(meta, ensure_ascii=False) + '\n')
+
+        info['count'] += len(new_metadata)
+        info['indexed_bytes'] = position
+        if new_offsets:
+            info['tail_offset'] = new_offsets[-2]
+        if info['count']:
+            # Son kayıttan indekslenen sona kadar olan baytların özeti
+            with open(self.path, 'rb') as f:
+                f.seek(info['tail_offset'])
+                info['tail_sha1'] = hashlib.sha1(f.read(position - info['tail_offset'])).hexdigest()
+
+        temp_path = self.info_path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(info, f, indent=2)
+        os.replace(temp_path, self.info_path)
+
+    def _extend(self, loaded_count, new_offsets, new_metadata, position):
+        """Bellekteki indeks güncelse yalnızca yeni satırları ekle, değilse dosyadan yükle"""
+        if len(self.offsets) != loaded_count or len(self.metadata) != loaded_count:
+            self._load()
+            return
+        if new_offsets:
+            pairs = np.frombuffer(new_offsets, dtype=np.uint64).reshape(-1, 2)
+            self.offsets = np.concatenate([self.offsets, pairs[:, 0]])
+            self.ends = np.concatenate([self.ends, pairs[:, 1]])
+            self.metadata.extend(new_metadata)
+            self._columns = {}
+        if position != self.indexed_bytes:
+            self.indexed_bytes = position
+            self._close_mmap()
+
+    def _load(self):
+        info = self._load_info()
+        self.indexed_bytes = info['indexed_bytes']
+        pairs = np.fromfile(self.index_path, dtype=np.uint64).reshape(-1, 2)
+        self.offsets = pairs[:, 0].copy()
+        self.ends = pairs[:, 1].copy()
+        with open(self.meta_path, 'r', encoding='utf-8') as f:
+            self.metadata = [json.loads(line) for line in f]
+        self._columns = {}
+        self._close_mmap()
+
+    # Okuma
+
+    def _buffer(self):
+        if self._mmap is None and self.indexed_bytes:
+            self._file = open(self.path, 'rb')
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._mmap
+
+    def _close_mmap(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._file.close()
+        self._mmap = None
+        self._file = None
+
+    def close(self):
+        self._close_mmap()
+
+    def __enter__(self):
+        self.refresh()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, index):
+        return json.loads(self._buffer()[int(self.offsets[index]):int(self.ends[index])])
+
+    def get_many(self, indices):
+        return [self[int(i)] for i in indices]
+
+    def column(self, name):
+        """Özet alanı NumPy dizisi olarak (önbellekli)"""
+        if name not in self._columns:
+            values = [meta.get(name) for meta in self.metadata]
+            self._columns[name] = np.array(values, dtype=np.int64 if name == 'length' else object)
+        return self._columns[name]
+
+    def select(self, min_length=None, max_length=None, **criteria):
+        """
+        Özet alanlarına göre eşleşen kayıt sıraları.
+        Değer tek başına veya liste/küme olarak verilebilir: task_type=['a', 'b']
+        """
+        mask = np.ones(len(self), dtype=bool)
+        for field, wanted in criteria.items():
+            values = self.column(field)
+            if isinstance(wanted, (list, tuple, set, frozenset)):
+                mask &= np.isin(values, list(wanted))
+            else:
+                mask &= values == wanted
+        if min_length is not None:
+            mask &= self.column('length') >= min_length
+        if max_length is not None:
+            mask &= self.column('length') <= max_length
+        return np.flatnonzero(mask)
+
+    def sample(self, count, seed=None, **criteria):
+        """Filtreye uyan kayıtlardan rastgele örnek (yalnızca seçilen satırlar okunur)"""
+        candidates = self.select(**criteria) if criteria else range(len(self))
+        rng = random.Random(seed)
+        picks = rng.sample(list(candidates), min(count, len(candidates)))
+        return self.get_many(picks)
+
+    # Yazma
+
+    def append(self, records):
+        """Kayıtları JSONL'in sonuna ekle ve indeksi aynı anda güncelle"""
+        self.refresh()
+        if os.path.getsize(self.path) != self.indexed_bytes:
+            # Satır sonu olmadan biten son kayıt önce tamamlanıp indekslenir
+            with open(self.path, 'ab') as f:
+                f.write(b'\n')
+            self.refresh()
+        info = self._load_info()
+
+        new_offsets = array('Q')
+        new_metadata = []
+        position = info['indexed_bytes']
+
+        with open(self.path, 'ab') as f:
+            for record in records:
+                line = (json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8')
+                f.write(line)
+                new_offsets.extend((position, position + len(line)))
+                new_metadata.append(self._record_metadata(record))
+                position += len(line)
+
+        loaded_count = info['count']
+        self._write_increment(info, new_offsets, new_metadata, position)
+        self._extend(loaded_count, new_offsets, new_metadata, position)
+        return len(new_metadata)
+
+
+def open_index(path, **kwargs):
+    """İndeksi güncelleyip aç"""
+    index = JsonlIndex(path, **kwargs)
+    index.refresh()
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSONL bayt konumu indeksi")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build = subparsers.add_parser("build", help="İndeksi oluştur veya güncelle")
+    build.add_argument("files", nargs="+")
+    build.add_argument("--language", action="store_true", help="Dil özeti de tut")
+
+    sample = subparsers.add_parser("sample", help="Rastgele kayıt örnekle")
+    sample.add_argument("file")
+    sample.add_argument("-n", "--count", type=int, default=5)
+    sample.add_argument("--task-type", action="append")
+    sample.add_argument("--category", action="append")
+    sample.add_argument("--seed", type=int)
+
+    args = parser.parse_args()
+
+    if args.command == "build":
+        for path in args.files:
+            index = JsonlIndex(path, language=args.language)
+            added = index.refresh()
+            print(f"✅ {path}: {len(index)} kayıt ({added} yeni)")
+            index.close()
+
+    elif args.command == "sample":
+        criteria = {}
+        if args.task_type:
+            criteria['task_type'] = args.task_type
+        if args.category:
+            criteria['category'] = args.category
+        with JsonlIndex(args.file) as index:
+            for record in index.sample(args.count, seed=args.seed, **criteria):
+                print(json.dumps(record, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
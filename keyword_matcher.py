@@ -0,0 +1,112 @@
+"""
+Çoklu kalıp (Aho-Corasick) anahtar kelime eşleyici
+Tüm kalıplar tek bir otomatta birleştirilir; metin, kalıp sayısından bağımsız
+olarak tek geçişte taranır. Metin ve kalıplar aynı biçimde normalleştirilir:
+Unicode NFKC + casefold, ayrıca Türkçe I/İ/ı/i harfleri tek harfe indirgenir
+("IŞIK", "ışık" ve "Işık" eşleşir; İngilizce "IPHONE" da "iphone" ile eşleşir).
+Otomatlar kalıp kümesine göre önbelleğe alınır (get_matcher).
+"""
+
+import unicodedata
+from collections import Counter, deque
+from functools import lru_cache
+
+# Eşleştirme için i varyantları: noktasız ı ve İ'nin küçük hâlindeki birleşik nokta
+_I_FOLD = str.maketrans({'ı': 'i', '̇': None})
+
+
+def normalize_text(text):
+    """Eşleştirme anahtarı: NFKC, casefold ve Türkçe i birleştirmesi"""
+    return unicodedata.normalize('NFKC', text or '').casefold().translate(_I_FOLD)
+
+
+class KeywordMatcher:
+    """Aho-Corasick otomatı; eşleşmeler normalleştirilmiş metin üzerinde bulunur"""
+
+    def __init__(self, patterns, whole_words=False):
+        self.patterns = list(dict.fromkeys(p for p in patterns if p and normalize_text(p)))
+        self.whole_words = whole_words
+        self.lengths = [len(normalize_text(p)) for p in self.patterns]
+
+        # Durum geçişleri, hata (fail) bağlantıları ve durumda biten kalıplar
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+        for index, pattern in enumerate(self.patterns):
+            state = 0
+            for char in normalize_text(pattern):
+                next_state = self.goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][char] = next_state
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                state = next_state
+            self.output[state].append(index)
+        self._build_failure_links()
+
+    def _build_failure_links(self):
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(char, 0)
+                # Sonek olarak biten kalıplar da bu durumda raporlanır
+                self.output[next_state] = self.output[next_state] + self.output[self.fail[next_state]]
+
+    def iter_matches(self, text):
+        """(başlangıç, bitiş, kalıp sırası) — konumlar normalleştirilmiş metinde"""
+        normalized = normalize_text(text)
+        goto, fail, output = self.goto, self.fail, self.output
+        state = 0
+        for position, char in enumerate(normalized):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for index in output[state]:
+                end = position + 1
+                start = end - self.lengths[index]
+                if self.whole_words and not self._is_word(normalized, start, end):
+                    continue
+                yield start, end, index
+
+    @staticmethod
+    def _is_word(text, start, end):
+        before = text[start - 1] if start > 0 else ' '
+        after = text[end] if end < len(text) else ' '
+        return not before.isalnum() and not after.isalnum()
+
+    def counts(self, text):
+        """Kalıp → örtüşmeyen geçiş sayısı (str.count ile aynı anlam)"""
+        counts = Counter()
+        last_end = {}
+        for start, end, index in self.iter_matches(text):
+            if start >= last_end.get(index, 0):
+                counts[self.patterns[index]] += 1
+                last_end[index] = end
+        return counts
+
+    def found(self, text):
+        """Metinde geçen kalıplar (kalıp sırasıyla)"""
+        hits = {index for _, _, index in self.iter_matches(text)}
+        return [pattern for index, pattern in enumerate(self.patterns) if index in hits]
+
+
+@lru_cache(maxsize=256)
+def _cached_matcher(patterns, whole_words):
+    return KeywordMatcher(patterns, whole_words)
+
+
+def get_matcher(patterns, whole_words=False):
+    """Aynı kalıp kümesi için otomat bir kez kurulur"""
+    return _cached_matcher(tuple(patterns), whole_words)
+
+
+def count_keyword(text, keyword, whole_words=False):
+    """Tek anahtar kelimenin metindeki geçiş sayısı"""
+    return get_matcher((keyword,), whole_words).counts(text)[keyword]
@@ -0,0 +1,219 @@
+"""
+Bellek bütçeli model yerleşim (residency) yöneticisi
+Hangi modellerin bellekte olduğunu (/api/ps), her birinin bellek ayak izini
+ve istek hızını (üstel hareketli ortalama) izler. İstek hızına göre en sıcak
+modeller RAM bütçesine sığdığı kadar sabitlenir (süresiz keep_alive); diğer
+modeller kısa keep_alive ile yüklenir. Yeni bir model için yer gerektiğinde
+sabitlenmemiş modeller en uzun süredir kullanılmayandan başlayarak
+keep_alive=0 ile boşaltılır. Böylece farklı modellere gelen istekler
+Ollama'nın modelleri sürekli yükleyip boşaltmasına yol açmaz.
+"""
+
+import math
+import os
+import threading
+import time
+
+from ollama_client import OllamaClient, OllamaError
+
+SIZE_UNITS = {'KB': 1024, 'MB': 1024 ** 2, 'GB': 1024 ** 3, 'TB': 1024 ** 4}
+# Diskteki model boyutundan bellek ayak izi tahmini (bağlam önbelleği vb. için pay)
+FOOTPRINT_OVERHEAD = 1.2
+
+
+def parse_size(value):
+    """'12GB', '8192MB' veya bayt sayısı → bayt"""
+    value = str(value).strip().upper().replace('İ', 'I')
+    for unit, factor in SIZE_UNITS.items():
+        if value.endswith(unit):
+            return int(float(value[:-len(unit)]) * factor)
+    return int(float(value))
+
+
+def default_memory_budget(fraction=0.7):
+    """Fiziksel RAM'in bir kısmı (belirlenemezse 8 GB)"""
+    try:
+        return int(os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') * fraction)
+    except (ValueError, OSError, AttributeError):
+        return 8 * SIZE_UNITS['GB']
+
+
+def canonical_name(model):
+    """Etiketsiz ad Ollama'daki gibi ':latest' ile tamamlanır"""
+    return model if ':' in model else f"{model}:latest"
+
+
+def format_size(size):
+    return f"{size / SIZE_UNITS['GB']:.1f} GB"
+
+
+class ModelResidencyManager:
+    """Modelleri istek hızına göre bellekte tutar, soğukları LRU sırasıyla boşaltır"""
+
+    def __init__(self, client=None, budget_bytes=None, half_life=300.0, pinned_keep_alive=-1,
+                 idle_keep_alive="5m", preferred=(), refresh_interval=5.0):
+        self.client = client or OllamaClient()
+        self.budget_bytes = budget_bytes or default_memory_budget()
+        # Hız ortalamasının zaman sabiti (yarılanma süresinden)
+        self.tau = half_life / math.log(2)
+        self.pinned_keep_alive = pinned_keep_alive
+        self.idle_keep_alive = idle_keep_alive
+        self.preferred = [canonical_name(model) for model in preferred]
+        self.refresh_interval = refresh_interval
+
+        self.rates = {}        # model -> (istek/sn, son güncelleme)
+        self.last_used = {}    # model -> monotonic zaman
+        self.active = {}       # model -> süren istek sayısı
+        self.footprints = {}   # model -> bayt (ölçülen veya tahmini)
+        self.loaded = {}       # model -> bayt (/api/ps)
+        self.pinned = set()
+        self.evictions = 0
+        self.last_refresh = 0.0
+        self.lock = threading.RLock()
+
+    # Ölçümler
+
+    def rate(self, model, now=None):
+        """Modelin şu anki istek hızı (istek/dakika)"""
+        now = now or time.monotonic()
+        value, updated = self.rates.get(model, (0.0, now))
+        return value * math.exp(-(now - updated) / self.tau) * 60
+
+    def _record_request(self, model, now):
+        value, updated = self.rates.get(model, (0.0, now))
+        # Her istek ortalamaya 1/tau ekler; aradaki süre boyunca üstel sönüm
+        self.rates[model] = (value * math.exp(-(now - updated) / self.tau) + 1 / self.tau, now)
+        self.last_used[model] = now
+
+    def refresh(self, force=False):
+        """Yüklü modelleri ve ayak izlerini Ollama'dan oku"""
+        with self.lock:
+            if not force and time.monotonic() - self.last_refresh < self.refresh_interval:
+                return self.loaded
+            try:
+                running = self.client.running_models()
+                if not self.footprints:
+                    for model in self.client.list_models():
+                        self.footprints[model['name']] = int(model.get('size', 0) * FOOTPRINT_OVERHEAD)
+            except OllamaError as e:
+                print(f"⚠️ Yüklü modeller okunamadı: {e}")
+                return self.loaded
+
+            self.loaded = {model['name']: model.get('size', 0) for model in running}
+            # Ölçülen boyut tahminin yerine geçer
+            self.footprints.update(self.loaded)
+            self.last_refresh = time.monotonic()
+            return self.loaded
+
+    def footprint(self, model):
+        return self.footprints.get(model, 0)
+
+    def is_loaded(self, model):
+        return model in self.loaded
+
+    # Planlama
+
+    def plan_pins(self, now=None):
+        """Sıcaklık sırasına göre bütçeye sığan modelleri sabitle"""
+        now = now or time.monotonic()
+        candidates = set(self.rates) | set(self.preferred)
+        ranked = sorted(candidates, key=lambda m: (self.rate(m, now), m in self.preferred), reverse=True)
+
+        pinned, used = set(), 0
+        for model in ranked:
+            if self.rate(model, now) <= 0 and model not in self.preferred:
+                continue
+            size = self.footprint(model)
+            if used + size <= self.budget_bytes:
+                pinned.add(model)
+                used += size
+
+        # Sabitlemesi kalkan yüklü modellerin süresiz keep_alive'ı kısaltılır
+        for model in self.pinned - pinned:
+            if self.is_loaded(model):
+                try:
+                    self.client.preload(model, keep_alive=self.idle_keep_alive)
+                except OllamaError:
+                    pass
+        self.pinned = pinned
+        return pinned
+
+    def _make_room(self, model):
+        """Hedef model bütçeye sığana kadar soğuk modelleri LRU sırasıyla boşalt"""
+        needed = 0 if self.is_loaded(model) else self.footprint(model)
+        evictable = sorted(
+            (name for name in self.loaded
+             if name != model and name not in self.pinned and not self.active.get(name)),
+            key=lambda name: self.last_used.get(name, 0.0)
+        )
+        while sum(self.loaded.values()) + needed > self.budget_bytes and evictable:
+            victim = evictable.pop(0)
+            try:
+                self.client.unload(victim)
+                print(f"🗂️ Model bellekten çıkarıldı: {victim} ({format_size(self.loaded[victim])})")
+                self.loaded.pop(victim, None)
+                self.evictions += 1
+            except OllamaError as e:
+                print(f"⚠️ Model boşaltılamadı: {victim} - {e}")
+
+    # İstek yaşam döngüsü
+
+    def acquire(self, model):
+        """İstek öncesi: yer aç ve bu istekte kullanılacak keep_alive değerini döndür"""
+        model = canonical_name(model)
+        with self.lock:
+            now = time.monotonic()
+            self._record_request(model, now)
+            self.active[model] = self.active.get(model, 0) + 1
+            self.refresh()
+            self.plan_pins(now)
+            # Sabitlemesi kalkan modeller de bütçe aşılıyorsa burada boşaltılır
+            self._make_room(model)
+            return self.keep_alive_for(model)
+
+    def release(self, model, success=True):
+        """İstek sonrası: başarılıysa modelin yüklü olduğunu kaydet"""
+        model = canonical_name(model)
+        with self.lock:
+            self.active[model] = max(0, self.active.get(model, 0) - 1)
+            self.last_used[model] = time.monotonic()
+            # Başarısız istekte (zaman aşımı, bilinmeyen model) model yüklenmemiş olabilir;
+            # gerçek durum bir sonraki yenilemede /api/ps'ten okunur
+            if success and not self.is_loaded(model):
+                # Ayak izi bir sonraki yenilemede ölçülür
+                self.loaded[model] = self.footprint(model)
+
+    def keep_alive_for(self, model):
+        model = canonical_name(model)
+        return self.pinned_keep_alive if model in self.pinned else self.idle_keep_alive
+
+    def status(self):
+        with self.lock:
+            now = time.monotonic()
+            models = set(self.rates) | set(self.preferred) | set(self.loaded)
+            return {
+                'budget': format_size(self.budget_bytes),
+                'loaded_size': format_size(sum(self.loaded.values())),
+                'evictions': self.evictions,
+                'models': {
+                    model: {
+                        'loaded': self.is_loaded(model),
+                        'pinned': model in self.pinned,
+                        'footprint': format_size(self.footprint(model)),
+                        'requests_per_minute': round(self.rate(model, now), 2),
+                        'active': self.active.get(model, 0)
+                    }
+                    for model in sorted(models)
+                }
+            }
+
+
+def residency_from_env(preferred=()):
+    """MODEL_RAM_BUDGET, MODEL_RATE_HALF_LIFE ve IDLE_KEEP_ALIVE ayarlarıyla"""
+    budget = os.getenv('MODEL_RAM_BUDGET')
+    return ModelResidencyManager(
+        budget_bytes=parse_size(budget) if budget else None,
+        half_life=float(os.getenv('MODEL_RATE_HALF_LIFE', '300')),
+        idle_keep_alive=os.getenv('IDLE_KEEP_ALIVE', '5m'),
+        preferred=preferred
+    )
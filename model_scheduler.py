@@ -0,0 +1,165 @@
+"""
+Model yakınlığına (affinity) göre istek zamanlayıcı
+İstekler model başına kuyruklarda bekler. Boşalan yuva, adil sınır
+(fairness_bound) aşılmadıkça o an yüklü olan modelin kuyruğuna verilir; böylece
+karışık trafikte modeller arası geçiş (yükleme/boşaltma) sayısı azalır.
+Sınır dolduğunda en uzun bekleyen istek öne geçer, hiçbir model aç kalmaz.
+Toplam eşzamanlılık sunucu paralelliğine (OLLAMA_NUM_PARALLEL), model başına
+eşzamanlılık ise ayrı bir üst sınıra bağlıdır. Her istek kuyrukta geçen
+süreyi (queue_wait_ms) taşır.
+"""
+
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+class SchedulerTimeout(Exception):
+    """İstek kuyruk bekleme süresini aştı"""
+
+
+class Ticket:
+    def __init__(self, model, sequence):
+        self.model = model
+        self.sequence = sequence
+        self.enqueued_at = time.monotonic()
+        self.started_at = None
+
+    @property
+    def queue_wait_ms(self):
+        end = self.started_at or time.monotonic()
+        return round((end - self.enqueued_at) * 1000, 1)
+
+
+class ModelAffinityScheduler:
+    """Model başına kuyruklar; yüklü modeli adil sınır içinde öne alır"""
+
+    def __init__(self, max_parallel=1, max_per_model=None, fairness_bound=8, queue_timeout=300.0, is_loaded=None):
+        self.max_parallel = max_parallel
+        self.max_per_model = max_per_model or max_parallel
+        self.fairness_bound = fairness_bound
+        self.queue_timeout = queue_timeout
+        self.is_loaded = is_loaded or (lambda model: False)
+
+        self.queues = {}     # model -> deque[Ticket]
+        self.running = {}    # model -> çalışan istek sayısı
+        self.current_model = None
+        self.streak = 0      # geçerli modele art arda verilen yuva sayısı
+        self.switches = 0
+        self.dispatched = 0
+        self.total_wait_ms = 0.0
+        self.sequence = itertools.count()
+        self.condition = threading.Condition()
+
+    # Seçim
+
+    def _can_run(self, model):
+        return self.running.get(model, 0) < self.max_per_model
+
+    def _next_model(self):
+        waiting = [model for model, tickets in self.queues.items() if tickets and self._can_run(model)]
+        if not waiting:
+            return None
+
+        # Geçerli model adil sınıra kadar öncelikli
+        if self.current_model in waiting and self.streak < self.fairness_bound:
+            return self.current_model
+
+        def oldest(models):
+            return min(models, key=lambda model: self.queues[model][0].sequence)
+
+        if self.current_model in waiting:
+            # Sınır doldu: en uzun bekleyen istek başka modeldeyse ona geç
+            others = [model for model in waiting if model != self.current_model]
+            return oldest(others) if others else self.current_model
+
+        # Geçerli modelde bekleyen yok: önce bellekteki modeller, sonra en eski istek
+        loaded = [model for model in waiting if self.is_loaded(model)]
+        return oldest(loaded or waiting)
+
+    def _dispatch(self):
+        """Boş yuvaları bekleyen isteklere ver (kilit altında çağrılır)"""
+        granted = False
+        while sum(self.running.values()) < self.max_parallel:
+            model = self._next_model()
+            if model is None:
+                break
+            ticket = self.queues[model].popleft()
+            ticket.started_at = time.monotonic()
+
+            if model == self.current_model:
+                self.streak += 1
+            else:
+                if self.current_model is not None:
+                    self.switches += 1
+                self.current_model = model
+                self.streak = 1
+
+            self.running[model] = self.running.get(model, 0) + 1
+            self.dispatched += 1
+            self.total_wait_ms += ticket.queue_wait_ms
+            granted = True
+        if granted:
+            self.condition.notify_all()
+
+    # İstek yaşam döngüsü
+
+    def acquire(self, model):
+        """Sıra gelene kadar bekle; dağıtılan bileti döndür"""
+        with self.condition:
+            ticket = Ticket(model, next(self.sequence))
+            self.queues.setdefault(model, deque()).append(ticket)
+            self._dispatch()
+
+            deadline = ticket.enqueued_at + self.queue_timeout
+            while ticket.started_at is None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.queues[model].remove(ticket)
+                    raise SchedulerTimeout(f"{model} için kuyrukta {self.queue_timeout:.0f} sn beklendi")
+                self.condition.wait(remaining)
+            return ticket
+
+    def release(self, ticket):
+        with self.condition:
+            self.running[ticket.model] -= 1
+            self._dispatch()
+
+    @contextmanager
+    def slot(self, model):
+        """with scheduler.slot(model) as ticket: ... (ticket.queue_wait_ms)"""
+        ticket = self.acquire(model)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    def status(self):
+        with self.condition:
+            return {
+                'max_parallel': self.max_parallel,
+                'max_per_model': self.max_per_model,
+                'fairness_bound': self.fairness_bound,
+                'current_model': self.current_model,
+                'queued': {model: len(tickets) for model, tickets in self.queues.items() if tickets},
+                'running': {model: count for model, count in self.running.items() if count},
+                'dispatched': self.dispatched,
+                'model_switches': self.switches,
+                'avg_queue_wait_ms': round(self.total_wait_ms / self.dispatched, 1) if self.dispatched else 0
+            }
+
+
+def scheduler_from_env(is_loaded=None):
+    """OLLAMA_NUM_PARALLEL, MODEL_MAX_CONCURRENCY, SCHEDULER_FAIRNESS ve SCHEDULER_QUEUE_TIMEOUT ayarlarıyla"""
+    max_parallel = int(os.getenv('OLLAMA_NUM_PARALLEL', '1'))
+    per_model = os.getenv('MODEL_MAX_CONCURRENCY')
+    return ModelAffinityScheduler(
+        max_parallel=max_parallel,
+        max_per_model=int(per_model) if per_model else None,
+        fairness_bound=int(os.getenv('SCHEDULER_FAIRNESS', '8')),
+        queue_timeout=float(os.getenv('SCHEDULER_QUEUE_TIMEOUT', '300')),
+        is_loaded=is_loaded
+    )
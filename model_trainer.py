@@ -1,10 +1,46 @@
 import json
+import hashlib
 import os
 import subprocess
 import sys
 import time
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import numpy as np
 import requests
+from dataset_store import DatasetStore
+from ollama_client import OllamaClient, OllamaError
+from evaluation_cache import EvaluationCache
+from keyword_matcher import get_matcher
+
+DEFAULT_EVAL_SUITE = "evaluation_suite.jsonl"
+# Modelfile PARAMETER satırları; ayarlanmış değerler (model_tuning.json) bunların üzerine yazılır
+DEFAULT_MODEL_PARAMETERS = {
+    'temperature': 0.7,
+    'top_p': 0.9,
+    'top_k': 40,
+    'num_predict': 2048
+}
+# test_model önbellek kayıtları değerlendiricinin vakalarıyla karışmasın diye ayrı parametre anahtarı
+SMOKE_TEST_CACHE_PARAMS = {'namespace': 'test_model'}
+# Test paketi dosyası yoksa kullanılan vakalar
+DEFAULT_TEST_CASES = [
+    {
+        'category': 'Electronics',
+        'keyword': 'wireless earbuds',
+        'expected_elements': ['battery life', 'wireless', 'sound quality', 'bluetooth']
+    },
+    {
+        'category': 'Fashion',
+        'keyword': 'summer dress',
+        'expected_elements': ['fabric', 'style', 'comfort', 'occasion']
+    },
+    {
+        'category': 'Beauty',
+        'keyword': 'anti-aging cream',
+        'expected_elements': ['skin', 'ingredients', 'benefits', 'application']
+    }
+]
 
 class OllamaModelTrainer:
     def __init__(self):
@@ -17,13 +53,24 @@ class OllamaModelTrainer:
         self.model_name = "shopify-gpt"
         self.training_data_dir = "model_training_data"
         self.modelfile_path = "Modelfile"
+        # Eğitimde kullanılacak veri seti sürümü (referans adı veya sürüm kimliği)
+        self.dataset_ref = os.getenv('TRAINING_DATASET_VERSION', 'train')
+        self.dataset_version = None
+        # Derleme önbelleği: Modelfile + temel model özeti değişmediyse ollama create atlanır
+        self.build_cache_path = "model_builds.json"
+        # modelfile_autotune.py çıktısı: CPU çıkarımı için ölçülmüş çalışma parametreleri
+        self.tuning_path = "model_tuning.json"
+        self.ollama_version = None
+        # 'ollama create --quantize' düzeyi (ör. q4_K_M); None = temel ağırlıklar olduğu gibi
+        self.quantization = None
         
     def check_ollama_installation(self):
         """Ollama kurulumunu kontrol et"""
         try:
             result = subprocess.run(['ollama', '--version'], capture_output=True, text=True)
             if result.returncode == 0:
-                print(f"✅ Ollama kurulu: {result.stdout.strip()}")
+                self.ollama_version = result.stdout.strip()
+                print(f"✅ Ollama kurulu: {self.ollama_version}")
                 return True
             else:
                 print("❌ Ollama kurulu değil!")
@@ -50,6 +97,30 @@ class OllamaModelTrainer:
         except:
             return []
     
+    def get_model_digests(self):
+        """'ollama list' çıktısından model adı -> ID (özet) eşlemesi"""
+        try:
+            result = subprocess.run(['ollama', 'list'], capture_output=True, text=True)
+            if result.returncode != 0:
+                return {}
+            digests = {}
+            for line in result.stdout.strip().split('\n')[1:]:  # İlk satır başlık
+                columns = line.split()
+                if len(columns) >= 2:
+                    digests[columns[0]] = columns[1]
+            return digests
+        except Exception:
+            return {}
+    
+    def get_model_digest(self, model_name, digests=None):
+        """Modelin yerel özeti; etiketsiz ad için ':latest' de denenir"""
+        digests = self.get_model_digests() if digests is None else digests
+        if model_name in digests:
+            return digests[model_name]
+        if ':' not in model_name:
+            return digests.get(f"{model_name}:latest")
+        return None
+    
     def select_base_model(self):
         """Kullanıcıdan temel model seçimi al"""
         print("\n🤖 Temel Model Seçimi")
@@ -110,8 +181,34 @@ class OllamaModelTrainer:
             print(f"❌ Model indirme hatası: {e}")
             return False
     
-    def create_modelfile(self, base_model="llama2"):
-        """Özel model için Modelfile oluştur"""
+    def load_tuned_parameters(self, base_model=None):
+        """
+        Ayarlanmış Modelfile parametreleri. Ayar yalnızca ölçüldüğü model,
+        temel model (ve özeti) ile nicemleme düzeyi için geçerlidir; başka bir
+        varyanta uygulanmaz (dosya yoksa veya eşleşmezse boş).
+        """
+        if not os.path.exists(self.tuning_path):
+            return {}
+        try:
+            with open(self.tuning_path, 'r', encoding='utf-8') as f:
+                tuning = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+        
+        scope = (tuning.get('model'), tuning.get('base_model'), tuning.get('quantization'))
+        if scope != (self.model_name, base_model or self.base_model, self.quantization):
+            return {}
+        tuned_digest = tuning.get('base_model_digest')
+        if tuned_digest and self.get_model_digest(base_model or self.base_model) not in (None, tuned_digest):
+            print(f"ℹ️ {self.tuning_path} temel modelin önceki sürümü için ölçülmüş, kullanılmıyor")
+            return {}
+        return tuning.get('parameters', {})
+    
+    def render_modelfile(self, base_model="llama2", parameters=None):
+        """Modelfile içeriğini üret (yazmadan)"""
+        model_parameters = dict(DEFAULT_MODEL_PARAMETERS)
+        model_parameters.update(self.load_tuned_parameters(base_model))
+        model_parameters.update(parameters or {})
         
         system_prompt = """You are ShopifyGPT, an expert e-commerce copywriter specialized in creating compelling Shopify product descriptions. Your expertise includes:
 
@@ -137,10 +234,9 @@ Respond with compelling, conversion-optimized content that drives sales."""
         # F-string yerine format kullanarak triple quote problemini çözelim
         modelfile_content = f"FROM {base_model}\n\n"
         modelfile_content += f'SYSTEM """{system_prompt}"""\n\n'
-        modelfile_content += "PARAMETER temperature 0.7\n"
-        modelfile_content += "PARAMETER top_p 0.9\n"
-        modelfile_content += "PARAMETER top_k 40\n"
-        modelfile_content += "PARAMETER num_predict 2048\n\n"
+        for name, value in model_parameters.items():
+            modelfile_content += f"PARAMETER {name} {value}\n"
+        modelfile_content += "\n"
         
         template_content = """TEMPLATE \"\"\"{{ if .System }}<|im_start|>system
 {{ .System }}<|im_end|>
@@ -151,6 +247,12 @@ Respond with compelling, conversion-optimized content that drives sales."""
 \"\"\""""
         
         modelfile_content += template_content
+        
+        return modelfile_content
+    
+    def create_modelfile(self, base_model="llama2"):
+        """Özel model için Modelfile oluştur"""
+        modelfile_content = self.render_modelfile(base_model)
 
         with open(self.modelfile_path, 'w', encoding='utf-8') as f:
             f.write(modelfile_content)
@@ -158,8 +260,85 @@ Respond with compelling, conversion-optimized content that drives sales."""
         print(f"✅ Modelfile oluşturuldu: {self.modelfile_path}")
         return True
     
+    def checkout_dataset_version(self):
+        """Sürümlü depodaki veri setini çıkar; depo yoksa None"""
+        store_dir = os.path.join(self.training_data_dir, "store")
+        if not os.path.isdir(store_dir):
+            return None
+        
+        store = DatasetStore(store_dir)
+        try:
+            version_id = store.resolve(self.dataset_ref)
+        except KeyError as e:
+            print(f"⚠️ {e}")
+            return None
+        
+        checkout_dir = os.path.join(self.training_data_dir, "checkouts")
+        checkout_file = os.path.join(checkout_dir, f"train_{version_id}.jsonl")
+        if not os.path.exists(checkout_file):
+            # Önceki sürümlerin çıktıları depodan yeniden üretilebilir
+            if os.path.isdir(checkout_dir):
+                for filename in os.listdir(checkout_dir):
+                    os.remove(os.path.join(checkout_dir, filename))
+            store.checkout(version_id, checkout_file)
+        
+        self.dataset_version = version_id
+        print(f"📋 Kullanılacak eğitim verisi: {checkout_file} (sürüm {version_id})")
+        return checkout_file
+    
+    def build_key(self, modelfile_content, base_model_digest):
+        """Derleme anahtarı: üretilen Modelfile ve temel model özeti"""
+        digest = hashlib.sha256()
+        digest.update(modelfile_content.encode('utf-8'))
+        digest.update(f"\n{self.model_name}\n{base_model_digest}".encode('utf-8'))
+        if self.quantization:
+            digest.update(f"\n{self.quantization}".encode('utf-8'))
+        return digest.hexdigest()
+    
+    def load_build_cache(self):
+        if os.path.exists(self.build_cache_path):
+            try:
+                with open(self.build_cache_path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except (OSError, json.JSONDecodeError):
+                pass
+        return {}
+    
+    def is_build_current(self, build_key):
+        """Son derleme aynı girdilerle yapıldı ve model hâlâ aynı özetle duruyor mu?"""
+        entry = self.load_build_cache().get(self.model_name)
+        if not entry or entry.get('build_key') != build_key:
+            return False
+        return self.get_model_digest(self.model_name) == entry.get('model_digest')
+    
+    def record_build(self, build_key, modelfile_content, base_model_digest, build_seconds):
+        """Derleme kaynağını (provenance) kaydet"""
+        cache = self.load_build_cache()
+        cache[self.model_name] = {
+            'build_key': build_key,
+            'model_digest': self.get_model_digest(self.model_name),
+            'base_model': self.base_model,
+            'base_model_digest': base_model_digest,
+            'quantization': self.quantization,
+            'modelfile_sha256': hashlib.sha256(modelfile_content.encode('utf-8')).hexdigest(),
+            'dataset_version': self.dataset_version,
+            'ollama_version': self.ollama_version,
+            'build_seconds': round(build_seconds, 2),
+            'built_at': datetime.now().isoformat()
+        }
+        os.makedirs(os.path.dirname(self.build_cache_path) or ".", exist_ok=True)
+        temp_path = self.build_cache_path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, self.build_cache_path)
+        return cache[self.model_name]
+    
     def create_training_dataset(self):
         """Eğitim veri setini hazırla"""
+        versioned_file = self.checkout_dataset_version()
+        if versioned_file:
+            return versioned_file
+        
         training_files = []
         
         # JSON ve JSONL dosyalarını bul
@@ -183,8 +362,11 @@ Respond with compelling, conversion-optimized content that drives sales."""
         
         try:
             # Özel modeli oluştur
-            result = subprocess.run(['ollama', 'create', self.model_name, '-f', self.modelfile_path], 
-                                  capture_output=True, text=True)
+            cmd = ['ollama', 'create', self.model_name, '-f', self.modelfile_path]
+            if self.quantization:
+                # Yalnızca FP16/FP32 temel modeller nicemlenebilir
+                cmd += ['--quantize', self.quantization]
+            result = subprocess.run(cmd, capture_output=True, text=True)
             
             if result.returncode == 0:
                 print(f"✅ Model başarıyla oluşturuldu: {self.model_name}")
@@ -207,17 +389,31 @@ Respond with compelling, conversion-optimized content that drives sales."""
             "Generate a product description in Turkish for a fitness tracker.",
         ]
         
+        # Aynı model özeti ve istem için önceki yanıt yeniden üretilmez
+        model_digest = self.get_model_digest(self.model_name)
+        cache = EvaluationCache() if model_digest and os.getenv('EVAL_CACHE', '1') == '1' else None
+        
         try:
             for i, prompt in enumerate(test_prompts, 1):
                 print(f"\n📝 Test {i}: {prompt}")
                 
+                cached = cache.get(model_digest, prompt, SMOKE_TEST_CACHE_PARAMS) if cache else None
+                if cached:
+                    print(f"🤖 Yanıt (önbellek): {cached['output'][:200]}...")
+                    print("-" * 50)
+                    continue
+                
                 # Subprocess ile ollama çalıştır
                 cmd = ['ollama', 'run', self.model_name, prompt]
+                start = time.perf_counter()
                 result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
                 
                 if result.returncode == 0:
                     response_text = result.stdout.strip()
                     print(f"🤖 Yanıt: {response_text[:200]}...")
+                    if cache:
+                        cache.put(model_digest, prompt, response_text, params=SMOKE_TEST_CACHE_PARAMS, model=self.model_name,
+                                  metrics={'latency_seconds': round(time.perf_counter() - start, 3)})
                 else:
                     print(f"❌ Test hatası: {result.stderr}")
                 print("-" * 50)
@@ -311,26 +507,41 @@ if __name__ == '__main__':
         if not self.check_ollama_installation():
             return False
         
-        # Temel model seçimi
-        self.base_model = self.select_base_model()
+        # Temel model seçimi (BASE_MODEL tanımlıysa etkileşimsiz)
+        self.base_model = os.getenv('BASE_MODEL') or self.select_base_model()
         
-        # Temel modeli indir
-        if not self.download_base_model(self.base_model):
-            return False
+        # Temel modeli yalnızca yerelde yoksa (veya istenirse) indir
+        base_model_digest = self.get_model_digest(self.base_model)
+        if base_model_digest is None or os.getenv('REFRESH_BASE_MODEL') == '1':
+            if not self.download_base_model(self.base_model):
+                return False
+            base_model_digest = self.get_model_digest(self.base_model)
         
         # Eğitim verisini hazırla
         training_file = self.create_training_dataset()
         if not training_file:
             return False
         
+        # Girdiler değişmediyse model yeniden oluşturulmaz ve test edilmez
+        modelfile_content = self.render_modelfile(self.base_model)
+        build_key = self.build_key(modelfile_content, base_model_digest)
+        if base_model_digest and os.getenv('FORCE_REBUILD') != '1' and self.is_build_current(build_key):
+            print(f"⏭️ Modelfile ve temel model değişmedi, {self.model_name} güncel (derleme {build_key[:12]})")
+            return True
+        
         # Modelfile oluştur
         if not self.create_modelfile(self.base_model):
             return False
         
         # Model oluştur
+        build_start = time.perf_counter()
         if not self.fine_tune_with_ollama():
             return False
         
+        if base_model_digest:
+            build = self.record_build(build_key, modelfile_content, base_model_digest, time.perf_counter() - build_start)
+            print(f"📝 Derleme kaydedildi: {build['model_digest']} ← {self.base_model} ({base_model_digest})")
+        
         # Modeli test et
         self.test_model()
         
@@ -339,80 +550,262 @@ if __name__ == '__main__':
         
         print("🎉 ShopifyGPT eğitimi tamamlandı!")
         print(f"📋 Model adı: {self.model_name}")
+        if self.dataset_version:
+            print(f"📦 Veri seti sürümü: {self.dataset_version}")
         print("🚀 API'yi başlatmak için: python shopify_api.py")
         
         return True
 
+def load_test_suite(suite_path=DEFAULT_EVAL_SUITE):
+    """Test paketini oku (JSONL veya JSON listesi); yoksa yerleşik vakalar"""
+    if not os.path.exists(suite_path):
+        print(f"⚠️ Test paketi bulunamadı ({suite_path}), yerleşik vakalar kullanılıyor")
+        cases = [dict(case) for case in DEFAULT_TEST_CASES]
+    elif suite_path.endswith('.jsonl'):
+        with open(suite_path, 'r', encoding='utf-8') as f:
+            cases = [json.loads(line) for line in f if line.strip()]
+    else:
+        with open(suite_path, 'r', encoding='utf-8') as f:
+            cases = json.load(f)
+    
+    for number, case in enumerate(cases):
+        case.setdefault('id', f"case-{number}")
+        case.setdefault('prompt', f"Create a Shopify product description for {case['keyword']} in {case['category']} category.")
+        case.setdefault('expected_elements', [])
+    return cases
+
 class ModelEvaluator:
-    def __init__(self, model_name="shopify-gpt"):
+    """
+    Veri odaklı model değerlendirmesi: test paketi (JSONL) sınırlı paralellikle
+    çalıştırılır; her vaka için kalite puanının yanında gecikme, token/sn ve
+    çıktı boyutu kaydedilir. Rapor JSON olarak yazılır ve aynı modelin bir
+    önceki derlemesine ait raporla karşılaştırılır. Model özeti değişmedikçe
+    çıktılar önbellekten alınır, yalnızca yeni veya değişen vakalar çalışır.
+    """
+
+    def __init__(self, model_name="shopify-gpt", suite_path=None, max_workers=None, timeout=120,
+                 report_dir="model_training_data/evaluations", build_cache_path="model_builds.json",
+                 cache=None):
         self.model_name = model_name
+        self.suite_path = suite_path or os.getenv('EVAL_SUITE', DEFAULT_EVAL_SUITE)
+        self.max_workers = max_workers or int(os.getenv('EVAL_WORKERS', os.getenv('OLLAMA_NUM_PARALLEL', '2')))
+        self.timeout = timeout
+        self.report_dir = report_dir
+        self.build_cache_path = build_cache_path
+        self.client = OllamaClient(timeout=timeout)
+        if cache is None and os.getenv('EVAL_CACHE', '1') == '1':
+            cache = EvaluationCache()
+        self.cache = cache
+        self.digest = None
+        self.last_report = None
+    
+    def load_test_suite(self):
+        return load_test_suite(self.suite_path)
+    
+    def score_output(self, test_case, generated_text):
+        """Beklenen öğelerden kaçının çıktıda geçtiği (tek geçişte, Türkçe duyarlı)"""
+        expected = test_case['expected_elements']
+        found_elements = get_matcher(expected).found(generated_text)
+        return (len(found_elements) / len(expected) if expected else 0.0), found_elements
+    
+    def generate_case(self, test_case):
+        """Vaka çıktısı ve üretim ölçümleri (model özeti biliniyorsa önbellekten)"""
+        params = test_case.get('options')
+        if self.cache and self.digest:
+            cached = self.cache.get(self.digest, test_case['prompt'], params)
+            if cached:
+                return cached['output'], cached['metrics'], True
+        
+        start = time.perf_counter()
+        result = self.client.generate(self.model_name, test_case['prompt'], options=params, timeout=self.timeout)
+        latency = time.perf_counter() - start
+        eval_count = result.get('eval_count', 0)
+        metrics = {
+            'latency_seconds': round(latency, 3),
+            'load_seconds': round(result['load_seconds'], 3),
+            'prompt_tokens': result.get('prompt_eval_count', 0),
+            'output_tokens': eval_count,
+            'tokens_per_second': round(eval_count / result['eval_seconds'], 2) if result['eval_seconds'] else None
+        }
+        output = result.get('response', '').strip()
+        if self.cache and self.digest:
+            self.cache.put(self.digest, test_case['prompt'], output, metrics, params, model=self.model_name)
+        return output, metrics, False
+    
+    def run_case(self, test_case):
+        """Tek vakayı çalıştır (veya önbellekten al) ve puanla"""
+        generated_text, metrics, cached = self.generate_case(test_case)
+        score, found_elements = self.score_output(test_case, generated_text)
+        return {
+            'id': test_case['id'],
+            'test_case': test_case.get('keyword', test_case['id']),
+            'category': test_case.get('category'),
+            'score': score,
+            'found_elements': found_elements,
+            'response_length': len(generated_text),
+            'cached': cached,
+            **metrics
+        }
+    
+    def summarize(self, results, failures, wall_seconds):
+        # Önbellekteki vakaların gecikmesi başka bir çalıştırmanın ölçümüdür; yüzdelikler
+        # yalnızca bu çalıştırmada ölçülen vakalardan hesaplanır
+        measured = [r for r in results if not r['cached']]
+        latencies = [r['latency_seconds'] for r in measured]
+        speeds = [r['tokens_per_second'] for r in measured if r.get('tokens_per_second')]
+        cached_latencies = [r['latency_seconds'] for r in results if r['cached'] and r.get('latency_seconds') is not None]
+        by_category = {}
+        for r in results:
+            by_category.setdefault(r['category'], []).append(r['score'])
+        
+        return {
+            'cases': len(results) + len(failures),
+            'completed': len(results),
+            'failed': len(failures),
+            'cached': sum(1 for r in results if r['cached']),
+            'measured': len(measured),
+            'avg_score': round(float(np.mean([r['score'] for r in results])), 4) if results else 0,
+            'latency_p50': round(float(np.percentile(latencies, 50)), 3) if latencies else None,
+            'latency_p95': round(float(np.percentile(latencies, 95)), 3) if latencies else None,
+            'avg_tokens_per_second': round(float(np.mean(speeds)), 2) if speeds else None,
+            'cached_latency_p50': round(float(np.percentile(cached_latencies, 50)), 3) if cached_latencies else None,
+            'avg_response_length': round(float(np.mean([r['response_length'] for r in results])), 1) if results else 0,
+            'wall_seconds': round(wall_seconds, 2),
+            'cases_per_minute': round(len(results) / wall_seconds * 60, 2) if wall_seconds else None,
+            'category_scores': {category: round(float(np.mean(scores)), 4) for category, scores in by_category.items()}
+        }
+    
+    def model_digest(self):
+        """'ollama list' kimliği (özetin ilk 12 karakteri)"""
+        try:
+            for model in self.client.list_models():
+                if model['name'] in (self.model_name, f"{self.model_name}:latest"):
+                    return model.get('digest', '')[:12] or None
+        except OllamaError:
+            pass
+        return None
+    
+    def load_build_info(self):
+        if os.path.exists(self.build_cache_path):
+            try:
+                with open(self.build_cache_path, 'r', encoding='utf-8') as f:
+                    return json.load(f).get(self.model_name)
+            except (OSError, json.JSONDecodeError):
+                pass
+        return None
+    
+    def previous_report(self, model_digest):
+        """Aynı modelin farklı bir derlemesi için yazılmış en son rapor"""
+        if not os.path.isdir(self.report_dir):
+            return None
+        candidates = []
+        for filename in os.listdir(self.report_dir):
+            if not filename.endswith('.json'):
+                continue
+            path = os.path.join(self.report_dir, filename)
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    report = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                continue
+            if report.get('model') == self.model_name and report.get('model_digest') != model_digest:
+                candidates.append(report)
+        return max(candidates, key=lambda report: report['timestamp']) if candidates else None
+    
+    def compare(self, report, previous):
+        """Özet metriklerin ve ortak vakaların puan farkları"""
+        metrics = ['avg_score', 'latency_p50', 'latency_p95', 'avg_tokens_per_second', 'avg_response_length']
+        deltas = {}
+        for metric in metrics:
+            current, before = report['summary'].get(metric), previous['summary'].get(metric)
+            if current is not None and before is not None:
+                deltas[metric] = round(current - before, 4)
+        
+        previous_scores = {r['id']: r['score'] for r in previous['results']}
+        changed = [
+            {'id': r['id'], 'score': r['score'], 'previous_score': previous_scores[r['id']]}
+            for r in report['results'] if r['id'] in previous_scores and r['score'] != previous_scores[r['id']]
+        ]
+        return {
+            'previous_model_digest': previous.get('model_digest'),
+            'previous_timestamp': previous['timestamp'],
+            'deltas': deltas,
+            'regressions': [c for c in changed if c['score'] < c['previous_score']],
+            'improvements': [c for c in changed if c['score'] > c['previous_score']]
+        }
     
     def evaluate_model_performance(self):
         """Model performansını değerlendir"""
-        print("📊 Model performansı değerlendiriliyor...")
-        
-        test_cases = [
-            {
-                'category': 'Electronics',
-                'keyword': 'wireless earbuds',
-                'expected_elements': ['battery life', 'wireless', 'sound quality', 'bluetooth']
-            },
-            {
-                'category': 'Fashion',
-                'keyword': 'summer dress',
-                'expected_elements': ['fabric', 'style', 'comfort', 'occasion']
-            },
-            {
-                'category': 'Beauty',
-                'keyword': 'anti-aging cream',
-                'expected_elements': ['skin', 'ingredients', 'benefits', 'application']
-            }
-        ]
-        
-        results = []
-        
-        for test_case in test_cases:
-            try:
-                prompt = f"Create a Shopify product description for {test_case['keyword']} in {test_case['category']} category."
-                
-                # Subprocess ile ollama çalıştır
-                cmd = ['ollama', 'run', self.model_name, prompt]
-                result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-                
-                if result.returncode == 0:
-                    generated_text = result.stdout.strip().lower()
-                    
-                    # Beklenen elementleri kontrol et
-                    found_elements = []
-                    for element in test_case['expected_elements']:
-                        if element.lower() in generated_text:
-                            found_elements.append(element)
-                    
-                    score = len(found_elements) / len(test_case['expected_elements'])
-                    
-                    results.append({
-                        'test_case': test_case['keyword'],
-                        'category': test_case['category'],
-                        'score': score,
-                        'found_elements': found_elements,
-                        'response_length': len(generated_text)
-                    })
-                    
-                    print(f"✅ {test_case['keyword']}: {score:.2f} puan")
-                else:
-                    print(f"❌ Test hatası {test_case['keyword']}: {result.stderr}")
-                
-            except subprocess.TimeoutExpired:
-                print(f"⏱️ Test timeout {test_case['keyword']}")
-            except Exception as e:
-                print(f"❌ Test hatası {test_case['keyword']}: {e}")
-        
-        # Ortalama performans
-        if results:
-            avg_score = sum(r['score'] for r in results) / len(results)
-            print(f"📊 Ortalama performans: {avg_score:.2f}")
+        test_cases = self.load_test_suite()
+        print(f"📊 Model performansı değerlendiriliyor: {self.model_name} "
+              f"({len(test_cases)} vaka, {self.max_workers} paralel)")
+        # Önbellek anahtarı; özet okunamazsa önbellek kullanılmaz
+        self.digest = self.model_digest()
+        
+        results, failures = [], []
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self.run_case, case): case for case in test_cases}
+            for done, future in enumerate(as_completed(futures), 1):
+                case = futures[future]
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    failures.append({'id': case['id'], 'error': str(e)})
+                    print(f"❌ Test hatası {case['id']}: {e}")
+                if done % 25 == 0 or done == len(test_cases):
+                    print(f"🔄 {done}/{len(test_cases)} vaka tamamlandı")
+        
+        # Rapor sırası paket sırasıyla aynı olsun
+        order = {case['id']: number for number, case in enumerate(test_cases)}
+        results.sort(key=lambda r: order[r['id']])
+        
+        model_digest = self.digest
+        report = {
+            'model': self.model_name,
+            'model_digest': model_digest,
+            'build': self.load_build_info(),
+            'suite': self.suite_path,
+            'max_workers': self.max_workers,
+            'timestamp': datetime.now().isoformat(),
+            'summary': self.summarize(results, failures, time.perf_counter() - start),
+            'results': results,
+            'failures': failures
+        }
+        previous = self.previous_report(model_digest)
+        if previous:
+            report['comparison'] = self.compare(report, previous)
         
+        report_path = self.save_report(report)
+        self.print_report(report, report_path)
+        self.last_report = report
         return results
+    
+    def save_report(self, report):
+        os.makedirs(self.report_dir, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        report_path = os.path.join(self.report_dir, f"eval_{self.model_name.replace(':', '_')}_{stamp}.json")
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        return report_path
+    
+    def print_report(self, report, report_path):
+        summary = report['summary']
+        print(f"📊 Ortalama performans: {summary['avg_score']:.2f} "
+              f"({summary['completed']}/{summary['cases']} vaka, {summary['failed']} hata, "
+              f"{summary['cached']} önbellekten)")
+        if summary['latency_p50'] is not None:
+            print(f"⏱️ Gecikme p50 {summary['latency_p50']} sn, p95 {summary['latency_p95']} sn, "
+                  f"{summary['avg_tokens_per_second']} token/sn, {summary['cases_per_minute']} vaka/dk "
+                  f"({summary['measured']} ölçülen vaka)")
+        elif summary['cached']:
+            print(f"⏱️ Tüm vakalar önbellekten; gecikme ölçülmedi (önceki ölçüm p50 {summary['cached_latency_p50']} sn)")
+        comparison = report.get('comparison')
+        if comparison:
+            deltas = ', '.join(f"{metric} {delta:+}" for metric, delta in comparison['deltas'].items())
+            print(f"🔄 Önceki derlemeye göre ({comparison['previous_model_digest']}): {deltas}")
+            print(f"   {len(comparison['improvements'])} vaka iyileşti, {len(comparison['regressions'])} vaka geriledi")
+        print(f"💾 Değerlendirme raporu: {report_path}")
 
 def main():
     """Ana fonksiyon"""
@@ -0,0 +1,136 @@
+"""
+API başlangıcında model ısıtma ve canlı tutma
+Varsayılan model ve WARMUP_MODELS ile verilen ek modeller arka planda
+belleğe yüklenir (keep_alive süresiyle), ardından bu süre dolmadan düzenli
+aralıklarla yoklanır. Ollama modeli bir şekilde boşaltmışsa yoklama onu
+yeniden yükler; böylece yükleme süresi kullanıcı isteğine yansımaz.
+Bir yerleşim yöneticisi verilirse keep_alive değerini o belirler ve yalnızca
+sabitlenmiş modeller yoklanır (bellekten çıkarılanlar geri yüklenmez).
+"""
+
+import os
+import threading
+import time
+from datetime import datetime
+
+from ollama_client import OllamaClient, OllamaError, DEFAULT_KEEP_ALIVE
+from model_residency import canonical_name
+
+
+def parse_duration(value):
+    """'30m', '1h', '90s' veya saniye cinsinden sayı → saniye"""
+    value = str(value).strip()
+    units = {'s': 1, 'm': 60, 'h': 3600}
+    if value and value[-1] in units:
+        return float(value[:-1]) * units[value[-1]]
+    return float(value)
+
+
+class ModelWarmer:
+    """Modelleri arka planda ısıtır ve keep_alive süresini yeniler"""
+
+    def __init__(self, models, client=None, keep_alive=DEFAULT_KEEP_ALIVE, ping_interval=None, residency=None):
+        self.models = list(dict.fromkeys(model for model in models if model))
+        self.client = client or OllamaClient()
+        self.keep_alive = keep_alive
+        self.residency = residency
+        if ping_interval is None:
+            # Bekleme süresinin yarısında bir yenile (en az 30 sn)
+            keep_alive_seconds = parse_duration(keep_alive)
+            ping_interval = max(30.0, keep_alive_seconds / 2) if keep_alive_seconds > 0 else 240.0
+        self.ping_interval = ping_interval
+
+        self.state = {model: {'ready': False, 'load_seconds': None, 'last_ping': None, 'error': None}
+                      for model in self.models}
+        self.warmup_done = False
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def warm(self, model):
+        """Modeli yükle veya bekleme süresini yenile; başarı durumunu döndür"""
+        start = time.monotonic()
+        keep_alive = self.residency.keep_alive_for(model) if self.residency else self.keep_alive
+        try:
+            load_seconds = self.client.preload(model, keep_alive=keep_alive)
+        except OllamaError as e:
+            with self.lock:
+                self.state[model].update({'ready': False, 'error': str(e)})
+            return False
+
+        with self.lock:
+            entry = self.state[model]
+            # Kısa yükleme süresi modelin zaten bellekte olduğunu gösterir
+            if entry['load_seconds'] is None or load_seconds > 1.0:
+                entry['load_seconds'] = round(load_seconds, 2)
+            entry.update({'ready': True, 'error': None, 'last_ping': datetime.now().isoformat(),
+                          'ping_seconds': round(time.monotonic() - start, 2)})
+        return True
+
+    def warm_all(self):
+        for model in self.models:
+            if self.stop_event.is_set():
+                break
+            if self.warm(model):
+                print(f"🔥 Model ısıtıldı: {model} ({self.state[model]['load_seconds']} sn yükleme)")
+            else:
+                print(f"⚠️ Model ısıtılamadı: {model} - {self.state[model]['error']}")
+        self.warmup_done = True
+
+    def _run(self):
+        if self.residency:
+            self.residency.refresh(force=True)
+            self.residency.plan_pins()
+        self.warm_all()
+        while not self.stop_event.wait(self.ping_interval):
+            for model in self.models:
+                if self.residency and canonical_name(model) not in self.residency.pinned:
+                    continue
+                self.warm(model)
+            if self.residency:
+                self.residency.refresh(force=True)
+
+    def start(self):
+        """Isıtmayı arka planda başlat (istek işleme engellenmez)"""
+        if self.thread is None and self.models:
+            self.thread = threading.Thread(target=self._run, name="model-warmup", daemon=True)
+            self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+
+    def is_ready(self, model):
+        with self.lock:
+            return self.state.get(model, {}).get('ready', False)
+
+    def status(self):
+        with self.lock:
+            models = {model: dict(entry) for model, entry in self.state.items()}
+        return {
+            'warmup_done': self.warmup_done,
+            'keep_alive': self.keep_alive,
+            'ping_interval': self.ping_interval,
+            'models': models
+        }
+
+
+def warmup_models(default_model):
+    """DEFAULT_MODEL + WARMUP_MODELS (virgülle ayrılmış)"""
+    extra = [model.strip() for model in os.getenv('WARMUP_MODELS', '').split(',') if model.strip()]
+    return [default_model] + extra
+
+
+def warmer_from_env(default_model, residency=None):
+    """WARMUP_MODELS, OLLAMA_KEEP_ALIVE ve WARMUP_PING_INTERVAL ayarlarıyla"""
+    interval = os.getenv('WARMUP_PING_INTERVAL')
+    keep_alive = os.getenv('OLLAMA_KEEP_ALIVE', DEFAULT_KEEP_ALIVE)
+    # Ollama birimsiz değeri saniye sayısı olarak bekler (-1 = süresiz)
+    if keep_alive.lstrip('-').isdigit():
+        keep_alive = int(keep_alive)
+    return ModelWarmer(
+        warmup_models(default_model),
+        keep_alive=keep_alive,
+        ping_interval=float(interval) if interval else None,
+        residency=residency
+    )
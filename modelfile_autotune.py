@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Modelfile çalışma parametresi ayarlayıcı (CPU çıkarımı)
+Temsilî istem kümesiyle num_thread, num_batch ve num_ctx değerlerini sırayla
+(her adımda diğerleri o ana kadarki en iyi değerde sabit) tarar; her
+yapılandırmada istem işleme (prefill) ve üretim (decode) hızını ölçer.
+num_predict, sınırsız üretimli bir ön çalıştırmada gözlenen çıktı
+uzunluğunun p95'ine pay eklenerek belirlenir; num_ctx adayları istem + çıktı
+uzunluğuna sığmayanlar elenerek seçilir. Temel ölçüm taramayla aynı üretim
+sınırında yapılır, böylece önce/sonra süreleri karşılaştırılabilir. En iyi
+yapılandırma ölçümlerle birlikte model_tuning.json dosyasına ve üretilen bir
+Modelfile'a yazılır; trainer sonraki derlemelerde bu parametreleri yalnızca
+ölçülen model, temel model ve nicemleme düzeyi için kullanır.
+"""
+
+import argparse
+import json
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+
+from model_trainer import DEFAULT_EVAL_SUITE, OllamaModelTrainer, load_test_suite
+from ollama_client import OllamaClient, OllamaError
+
+# Tarama sırasında üretim kısa tutulur; decode hızı çıktı uzunluğundan büyük ölçüde bağımsızdır
+SWEEP_NUM_PREDICT = 128
+CONTEXT_SIZES = [1024, 2048, 4096, 8192]
+BATCH_SIZES = [128, 256, 512]
+
+
+def thread_candidates():
+    """Mantıksal çekirdek sayısı ve altı (SMT'de fiziksel çekirdek sayısı genelde en iyisidir)"""
+    cores = os.cpu_count() or 4
+    return sorted({max(1, cores // 4), max(1, cores // 2), max(1, cores - 1), cores})
+
+
+def round_up(value, step):
+    return int(-(-value // step) * step)
+
+
+class ModelfileAutotuner:
+    """Koordinat taramasıyla CPU çalışma parametrelerini ölç ve seç"""
+
+    def __init__(self, model_name="shopify-gpt", prompts=None, timeout=600):
+        self.model_name = model_name
+        self.client = OllamaClient(timeout=timeout)
+        self.prompts = prompts or self.load_prompts()
+        self.trials = []
+
+    @staticmethod
+    def load_prompts(count=6):
+        """Değerlendirme paketinden temsilî istemler"""
+        prompts = [case['prompt'] for case in load_test_suite(os.getenv('EVAL_SUITE', DEFAULT_EVAL_SUITE))]
+        step = max(1, len(prompts) // count)
+        return prompts[::step][:count]
+
+    def measure(self, options, label=""):
+        """Yapılandırmayı tüm istemlerde çalıştır; hızların ve gecikmenin medyanı"""
+        # Parametre değişikliği modeli yeniden yükletir; ısınma isteği ölçüme katılmaz
+        self.client.generate(self.model_name, "Hello", options=dict(options, num_predict=8))
+
+        prefill, decode, latency, prompt_tokens, output_tokens = [], [], [], [], []
+        for number, prompt in enumerate(self.prompts):
+            # Ardışık aynı yapılandırmalar önbellekteki istemi yeniden kullanmasın
+            start = time.perf_counter()
+            result = self.client.generate(self.model_name, f"[{len(self.trials)}.{number}] {prompt}", options=options)
+            latency.append(time.perf_counter() - start - result['load_seconds'])
+            prompt_tokens.append(result.get('prompt_eval_count', 0))
+            output_tokens.append(result.get('eval_count', 0))
+            if result['prompt_eval_seconds']:
+                prefill.append(result.get('prompt_eval_count', 0) / result['prompt_eval_seconds'])
+            if result['eval_seconds']:
+                decode.append(result.get('eval_count', 0) / result['eval_seconds'])
+
+        trial = {
+            'options': dict(options),
+            'prefill_tokens_per_second': round(float(np.median(prefill)), 2) if prefill else None,
+            'decode_tokens_per_second': round(float(np.median(decode)), 2) if decode else None,
+            'latency_p50': round(float(np.median(latency)), 3),
+            'prompt_tokens_max': int(max(prompt_tokens)),
+            'prompt_tokens_avg': round(float(np.mean(prompt_tokens)), 1),
+            'output_tokens': output_tokens
+        }
+        self.trials.append(trial)
+        print(f"🔄 {label or options}: prefill {trial['prefill_tokens_per_second']} tok/sn, "
+              f"decode {trial['decode_tokens_per_second']} tok/sn, p50 {trial['latency_p50']} sn")
+        return trial
+
+    @staticmethod
+    def cost(trial, prompt_tokens, output_tokens):
+        """Tipik bir istek için tahmini süre: prefill + decode"""
+        if not trial['prefill_tokens_per_second'] or not trial['decode_tokens_per_second']:
+            return float('inf')
+        return prompt_tokens / trial['prefill_tokens_per_second'] + output_tokens / trial['decode_tokens_per_second']
+
+    def tune(self, max_predict=2048):
+        print(f"🔧 {self.model_name} için {len(self.prompts)} istemle ayar taraması")
+
+        # Çıktı uzunluk dağılımı için üretim sınırsız ön çalıştırma (hız karşılaştırmasına girmez)
+        probe = self.measure({'num_predict': max_predict}, "uzunluk")
+        typical_output = float(np.percentile(probe['output_tokens'], 95)) if probe['output_tokens'] else SWEEP_NUM_PREDICT
+        num_predict = min(max_predict, round_up(typical_output * 1.25 + 1, 64))
+        required_context = probe['prompt_tokens_max'] + num_predict
+        prompt_tokens = probe['prompt_tokens_avg']
+
+        # Temel ölçüm: mevcut Modelfile ayarları, taramayla aynı üretim sınırında
+        baseline = self.measure({'num_predict': SWEEP_NUM_PREDICT}, "temel")
+
+        # None = Ollama'nın kendi varsayılanı (seçilirse Modelfile'a yazılmaz); ayar temelden kötü olamaz
+        best = {'num_predict': SWEEP_NUM_PREDICT}
+        context_sizes = [size for size in CONTEXT_SIZES if size >= required_context] or [round_up(required_context, 1024)]
+        sweeps = [
+            ('num_thread', [None] + thread_candidates()),
+            ('num_batch', [None] + BATCH_SIZES),
+            ('num_ctx', context_sizes)
+        ]
+        for name, candidates in sweeps:
+            scored = []
+            for value in candidates:
+                options = dict(best, **{name: value})
+                if name != 'num_ctx':
+                    options.setdefault('num_ctx', context_sizes[0])
+                options = {key: option for key, option in options.items() if option is not None}
+                trial = self.measure(options, f"{name}={value if value is not None else 'varsayılan'}")
+                scored.append((self.cost(trial, prompt_tokens, typical_output), value, trial))
+            _, best[name], best_trial = min(scored, key=lambda item: item[0])
+            print(f"✅ {name} = {best[name] if best[name] is not None else 'varsayılan'}")
+
+        best = {name: value for name, value in best.items() if value is not None}
+
+        best['num_predict'] = num_predict
+        return {
+            'model': self.model_name,
+            'parameters': best,
+            'baseline': {key: value for key, value in baseline.items() if key != 'output_tokens'},
+            'best_trial': {key: value for key, value in best_trial.items() if key != 'output_tokens'},
+            'estimated_request_seconds': {
+                'baseline': round(self.cost(baseline, prompt_tokens, typical_output), 3),
+                'tuned': round(self.cost(best_trial, prompt_tokens, typical_output), 3)
+            },
+            'typical_output_tokens': typical_output,
+            'required_context': required_context,
+            'prompts': len(self.prompts),
+            'cpu_count': os.cpu_count(),
+            'trials': self.trials,
+            'tuned_at': datetime.now().isoformat()
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Modelfile CPU çalışma parametresi ayarlayıcı")
+    parser.add_argument("--model", default="shopify-gpt", help="Ölçülecek model")
+    parser.add_argument("--base", help="Üretilecek Modelfile'ın temel modeli (varsayılan: son derleme)")
+    parser.add_argument("--output", default="Modelfile_tuned", help="Üretilecek Modelfile")
+    parser.add_argument("--max-predict", type=int, default=2048, help="num_predict üst sınırı")
+    args = parser.parse_args()
+
+    trainer = OllamaModelTrainer()
+    trainer.model_name = args.model
+    build = trainer.load_build_cache().get(args.model, {})
+    trainer.quantization = build.get('quantization')
+    base_model = args.base or build.get('base_model') or trainer.base_model
+
+    tuner = ModelfileAutotuner(args.model)
+    try:
+        tuning = tuner.tune(args.max_predict)
+    except OllamaError as e:
+        print(f"❌ Ayar taraması başarısız: {e}")
+        return
+
+    # Ayar yalnızca bu model, temel model (özeti) ve nicemleme düzeyi için geçerlidir
+    tuning['base_model'] = base_model
+    tuning['base_model_digest'] = (build.get('base_model_digest') if build.get('base_model') == base_model
+                                   else None) or trainer.get_model_digest(base_model)
+    tuning['quantization'] = build.get('quantization')
+    with open(trainer.tuning_path, 'w', encoding='utf-8') as f:
+        json.dump(tuning, f, ensure_ascii=False, indent=2)
+
+    # Ölçümler Modelfile'a yorum olarak eklenir
+    best = tuning['best_trial']
+    header = (f"# modelfile_autotune.py {tuning['tuned_at']} ({os.cpu_count()} CPU)\n"
+              f"# prefill {best['prefill_tokens_per_second']} tok/sn, decode {best['decode_tokens_per_second']} tok/sn, "
+              f"tahmini istek {tuning['estimated_request_seconds']['tuned']} sn "
+              f"(önce {tuning['estimated_request_seconds']['baseline']} sn)\n")
+    with open(args.output, 'w', encoding='utf-8') as f:
+        f.write(header + trainer.render_modelfile(base_model, tuning['parameters']))
+
+    print(f"💾 Ayarlar: {trainer.tuning_path}, Modelfile: {args.output}")
+    print(f"⚙️ {', '.join(f'{name}={value}' for name, value in tuning['parameters'].items())}")
+
+
+if __name__ == "__main__":
+    main()
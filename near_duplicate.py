@@ -0,0 +1,186 @@
+"""
+MinHash/LSH ile yakın kopya eğitim örneği tespiti
+Aynı ürün farklı mağazalarda neredeyse aynı açıklamayla satıldığında
+ortaya çıkan tekrarlı örnekleri, ikili karşılaştırma yapmadan
+(alt-karesel sürede) kümeler ve her kümeden yalnızca ilkini tutar.
+"""
+
+import re
+import zlib
+from collections import defaultdict
+
+import numpy as np
+
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64((1 << 32) - 1)
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def shingle_hashes(text, ngram=3):
+    """Kelime n-gram'larının 32 bit özetleri"""
+    words = TOKEN_PATTERN.findall(text.lower())
+    if len(words) < ngram:
+        shingles = [" ".join(words)] if words else []
+    else:
+        shingles = [" ".join(words[i:i + ngram]) for i in range(len(words) - ngram + 1)]
+    return np.fromiter((zlib.crc32(s.encode('utf-8')) for s in set(shingles)), dtype=np.uint64)
+
+
+class MinHashLSH:
+    """
+    MinHash imzaları ve LSH bantlama.
+    num_perm = bands * rows; iki metnin aynı kovaya düşme olasılığı
+    Jaccard benzerliği s için 1 - (1 - s^rows)^bands olur.
+    """
+
+    def __init__(self, threshold=0.85, num_perm=128, bands=None, ngram=3, seed=1):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.ngram = ngram
+        self.bands = bands or self._optimal_bands(threshold, num_perm)
+        self.rows = num_perm // self.bands
+
+        rng = np.random.RandomState(seed)
+        self.perm_a = rng.randint(1, 1 << 31, size=num_perm, dtype=np.int64).astype(np.uint64)
+        self.perm_b = rng.randint(0, 1 << 31, size=num_perm, dtype=np.int64).astype(np.uint64)
+
+        # bant -> kova anahtarı -> temsilci örnek sırası
+        self.buckets = [dict() for _ in range(self.bands)]
+        self.signatures = {}
+
+    @staticmethod
+    def _optimal_bands(threshold, num_perm, false_negative_weight=0.7, steps=200):
+        """
+        Eşiğin altındaki çarpışma (yanlış pozitif) ve üstündeki kaçırma
+        (yanlış negatif) alanlarının ağırlıklı toplamını en aza indiren bant
+        sayısı. Adaylar imzayla doğrulandığından kaçırmalar daha ağır sayılır.
+        """
+        def collision(s, bands, rows):
+            return 1 - (1 - s ** rows) ** bands
+
+        best, best_error = 1, float('inf')
+        for bands in range(1, num_perm + 1):
+            if num_perm % bands:
+                continue
+            rows = num_perm // bands
+            below = [threshold * i / steps for i in range(steps)]
+            above = [threshold + (1 - threshold) * i / steps for i in range(steps)]
+            false_positive = sum(collision(s, bands, rows) for s in below) * threshold / steps
+            false_negative = sum(1 - collision(s, bands, rows) for s in above) * (1 - threshold) / steps
+            error = (1 - false_negative_weight) * false_positive + false_negative_weight * false_negative
+            if error < best_error:
+                best, best_error = bands, error
+        return best
+
+    def signatures_for(self, texts):
+        """Bir metin grubunun MinHash imzalarını tek seferde (vektörel) hesapla"""
+        hashes = [shingle_hashes(text, self.ngram) for text in texts]
+        lengths = np.array([len(h) for h in hashes])
+        signatures = np.full((len(texts), self.num_perm), MAX_HASH, dtype=np.uint64)
+
+        non_empty = lengths > 0
+        if not non_empty.any():
+            return signatures
+
+        all_hashes = np.concatenate([h for h in hashes if len(h)])
+        # (a * x + b) mod p; a, x < 2^32 olduğundan çarpım uint64 sınırına sığar
+        permuted = (np.outer(self.perm_a, all_hashes) + self.perm_b[:, None]) % MERSENNE_PRIME
+        permuted &= MAX_HASH
+
+        offsets = np.concatenate(([0], np.cumsum(lengths[non_empty])[:-1]))
+        signatures[non_empty] = np.minimum.reduceat(permuted, offsets, axis=1).T
+        return signatures
+
+    def band_keys(self, signature, namespace=""):
+        rows = signature.astype(np.uint32).reshape(self.bands, self.rows)
+        return [hash((namespace, band, rows[band].tobytes())) for band in range(self.bands)]
+
+    def query_or_insert(self, item_id, signature, namespace=""):
+        """
+        İmzaya yeterince benzeyen bir temsilci varsa onun kimliğini döndür,
+        yoksa imzayı indekse ekleyip None döndür.
+        """
+        keys = self.band_keys(signature, namespace)
+        checked = set()
+
+        for band, key in enumerate(keys):
+            candidate = self.buckets[band].get(key)
+            if candidate is None or candidate in checked:
+                continue
+            checked.add(candidate)
+            similarity = float(np.mean(self.signatures[candidate] == signature.astype(np.uint32)))
+            if similarity >= self.threshold:
+                return candidate
+
+        # Maskelenmiş değerler 32 bite sığar; bellek için uint32 saklanır
+        self.signatures[item_id] = signature.astype(np.uint32)
+        for band, key in enumerate(keys):
+            self.buckets[band].setdefault(key, item_id)
+        return None
+
+
+class NearDuplicateRemover:
+    """Eğitim örneği akışından yakın kopyaları ayıkla ve küme raporu tut"""
+
+    def __init__(self, threshold=0.85, num_perm=128, ngram=3, field='output', per_task_type=True, batch_size=256):
+        self.lsh = MinHashLSH(threshold=threshold, num_perm=num_perm, ngram=ngram)
+        self.field = field
+        self.per_task_type = per_task_type
+        self.batch_size = batch_size
+        self.clusters = defaultdict(list)
+        self.representatives = {}
+        self.kept = 0
+        self.removed = 0
+        # filter() birden çok kez çağrılabilir (akış modu); sıralar çakışmasın
+        self.next_index = 0
+
+    def _process_batch(self, batch, start_index):
+        texts = [example.get(self.field, '') or '' for example in batch]
+        signatures = self.lsh.signatures_for(texts)
+
+        for offset, (example, signature) in enumerate(zip(batch, signatures)):
+            index = start_index + offset
+            namespace = example.get('task_type', '') if self.per_task_type else ''
+            representative = self.lsh.query_or_insert(index, signature, namespace)
+
+            if representative is None:
+                self.representatives[index] = texts[offset][:80]
+                self.kept += 1
+                yield example
+            else:
+                self.clusters[representative].append(texts[offset][:200])
+                self.removed += 1
+
+    def filter(self, examples):
+        """Yakın kopyası olmayan örnekleri sırayla üret"""
+        batch = []
+        for example in examples:
+            batch.append(example)
+            if len(batch) >= self.batch_size:
+                start_index, self.next_index = self.next_index, self.next_index + len(batch)
+                yield from self._process_batch(batch, start_index)
+                batch = []
+        if batch:
+            start_index, self.next_index = self.next_index, self.next_index + len(batch)
+            yield from self._process_batch(batch, start_index)
+
+    def report(self, max_clusters=100):
+        """Kaldırılan kümelerin özeti (en büyük kümeler önce)"""
+        clusters = sorted(self.clusters.items(), key=lambda item: len(item[1]), reverse=True)
+        return {
+            'threshold': self.lsh.threshold,
+            'num_perm': self.lsh.num_perm,
+            'bands': self.lsh.bands,
+            'rows': self.lsh.rows,
+            'kept': self.kept,
+            'removed': self.removed,
+            'cluster_count': len(clusters),
+            'clusters': [
+                {
+                    'representative': self.representatives.get(index, ''),
+                    'removed_count': len(removed),
+                    'removed_examples': removed[:5]
+                }
+                for index, removed in clusters[:max_clusters]
+            ]
+        }
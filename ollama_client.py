@@ -0,0 +1,99 @@
+"""
+Ollama HTTP istemcisi
+'ollama run' alt süreci yerine sunucunun REST API'sini kullanır; böylece
+keep_alive (modelin bellekte kalma süresi) istek başına kontrol edilir,
+yüklü modeller (/api/ps) ve zamanlama bilgileri (yükleme, istem, üretim
+süreleri) okunabilir. Sunucu adresi OLLAMA_HOST ile değiştirilebilir.
+"""
+
+import os
+
+import requests
+
+DEFAULT_HOST = "http://localhost:11434"
+DEFAULT_KEEP_ALIVE = "30m"
+NANOSECONDS = 1e9
+
+
+def ollama_host():
+    host = os.getenv('OLLAMA_HOST', DEFAULT_HOST)
+    if not host.startswith(('http://', 'https://')):
+        host = f"http://{host}"
+    return host.rstrip('/')
+
+
+class OllamaError(Exception):
+    """Ollama sunucusu hata döndürdü veya erişilemedi"""
+
+
+class OllamaClient:
+    def __init__(self, host=None, timeout=120):
+        self.host = host or ollama_host()
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def _request(self, method, path, timeout=None, **kwargs):
+        try:
+            response = self.session.request(method, f"{self.host}{path}", timeout=timeout or self.timeout, **kwargs)
+        except requests.RequestException as e:
+            raise OllamaError(f"Ollama'ya ulaşılamadı: {e}") from e
+        if response.status_code != 200:
+            raise OllamaError(f"Ollama {response.status_code}: {response.text[:200]}")
+        return response.json()
+
+    def is_available(self):
+        try:
+            self._request('GET', '/api/version', timeout=3)
+            return True
+        except OllamaError:
+            return False
+
+    def list_models(self):
+        """Yerel modeller (/api/tags): ad, özet, boyut"""
+        return self._request('GET', '/api/tags').get('models', [])
+
+    def running_models(self):
+        """Bellekteki modeller (/api/ps): ad, boyut, VRAM, bitiş zamanı"""
+        return self._request('GET', '/api/ps').get('models', [])
+
+    def generate(self, model, prompt, system=None, options=None, keep_alive=None, timeout=None):
+        """
+        Tek seferlik (akışsız) üretim. Dönen sözlükte 'response' metni ve
+        saniyeye çevrilmiş süreler bulunur: load_seconds, prompt_eval_seconds,
+        eval_seconds, total_seconds; token sayıları prompt_eval_count ve eval_count.
+        """
+        payload = {'model': model, 'prompt': prompt, 'stream': False}
+        if system is not None:
+            payload['system'] = system
+        if options:
+            payload['options'] = options
+        if keep_alive is not None:
+            payload['keep_alive'] = keep_alive
+
+        result = self._request('POST', '/api/generate', timeout=timeout, json=payload)
+        for field in ('load_duration', 'prompt_eval_duration', 'eval_duration', 'total_duration'):
+            result[field.replace('_duration', '_seconds')] = result.get(field, 0) / NANOSECONDS
+        return result
+
+    def chat(self, model, messages, options=None, keep_alive=None, timeout=None):
+        """Sohbet uç noktası (/api/chat); 'message' ve süreler generate ile aynı biçimde"""
+        payload = {'model': model, 'messages': messages, 'stream': False}
+        if options:
+            payload['options'] = options
+        if keep_alive is not None:
+            payload['keep_alive'] = keep_alive
+
+        result = self._request('POST', '/api/chat', timeout=timeout, json=payload)
+        for field in ('load_duration', 'prompt_eval_duration', 'eval_duration', 'total_duration'):
+            result[field.replace('_duration', '_seconds')] = result.get(field, 0) / NANOSECONDS
+        return result
+
+    def preload(self, model, keep_alive=DEFAULT_KEEP_ALIVE, timeout=600):
+        """Modeli istem göndermeden belleğe yükle (veya bekleme süresini yenile)"""
+        result = self._request('POST', '/api/generate', timeout=timeout,
+                               json={'model': model, 'keep_alive': keep_alive, 'stream': False})
+        return result.get('load_duration', 0) / NANOSECONDS
+
+    def unload(self, model):
+        """keep_alive=0 ile modeli hemen bellekten çıkar"""
+        self._request('POST', '/api/generate', json={'model': model, 'keep_alive': 0, 'stream': False})
@@ -0,0 +1,185 @@
+"""
+Erken kalite filtresi
+Çekilen ürün verisini AI zenginleştirmesinden ve kayıttan önce ucuz
+kurallarla eler: minimum açıklama uzunluğu, dil, kalıp metin (kargo
+politikası, çerez bildirimi vb.) ve daha önce kaydedilmiş kayıtlara
+yakın kopya kontrolü (SimHash).
+"""
+
+import hashlib
+import json
+import os
+import re
+from collections import Counter
+
+WORD_PATTERN = re.compile(r"\w+", re.UNICODE)
+SENTENCE_PATTERN = re.compile(r"(?<=[.!?])\s+")
+
+# Ürün açıklaması yerine sayfaya sızan kalıp metinler
+DEFAULT_BOILERPLATE_PATTERNS = [
+    r"shipping polic", r"refund polic", r"return polic", r"privacy polic", r"terms of service",
+    r"we use cookies", r"this (web)?site uses cookies", r"accept (all )?cookies", r"cookie (settings|preferences)",
+    r"sign up for (our|the) newsletter", r"subscribe to (our|the) newsletter", r"enable javascript",
+    r"log ?in to your account", r"create an account", r"your cart is empty", r"all rights reserved",
+    r"kargo politikas", r"iade politikas", r"gizlilik politikas", r"çerez politikas",
+    # Tek başına "çerez" atıştırmalık ürünleri de eler; yalnızca bildirim kalıpları
+    r"çerezleri kabul", r"çerez (ayarlar|tercihler)", r"çerez(ler)? kullan", r"bültenimize abone",
+    r"sepetiniz boş", r"tüm hakları saklıdır",
+]
+
+# Basit dil tespiti için sık kullanılan kelimeler
+STOPWORDS = {
+    'en': {"the", "and", "with", "for", "your", "this", "that", "you", "our", "are", "is", "of", "to", "in", "it", "on"},
+    'tr': {"ve", "bir", "bu", "ile", "için", "da", "de", "çok", "olan", "gibi", "daha", "her", "sizin", "ürün", "en"},
+}
+TURKISH_CHARACTERS = set("çğışöüÇĞİŞÖÜ")
+
+
+def detect_language(text):
+    """Durak kelime (stopword) sayımıyla 'en', 'tr', 'other' veya 'unknown' döndür"""
+    words = [w.lower() for w in WORD_PATTERN.findall(text)]
+    if len(words) < 8:
+        return 'unknown'
+
+    scores = {lang: sum(1 for w in words if w in stopwords) for lang, stopwords in STOPWORDS.items()}
+    scores['tr'] += sum(1 for c in text if c in TURKISH_CHARACTERS) / 5
+
+    best = max(scores, key=scores.get)
+    if scores[best] < max(1, len(words) * 0.03):
+        return 'other'
+    return best
+
+
+def simhash(text, ngram=3):
+    """Kelime n-gram'ları üzerinden 64 bit SimHash parmak izi"""
+    words = [w.lower() for w in WORD_PATTERN.findall(text)]
+    if not words:
+        return 0
+
+    shingles = [" ".join(words[i:i + ngram]) for i in range(max(1, len(words) - ngram + 1))]
+    weights = [0] * 64
+    for shingle in shingles:
+        value = int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big')
+        for bit in range(64):
+            weights[bit] += 1 if value >> bit & 1 else -1
+
+    fingerprint = 0
+    for bit in range(64):
+        if weights[bit] > 0:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+class SimHashIndex:
+    """
+    Hamming mesafesi <= max_distance olan parmak izlerini bulan bant indeksi.
+    64 bit (max_distance + 1) banda bölünür; güvercin yuvası ilkesine göre
+    yakın bir kopya en az bir bantta birebir eşleşir.
+    """
+
+    def __init__(self, max_distance=3):
+        self.max_distance = max_distance
+        self.bands = max_distance + 1
+        self.band_bits = 64 // self.bands
+        self.buckets = [{} for _ in range(self.bands)]
+        self.size = 0
+
+    def _band_values(self, fingerprint):
+        mask = (1 << self.band_bits) - 1
+        return [(fingerprint >> (i * self.band_bits)) & mask for i in range(self.bands)]
+
+    def find(self, fingerprint):
+        for band, value in enumerate(self._band_values(fingerprint)):
+            for candidate in self.buckets[band].get(value, ()):
+                if bin(candidate ^ fingerprint).count('1') <= self.max_distance:
+                    return candidate
+        return None
+
+    def add(self, fingerprint):
+        for band, value in enumerate(self._band_values(fingerprint)):
+            self.buckets[band].setdefault(value, []).append(fingerprint)
+        self.size += 1
+
+
+class ProductQualityFilter:
+    """Kural tabanlı ürün kalite filtresi"""
+
+    def __init__(self, min_description_length=80, min_title_length=3, allowed_languages=('en', 'tr'),
+                 boilerplate_patterns=None, max_boilerplate_ratio=0.5, duplicate_distance=3):
+        self.min_description_length = min_description_length
+        self.min_title_length = min_title_length
+        self.allowed_languages = set(allowed_languages) if allowed_languages else None
+        self.boilerplate_pattern = re.compile(
+            "|".join(boilerplate_patterns or DEFAULT_BOILERPLATE_PATTERNS), re.IGNORECASE
+        )
+        self.max_boilerplate_ratio = max_boilerplate_ratio
+        self.duplicate_index = SimHashIndex(duplicate_distance)
+        self.rejections = Counter()
+        self.accepted = 0
+
+    def boilerplate_ratio(self, text):
+        """Kalıp metin içeren cümlelerin oranı"""
+        sentences = [s for s in SENTENCE_PATTERN.split(text) if s.strip()]
+        if not sentences:
+            return 0.0
+        matches = sum(1 for s in sentences if self.boilerplate_pattern.search(s))
+        return matches / len(sentences)
+
+    def check(self, product_data):
+        """(kabul, red nedeni) döndür; kabul edilen kayıt yakın kopya indeksine eklenir"""
+        title = (product_data.get('title') or '').strip()
+        description = (product_data.get('description') or '').strip()
+
+        if len(title) < self.min_title_length:
+            return self._reject('short_title')
+
+        if len(description) < self.min_description_length:
+            return self._reject('short_description')
+
+        if self.boilerplate_ratio(description) >= self.max_boilerplate_ratio:
+            return self._reject('boilerplate')
+
+        if self.allowed_languages:
+            language = detect_language(description)
+            if language != 'unknown' and language not in self.allowed_languages:
+                return self._reject('language')
+
+        fingerprint = simhash(f"{title} {description}")
+        if self.duplicate_index.find(fingerprint) is not None:
+            return self._reject('near_duplicate')
+
+        self.duplicate_index.add(fingerprint)
+        self.accepted += 1
+        return True, None
+
+    def _reject(self, reason):
+        self.rejections[reason] += 1
+        return False, reason
+
+    def seed(self, records):
+        """Daha önce kaydedilmiş kayıtları yakın kopya indeksine ekle"""
+        for record in records:
+            text = f"{record.get('title', '')} {record.get('description', '')}".strip()
+            if text:
+                self.duplicate_index.add(simhash(text))
+
+    def seed_from_directory(self, data_dir):
+        """Dizindeki JSON kayıt dosyalarını indeksle"""
+        if not os.path.isdir(data_dir):
+            return 0
+
+        before = self.duplicate_index.size
+        for filename in os.listdir(data_dir):
+            if not filename.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(data_dir, filename), 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                self.seed(data if isinstance(data, list) else [data])
+            except Exception as e:
+                print(f"⚠️ Kalite filtresi kayıtları okuyamadı {filename}: {e}")
+
+        return self.duplicate_index.size - before
+
+    def summary(self):
+        return {'accepted': self.accepted, 'rejected': dict(self.rejections)}
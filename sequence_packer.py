@@ -0,0 +1,216 @@
+"""
+Dizi paketleme (sequence packing) dışa aktarıcı
+Eğitim örneklerini tokenize edip sabit uzunluklu dizilere kutu paketleme
+(best-fit decreasing) ile yerleştirir ve NumPy memmap parçaları olarak yazar:
+  tokens_<n>.bin     token kimlikleri   (diziler x seq_len)
+  segments_<n>.bin   örnek sırası; 0 = dolgu. Dikkat maskesi segment
+                     sınırlarında kesilir (blok-diyagonal)
+  positions_<n>.bin  her örnekte 0'dan başlayan konum kimlikleri
+  loss_mask_<n>.bin  1 = yanıt tokenı (kayıp hesaplanır), 0 = istem/dolgu
+  examples_<n>.jsonl her dizideki örnek kimlikleri
+  index.json         şekil, veri tipleri, tokenizer ve paketleme verimi
+Kısa başlık örnekleri uzun açıklamaların boşluklarını doldurur, dolgu azalır.
+"""
+
+import bisect
+import json
+import os
+
+import numpy as np
+
+from token_counter import get_tokenizer
+
+PROMPT_TEMPLATE = "### Instruction:\n{instruction}\n\n{input_block}### Response:\n"
+DEFAULT_SEQ_LEN = 4096
+DEFAULT_BUFFER_SIZE = 20000
+DEFAULT_SHARD_SEQUENCES = 8192
+
+
+def format_prompt(example):
+    """Alpaca istem biçimi (yanıt öncesi kısım)"""
+    input_text = example.get('input', '') or ''
+    input_block = f"### Input:\n{input_text}\n\n" if input_text else ""
+    return PROMPT_TEMPLATE.format(instruction=example.get('instruction', ''), input_block=input_block)
+
+
+def encode_example(tokenizer, example):
+    """(token kimlikleri, kayıp maskesi); yanıtın sonuna EOS eklenir"""
+    prompt = tokenizer.encode(format_prompt(example))
+    response = tokenizer.encode(example.get('output', '') or '') + [tokenizer.eos_id]
+    return prompt + response, [0] * len(prompt) + [1] * len(response)
+
+
+def best_fit_decreasing(lengths, capacity):
+    """
+    Uzunlukları büyükten küçüğe sırala, her birini sığdığı en dolu kutuya koy.
+    Kalan kapasiteler sıralı tutulduğundan arama ikili aramayla yapılır.
+    Dönüş: kutu başına öğe sıraları listesi
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i], reverse=True)
+    bins = []
+    # (kalan kapasite, kutu sırası) çiftleri, kalan kapasiteye göre sıralı
+    remaining = []
+
+    for item in order:
+        length = lengths[item]
+        position = bisect.bisect_left(remaining, (length, -1))
+        if position < len(remaining):
+            space, bin_index = remaining.pop(position)
+        else:
+            space, bin_index = capacity, len(bins)
+            bins.append([])
+        bins[bin_index].append(item)
+        bisect.insort(remaining, (space - length, bin_index))
+
+    return bins
+
+
+class PackedShardWriter:
+    """Paketlenmiş dizileri sabit boyutlu memmap parçalarına yaz"""
+
+    def __init__(self, output_dir, seq_len, token_dtype, pad_id, shard_sequences=DEFAULT_SHARD_SEQUENCES):
+        self.output_dir = output_dir
+        self.seq_len = seq_len
+        self.token_dtype = token_dtype
+        self.pad_id = pad_id
+        self.shard_sequences = shard_sequences
+        self.shards = []
+        self.pending = []
+
+    def add(self, sequence):
+        """sequence: [(örnek kimliği, token listesi, kayıp maskesi), ...]"""
+        self.pending.append(sequence)
+        if len(self.pending) >= self.shard_sequences:
+            self.flush()
+
+    def _memmap(self, name, dtype, rows, fill):
+        path = os.path.join(self.output_dir, name)
+        array = np.memmap(path, dtype=dtype, mode='w+', shape=(rows, self.seq_len))
+        array[:] = fill
+        return array
+
+    def flush(self):
+        if not self.pending:
+            return
+        shard = len(self.shards)
+        rows = len(self.pending)
+        tokens = self._memmap(f"tokens_{shard}.bin", self.token_dtype, rows, self.pad_id)
+        segments = self._memmap(f"segments_{shard}.bin", np.uint16, rows, 0)
+        positions = self._memmap(f"positions_{shard}.bin", np.uint16, rows, 0)
+        loss_mask = self._memmap(f"loss_mask_{shard}.bin", np.uint8, rows, 0)
+
+        with open(os.path.join(self.output_dir, f"examples_{shard}.jsonl"), 'w', encoding='utf-8') as f:
+            for row, sequence in enumerate(self.pending):
+                offset = 0
+                for segment, (_, token_ids, mask) in enumerate(sequence, start=1):
+                    end = offset + len(token_ids)
+                    tokens[row, offset:end] = token_ids
+                    segments[row, offset:end] = segment
+                    positions[row, offset:end] = np.arange(len(token_ids))
+                    loss_mask[row, offset:end] = mask
+                    offset = end
+                f.write(json.dumps([example_id for example_id, _, _ in sequence]) + '\n')
+
+        for array in (tokens, segments, positions, loss_mask):
+            array.flush()
+        self.shards.append({'shard': shard, 'sequences': rows})
+        self.pending = []
+
+
+def pack_examples(examples, output_dir, tokenizer=None, seq_len=DEFAULT_SEQ_LEN, buffer_size=DEFAULT_BUFFER_SIZE,
+                  shard_sequences=DEFAULT_SHARD_SEQUENCES, overflow='truncate'):
+    """
+    Örnekleri paketleyip output_dir altına yaz, verim raporunu döndür.
+    Bellek sabit kalsın diye örnekler buffer_size'lık pencerelerde paketlenir.
+    seq_len'den uzun örnekler kırpılır (overflow='truncate') veya atılır ('drop').
+    """
+    tokenizer = tokenizer or get_tokenizer('byte')
+    if not hasattr(tokenizer, 'encode'):
+        raise ValueError(f"Paketleme token kimliği gerektirir; '{tokenizer.name}' yerine byte, tiktoken veya hf kullanın")
+    if seq_len > np.iinfo(np.uint16).max:
+        raise ValueError("seq_len en fazla 65535 olabilir")
+
+    os.makedirs(output_dir, exist_ok=True)
+    token_dtype = np.uint16 if tokenizer.vocab_size <= np.iinfo(np.uint16).max else np.uint32
+    writer = PackedShardWriter(output_dir, seq_len, token_dtype, tokenizer.pad_id, shard_sequences)
+    report = {'examples': 0, 'truncated': 0, 'dropped': 0, 'real_tokens': 0, 'loss_tokens': 0, 'sequences': 0}
+
+    def pack_buffer(buffer):
+        lengths = [len(token_ids) for _, token_ids, _ in buffer]
+        for bin_items in best_fit_decreasing(lengths, seq_len):
+            writer.add([buffer[item] for item in bin_items])
+            report['sequences'] += 1
+
+    buffer = []
+    for example in examples:
+        token_ids, mask = encode_example(tokenizer, example)
+        if len(token_ids) > seq_len:
+            if overflow == 'drop':
+                report['dropped'] += 1
+                continue
+            token_ids, mask = token_ids[:seq_len], mask[:seq_len]
+            report['truncated'] += 1
+
+        buffer.append((example.get('id'), token_ids, mask))
+        report['examples'] += 1
+        report['real_tokens'] += len(token_ids)
+        report['loss_tokens'] += sum(mask)
+
+        if len(buffer) >= buffer_size:
+            pack_buffer(buffer)
+            buffer = []
+
+    if buffer:
+        pack_buffer(buffer)
+    writer.flush()
+
+    capacity = report['sequences'] * seq_len
+    report.update({
+        'seq_len': seq_len,
+        # Paketli: gerçek token / toplam dizi alanı
+        'packing_efficiency': round(report['real_tokens'] / capacity, 4) if capacity else 0,
+        # Paketsiz: her örnek ayrı dizide seq_len'e dolgulanır
+        'unpacked_efficiency': round(report['real_tokens'] / (report['examples'] * seq_len), 4) if report['examples'] else 0,
+        'avg_examples_per_sequence': round(report['examples'] / report['sequences'], 2) if report['sequences'] else 0
+    })
+
+    index = {
+        'format': 'packed-memmap-v1',
+        'tokenizer': tokenizer.name,
+        'vocab_size': tokenizer.vocab_size,
+        'eos_id': tokenizer.eos_id,
+        'pad_id': tokenizer.pad_id,
+        'seq_len': seq_len,
+        'dtypes': {
+            'tokens': np.dtype(token_dtype).name,
+            'segments': 'uint16',
+            'positions': 'uint16',
+            'loss_mask': 'uint8'
+        },
+        'prompt_template': PROMPT_TEMPLATE,
+        'shards': writer.shards,
+        'report': report
+    }
+    with open(os.path.join(output_dir, "index.json"), 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False, indent=2)
+
+    return report
+
+
+def load_packed_shard(output_dir, shard=0):
+    """Bir parçayı salt okunur memmap dizileri olarak aç"""
+    with open(os.path.join(output_dir, "index.json"), 'r', encoding='utf-8') as f:
+        index = json.load(f)
+    rows = index['shards'][shard]['sequences']
+    shape = (rows, index['seq_len'])
+    return {
+        name: np.memmap(os.path.join(output_dir, f"{name}_{shard}.bin"), dtype=dtype, mode='r', shape=shape)
+        for name, dtype in index['dtypes'].items()
+    }
+
+
+def attention_mask(segments):
+    """Bir dizinin segment kimliklerinden blok-diyagonal nedensel dikkat maskesi"""
+    segments = np.asarray(segments)
+    same_segment = (segments[:, None] == segments[None, :]) & (segments[:, None] > 0)
+    return np.tril(same_segment)
@@ -4,6 +4,8 @@ import time
 import io
 import subprocess
 from dotenv import load_dotenv
+from keyword_matcher import count_keyword
+from ollama_client import OllamaClient, OllamaError, DEFAULT_KEEP_ALIVE
 
 # Try to import AI libraries with error handling
 try:
@@ -69,10 +71,10 @@ def get_ollama_models():
         return []
 
 # Shopify-optimized prompt for product description generation
-def get_shopify_prompt(keyword, language="English"):
-    if language == "Türkçe":
-        prompt = f"""
-Sen Shopify ürün açıklamaları konusunda uzman bir e-ticaret metin yazarısın. "{keyword}" ile ilgili bir ürün için kapsamlı, SEO optimize edilmiş Türkçe ürün açıklaması oluştur.
+# Sabit talimatlar sistem istemindedir ve her istekte aynı kalır; değişken ürün
+# bilgisi en sonda gelir. Böylece arka uçlar ortak öneki (KV önbelleği / istem
+# önbelleği) yeniden kullanır ve her istekte yalnızca kısa kullanıcı mesajı işlenir.
+SHOPIFY_SYSTEM_PROMPT_TR = """Sen Shopify ürün açıklamaları konusunda uzman bir e-ticaret metin yazarısın. Kullanıcının mesajın sonunda verdiği ürün için kapsamlı, SEO optimize edilmiş Türkçe ürün açıklaması oluştur.
 
 KRİTİK YAZMA PRENSİPLERİ (Yüksek Dönüşüm Örneklerine Dayalı):
 1. İLHAM VER & MOTİVE ET - Sadece açıklama yapma, müşterilerin başarı yolculuklarını hayal etmelerine yardım et
@@ -126,11 +128,9 @@ FORMAT:
 <p>[Satın alma motivasyonu ve aciliyet yaratma]</p>
 ```
 
-Lütfen bu formata uygun, etkileyici ve profesyonel bir açıklama oluştur.
-"""
-    else:
-        prompt = f"""
-You are an expert Shopify product description writer specializing in high-converting e-commerce copy. Create a comprehensive, SEO-optimized English product description for a product related to "{keyword}".
+Lütfen bu formata uygun, etkileyici ve profesyonel bir açıklama oluştur."""
+
+SHOPIFY_SYSTEM_PROMPT_EN = """You are an expert Shopify product description writer specializing in high-converting e-commerce copy. Create a comprehensive, SEO-optimized English product description for the product given at the end of the user message.
 
 CRITICAL WRITING PRINCIPLES (Based on High-Converting Examples):
 1. INSPIRE & MOTIVATE - Don't just describe, help customers envision their success journey
@@ -183,9 +183,22 @@ FORMAT:
 <p>[Purchase motivation and urgency creation]</p>
 ```
 
-Please create an engaging and professional description following this format.
-"""
-    return prompt
+Please create an engaging and professional description following this format."""
+
+
+def get_shopify_system_prompt(language="English"):
+    return SHOPIFY_SYSTEM_PROMPT_TR if language == "Türkçe" else SHOPIFY_SYSTEM_PROMPT_EN
+
+
+def get_shopify_user_prompt(keyword, language="English"):
+    if language == "Türkçe":
+        return f'Ürün: "{keyword}"\n\nBu ürün için talimatlardaki formata uygun Türkçe açıklamayı oluştur.'
+    return f'Product: "{keyword}"\n\nWrite the English description for this product following the format in your instructions.'
+
+
+def get_shopify_prompt(keyword, language="English"):
+    """Tek metin isteyen arka uçlar için: sabit önek + değişken ürün bilgisi"""
+    return f"{get_shopify_system_prompt(language)}\n\n{get_shopify_user_prompt(keyword, language)}"
 
 # Generate description with OpenAI
 def generate_with_openai(keyword, model="gpt-4o", language="English"):
@@ -196,18 +209,24 @@ def generate_with_openai(keyword, model="gpt-4o", language="English"):
         return "Error: OpenAI API key not provided."
     
     try:
-        prompt = get_shopify_prompt(keyword, language)
-        
+        # Sabit sistem istemi önde: OpenAI istem önbelleği ortak öneki yeniden kullanır
+        start = time.perf_counter()
         response = openai.chat.completions.create(
             model=model,
             messages=[
-                {"role": "system", "content": "You are an expert Shopify product description writer who creates compelling, SEO-optimized product descriptions that drive conversions."},
-                {"role": "user", "content": prompt}
+                {"role": "system", "content": get_shopify_system_prompt(language)},
+                {"role": "user", "content": get_shopify_user_prompt(keyword, language)}
             ],
             max_tokens=2000,
             temperature=0.7
         )
         
+        details = getattr(response.usage, 'prompt_tokens_details', None)
+        st.session_state['generation_stats'] = {
+            'prompt_tokens': response.usage.prompt_tokens,
+            'cached_tokens': getattr(details, 'cached_tokens', 0) or 0,
+            'total_ms': round((time.perf_counter() - start) * 1000)
+        }
         return response.choices[0].message.content.strip()
     except Exception as e:
         return f"Error generating with OpenAI: {str(e)}"
@@ -218,10 +237,16 @@ def generate_with_gemini(keyword, model="gemini-1.5-flash", language="English"):
         return "Error: Google Generative AI library not available. Please install: pip install google-generativeai"
     
     try:
-        model_instance = genai.GenerativeModel(model)
-        prompt = get_shopify_prompt(keyword, language)
+        model_instance = genai.GenerativeModel(model, system_instruction=get_shopify_system_prompt(language))
         
-        response = model_instance.generate_content(prompt)
+        start = time.perf_counter()
+        response = model_instance.generate_content(get_shopify_user_prompt(keyword, language))
+        usage = getattr(response, 'usage_metadata', None)
+        st.session_state['generation_stats'] = {
+            'prompt_tokens': getattr(usage, 'prompt_token_count', 0),
+            'cached_tokens': getattr(usage, 'cached_content_token_count', 0) or 0,
+            'total_ms': round((time.perf_counter() - start) * 1000)
+        }
         return response.text.strip()
     except Exception as e:
         return f"Error generating with Gemini: {str(e)}"
@@ -232,19 +257,23 @@ def generate_with_ollama(keyword, model="llama2", language="English"):
         return "Error: Ollama not available. Please install Ollama first."
     
     try:
-        prompt = get_shopify_prompt(keyword, language)
+        # Ollama sunucusu eşleşen önek için KV önbelleğini yeniden kullanır; sabit
+        # sistem istemi yalnızca ilk istekte işlenir, sonrakilerde kısa ürün mesajı
+        result = OllamaClient().chat(model, [
+            {'role': 'system', 'content': get_shopify_system_prompt(language)},
+            {'role': 'user', 'content': get_shopify_user_prompt(keyword, language)}
+        ], keep_alive=os.getenv('OLLAMA_KEEP_ALIVE', DEFAULT_KEEP_ALIVE), timeout=120)
         
-        # Ollama ile yanıt oluştur
-        cmd = ['ollama', 'run', model, prompt]
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
+        st.session_state['generation_stats'] = {
+            'prompt_tokens': result.get('prompt_eval_count', 0),
+            'prefill_ms': round(result['prompt_eval_seconds'] * 1000),
+            'total_ms': round(result['total_seconds'] * 1000)
+        }
+        content = result.get('message', {}).get('content', '').strip()
+        return content if content else "Error: Model yanıt veremedi"
         
-        if result.returncode == 0 and result.stdout.strip():
-            return result.stdout.strip()
-        else:
-            return f"Error: {result.stderr if result.stderr else 'Model yanıt veremedi'}"
-        
-    except subprocess.TimeoutExpired:
-        return "Error: Timeout - işlem çok uzun sürdü"
+    except OllamaError as e:
+        return f"Error: {str(e)}"
     except Exception as e:
         return f"Error generating with Ollama: {str(e)}"
 
@@ -587,9 +616,20 @@ def main():
                     st.markdown(f'<div class="stats-box"><strong>🔤 Karakter Sayısı:</strong><br>{char_count} karakter</div>', unsafe_allow_html=True)
                 
                 with col_stats3:
-                    keyword_frequency = description.lower().count(keyword_used.lower())
+                    keyword_frequency = count_keyword(description, keyword_used)
                     st.markdown(f'<div class="stats-box"><strong>🎯 Anahtar Kelime Sıklığı:</strong><br>{keyword_frequency} kez</div>', unsafe_allow_html=True)
                 
+                # İstem işleme ölçümü (sabit önek önbellekten geldiğinde düşer)
+                stats = st.session_state.get('generation_stats')
+                if stats:
+                    details = [f"{stats['prompt_tokens']} istem tokenı"]
+                    if 'prefill_ms' in stats:
+                        details.append(f"istem işleme {stats['prefill_ms']} ms")
+                    if stats.get('cached_tokens'):
+                        details.append(f"{stats['cached_tokens']} token önbellekten")
+                    details.append(f"toplam {stats['total_ms']} ms")
+                    st.caption("⚡ " + ", ".join(details))
+                
                 # Copy and download section
                 st.markdown("---")
                 st.subheader("💾 İndirme ve Kopyalama")
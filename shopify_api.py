@@ -4,7 +4,13 @@ import subprocess
 from datetime import datetime
 from flask import Flask, request, jsonify, render_template_string
 
+from ollama_client import OllamaClient, OllamaError
+from model_warmup import warmer_from_env, warmup_models
+from model_residency import residency_from_env, canonical_name
+from model_scheduler import scheduler_from_env, SchedulerTimeout
+
 app = Flask(__name__)
+ollama_client = OllamaClient()
 
 # Model configuration
 def get_available_models():
@@ -27,7 +33,13 @@ def get_available_models():
 AVAILABLE_MODELS = get_available_models()
 DEFAULT_MODEL = "shopify-gpt" if "shopify-gpt" in AVAILABLE_MODELS else (AVAILABLE_MODELS[0] if AVAILABLE_MODELS else "llama2")
 
-def generate_with_ollama(prompt, model_name, language="English"):
+# Bellek bütçesine göre sabitlenen/boşaltılan modeller ve başlangıçta ısıtılanlar
+model_residency = residency_from_env(preferred=warmup_models(DEFAULT_MODEL))
+model_warmer = warmer_from_env(DEFAULT_MODEL, residency=model_residency)
+# Model başına kuyruklar; bellekteki model adil sınır içinde öncelikli
+model_scheduler = scheduler_from_env(is_loaded=lambda model: model_residency.is_loaded(canonical_name(model)))
+
+def generate_with_ollama(prompt, model_name, language="English", keep_alive=None, stats=None):
     """Ollama ile içerik oluştur"""
     try:
         # Dil spesifik prompt hazırla
@@ -40,20 +52,27 @@ def generate_with_ollama(prompt, model_name, language="English"):
             You create engaging, SEO-optimized, conversion-focused product descriptions in English."""
             full_prompt = f"Create a comprehensive Shopify product description for: {prompt}"
         
-        # Tam prompt
-        complete_prompt = f"{system_prompt}\n\n{full_prompt}"
-        
-        # Ollama ile yanıt oluştur
-        cmd = ['ollama', 'run', model_name, complete_prompt]
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
+        # Ollama HTTP API ile yanıt oluştur; keep_alive sabitlenmiş modelin
+        # bellekte kalma süresini varsayılan 5 dakikaya düşürmesin diye gönderilir
+        if keep_alive is None:
+            keep_alive = model_residency.keep_alive_for(model_name)
+        # Sistem istemi her istekte aynı önek olarak gider, ürün bilgisi sonda kalır;
+        # Ollama eşleşen önek için KV önbelleğini yeniden kullanır. Dile özgü talimat
+        # shopify-gpt modellerine de gönderilir (Modelfile SYSTEM'ı dil seçmez)
+        result = ollama_client.generate(model_name, full_prompt, system=system_prompt, keep_alive=keep_alive, timeout=120)
+        if stats is not None:
+            stats.update({
+                'prompt_tokens': result.get('prompt_eval_count', 0),
+                'prefill_ms': round(result['prompt_eval_seconds'] * 1000, 1)
+            })
         
-        if result.returncode == 0 and result.stdout.strip():
-            return result.stdout.strip()
+        if result.get('response', '').strip():
+            return result['response'].strip()
         else:
-            return f"Error: {result.stderr}"
+            return "Error: Boş yanıt"
         
-    except subprocess.TimeoutExpired:
-        return "Error: Timeout - işlem çok uzun sürdü"
+    except OllamaError as e:
+        return f"Error: {str(e)}"
     except Exception as e:
         return f"Error: {str(e)}"
 
@@ -243,6 +262,8 @@ HTML_TEMPLATE = """
                 const statusElement = document.getElementById('model-status');
                 if (data.status === 'healthy') {
                     statusElement.innerHTML = '<span style="color: #27ae60;">✅ Aktif</span>';
+                } else if (data.status === 'warming') {
+                    statusElement.innerHTML = '<span style="color: #f39c12;">🔥 Model yükleniyor...</span>';
                 } else {
                     statusElement.innerHTML = '<span style="color: #e74c3c;">❌ Erişilemez</span>';
                 }
@@ -325,48 +346,58 @@ def generate_description():
         if model_name not in AVAILABLE_MODELS:
             model_name = DEFAULT_MODEL
         
-        # Ollama ile yanıt oluştur
-        result = generate_with_ollama(prompt, model_name, language)
+        # Sıra gelince Ollama ile yanıt oluştur (yerleşim yöneticisi gerekirse soğuk modelleri boşaltır)
+        with model_scheduler.slot(model_name) as ticket:
+            keep_alive = model_residency.acquire(model_name)
+            stats = {}
+            result = None
+            try:
+                result = generate_with_ollama(prompt, model_name, language, keep_alive, stats)
+            finally:
+                success = bool(result) and not result.startswith("Error")
+                model_residency.release(model_name, success)
         
-        if result and not result.startswith("Error"):
+        if success:
             return jsonify({
                 'success': True,
                 'description': result,
                 'model': model_name,
                 'language': language,
+                'queue_wait_ms': ticket.queue_wait_ms,
+                **stats,
                 'timestamp': datetime.now().isoformat()
             })
         else:
-            return jsonify({'success': False, 'error': result}), 500
+            return jsonify({'success': False, 'error': result, 'queue_wait_ms': ticket.queue_wait_ms}), 500
         
+    except SchedulerTimeout as e:
+        return jsonify({'success': False, 'error': str(e)}), 503
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/health', methods=['GET'])
 def health_check():
-    """Model sağlık kontrolü"""
-    try:
-        # Varsayılan model ile test
-        test_result = generate_with_ollama("Test", DEFAULT_MODEL)
-        if test_result and not test_result.startswith("Error"):
-            return jsonify({
-                'status': 'healthy', 
-                'model': DEFAULT_MODEL,
-                'available_models': AVAILABLE_MODELS,
-                'timestamp': datetime.now().isoformat()
-            })
-        else:
-            return jsonify({
-                'status': 'unhealthy',
-                'error': 'Model test failed',
-                'timestamp': datetime.now().isoformat()
-            }), 500
-    except Exception as e:
+    """Sağlık kontrolü: Ollama erişimi ve model ısıtma durumu (üretim yapmaz)"""
+    warmup = model_warmer.status()
+    if not ollama_client.is_available():
         return jsonify({
-            'status': 'unhealthy', 
-            'error': str(e),
+            'status': 'unhealthy',
+            'error': 'Ollama sunucusuna ulaşılamıyor',
+            'warmup': warmup,
             'timestamp': datetime.now().isoformat()
-        }), 500
+        }), 503
+
+    ready = model_warmer.is_ready(DEFAULT_MODEL)
+    return jsonify({
+        'status': 'healthy' if ready else 'warming',
+        'ready': ready,
+        'model': DEFAULT_MODEL,
+        'available_models': AVAILABLE_MODELS,
+        'warmup': warmup,
+        'residency': model_residency.status(),
+        'scheduler': model_scheduler.status(),
+        'timestamp': datetime.now().isoformat()
+    }), 200 if ready else 503
 
 @app.route('/info', methods=['GET'])
 def api_info():
@@ -430,4 +461,10 @@ if __name__ == '__main__':
         print("⚠️ Hiçbir Ollama modeli bulunamadı!")
         print("💡 Model indirmek için: ollama pull llama2")
     
-    app.run(host='0.0.0.0', port=5001, debug=True)
+    # Yeniden yükleyici (debug) iki süreç başlatır; ısıtma yalnızca istekleri işleyen süreçte
+    debug = os.getenv('FLASK_DEBUG', '1') == '1'
+    if not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        print(f"🔥 Modeller ısıtılıyor: {', '.join(model_warmer.models)} (keep_alive={model_warmer.keep_alive})")
+        model_warmer.start()
+    
+    app.run(host='0.0.0.0', port=5001, debug=debug)
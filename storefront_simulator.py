@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Yerel Shopify mağaza simülatörü
+Gerçek mağazalara istek atmadan tarayıcı (crawler) performansını ölçmek için
+ana sayfa, koleksiyonlar, farklı tema düzenlerinde ürün sayfaları,
+products.json ve sitemap sunar. Gecikme, 429 ve 5xx hataları eklenebilir.
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+CATEGORIES = ["Electronics", "Fashion", "Beauty", "Home Decor", "Fitness", "Jewelry", "Kitchen", "Toys"]
+ADJECTIVES = ["Premium", "Wireless", "Organic", "Handmade", "Eco-Friendly", "Compact", "Luxury", "Classic"]
+NOUNS = ["Headphones", "Serum", "Yoga Mat", "Backpack", "Candle", "Watch", "Sneakers", "Blender", "Necklace", "Lamp"]
+SENTENCES = [
+    "Crafted from carefully selected materials for everyday durability.",
+    "Designed to fit seamlessly into your daily routine.",
+    "Enjoy reliable performance backed by our satisfaction guarantee.",
+    "Lightweight and easy to carry wherever you go.",
+    "Thoughtful details make this a perfect gift for someone special.",
+    "Tested by our team to meet the highest quality standards.",
+    "A modern take on a timeless favourite.",
+    "Elevate your space with a piece that feels as good as it looks.",
+]
+
+# Ürün sayfası tema düzenleri; her biri toplayıcının farklı bir seçicisine denk gelir
+THEMES = {
+    "dawn": """<html><head><title>{title}</title></head><body>
+<nav class="breadcrumb"><a href="/">Home</a><a href="/collections/{collection}">{category}</a></nav>
+<main><h1 class="product__title">{title}</h1>
+<div class="price"><span class="money">${price}</span></div>
+<div class="product__description rte">{description}</div>
+<ul class="product-features">{features}</ul></main></body></html>""",
+    "debut": """<html><head><title>{title}</title></head><body>
+<nav><a href="/">Home</a><a href="/collections/{collection}">{category}</a></nav>
+<h1 class="product-single__title">{title}</h1>
+<span class="product-price">${price}</span>
+<div class="product-single__description">{description}</div>
+<div class="product-details"><ul>{features}</ul></div></body></html>""",
+    "minimal": """<html><head><title>{title}</title></head><body>
+<div class="breadcrumb"><a href="/collections/{collection}">{category}</a></div>
+<h1>{title}</h1>
+<p class="product-price">${price}</p>
+<section class="product-description">{description}</section>
+<ul>{features}</ul></body></html>""",
+}
+
+
+class StorefrontSimulator:
+    """Sahte Shopify mağazası; arka planda bir HTTP sunucusu olarak çalışır"""
+
+    def __init__(self, host="127.0.0.1", port=0, product_count=200, seed=42,
+                 latency_ms=0, jitter_ms=0, rate_limit_ratio=0.0, error_ratio=0.0,
+                 description_sentences=(3, 8), themes=None):
+        self.host = host
+        self.port = port
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.rate_limit_ratio = rate_limit_ratio
+        self.error_ratio = error_ratio
+        self.themes = themes or list(THEMES)
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+        self.products = self._generate_products(product_count, seed, description_sentences)
+        self.by_handle = {product['handle']: product for product in self.products}
+        self.stats = {'requests': 0, 'rate_limited': 0, 'errors': 0, 'bytes_sent': 0}
+        self._server = None
+        self._thread = None
+
+    def _generate_products(self, count, seed, description_sentences):
+        rng = random.Random(seed)
+        products = []
+        for i in range(count):
+            category = CATEGORIES[i % len(CATEGORIES)]
+            title = f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {i + 1}"
+            sentences = rng.sample(SENTENCES, min(rng.randint(*description_sentences), len(SENTENCES)))
+            products.append({
+                'id': 1000 + i,
+                'handle': f"product-{i + 1}",
+                'title': title,
+                'product_type': category,
+                'collection': category.lower().replace(' ', '-'),
+                'body_html': "".join(f"<p>{sentence}</p>" for sentence in sentences),
+                'price': f"{rng.uniform(5, 300):.2f}",
+                'tags': rng.sample(["bestseller", "new", "gift", "sale", "eco", "limited"], 3),
+                'theme': self.themes[i % len(self.themes)]
+            })
+        return products
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}"
+
+    def collections(self):
+        return sorted({product['collection'] for product in self.products})
+
+    def _chance(self, ratio):
+        if ratio <= 0:
+            return False
+        with self._random_lock:
+            return self._random.random() < ratio
+
+    def _delay(self):
+        if self.latency_ms or self.jitter_ms:
+            with self._random_lock:
+                delay = self.latency_ms + self._random.uniform(0, self.jitter_ms)
+            time.sleep(delay / 1000.0)
+
+    def render(self, path, query):
+        """(durum kodu, içerik tipi, gövde) döndür"""
+        if path in ("", "/"):
+            links = "".join(f'<a href="/collections/{c}">{c}</a>' for c in self.collections())
+            featured = "".join(
+                f'<div class="product-card"><a href="/products/{p["handle"]}">{p["title"]}</a></div>'
+                for p in self.products[:12]
+            )
+            return 200, "text/html", f"<html><body><nav>{links}</nav><main>{featured}</main></body></html>"
+
+        if path.startswith("/collections/"):
+            handle = path.split("/")[2]
+            items = [p for p in self.products if p['collection'] == handle]
+            if not items:
+                return 404, "text/html", "<h1>Not found</h1>"
+            css_class = ["product-item", "product-card", "grid-product"][len(handle) % 3]
+            links = "".join(f'<div class="{css_class}"><a href="/products/{p["handle"]}">{p["title"]}</a></div>' for p in items)
+            return 200, "text/html", f"<html><body><h1>{handle}</h1>{links}</body></html>"
+
+        if path == "/products.json":
+            limit = min(int(query.get('limit', ['30'])[0]), 250)
+            page = max(int(query.get('page', ['1'])[0]), 1)
+            items = self.products[(page - 1) * limit:page * limit]
+            payload = {'products': [{
+                'id': p['id'],
+                'title': p['title'],
+                'handle': p['handle'],
+                'body_html': p['body_html'],
+                'product_type': p['product_type'],
+                'tags': p['tags'],
+                'variants': [{'price': p['price']}]
+            } for p in items]}
+            return 200, "application/json", json.dumps(payload)
+
+        if path.startswith("/products/"):
+            product = self.by_handle.get(path.split("/")[2])
+            if not product:
+                return 404, "text/html", "<h1>Not found</h1>"
+            features = "".join(f"<li>{tag.title()}</li>" for tag in product['tags'])
+            body = THEMES[product['theme']].format(
+                title=product['title'], price=product['price'], description=product['body_html'],
+                features=features, category=product['product_type'], collection=product['collection']
+            )
+            return 200, "text/html", body
+
+        if path == "/sitemap.xml":
+            body = ('<?xml version="1.0" encoding="UTF-8"?><sitemapindex>'
+                    f'<sitemap><loc>{self.base_url}/sitemap_products_1.xml?from=1&amp;to={len(self.products)}</loc>'
+                    '</sitemap></sitemapindex>')
+            return 200, "application/xml", body
+
+        if path == "/sitemap_products_1.xml":
+            urls = "".join(f"<url><loc>{self.base_url}/products/{p['handle']}</loc></url>" for p in self.products)
+            return 200, "application/xml", f'<?xml version="1.0" encoding="UTF-8"?><urlset>{urls}</urlset>'
+
+        return 404, "text/html", "<h1>Not found</h1>"
+
+    def _make_handler(self):
+        simulator = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                simulator.stats['requests'] += 1
+                simulator._delay()
+                parsed = urlparse(self.path)
+
+                if simulator._chance(simulator.rate_limit_ratio):
+                    simulator.stats['rate_limited'] += 1
+                    self._send(429, "text/plain", "Too Many Requests", {'Retry-After': '0.1'})
+                    return
+                if simulator._chance(simulator.error_ratio):
+                    simulator.stats['errors'] += 1
+                    self._send(500, "text/plain", "Internal Server Error")
+                    return
+
+                status, content_type, body = simulator.render(parsed.path, parse_qs(parsed.query))
+                self._send(status, content_type, body)
+
+            def _send(self, status, content_type, body, headers=None):
+                data = body.encode('utf-8')
+                simulator.stats['bytes_sent'] += len(data)
+                self.send_response(status)
+                self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        """Sunucuyu arka plan iş parçacığında başlat"""
+        self._server = ThreadingHTTPServer((self.host, self.port), self._make_handler())
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="Yerel Shopify mağaza simülatörü")
+    parser.add_argument('--host', default="127.0.0.1")
+    parser.add_argument('--port', type=int, default=8800)
+    parser.add_argument('--products', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--jitter-ms', type=float, default=0)
+    parser.add_argument('--rate-limit-ratio', type=float, default=0.0, help="429 döndürülecek isteklerin oranı")
+    parser.add_argument('--error-ratio', type=float, default=0.0, help="500 döndürülecek isteklerin oranı")
+    return parser
+
+
+def main():
+    args = build_arg_parser().parse_args()
+    simulator = StorefrontSimulator(
+        host=args.host, port=args.port, product_count=args.products, seed=args.seed,
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+        rate_limit_ratio=args.rate_limit_ratio, error_ratio=args.error_ratio
+    ).start()
+
+    print(f"🛍️ Simülatör çalışıyor: {simulator.base_url} ({len(simulator.products)} ürün)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print(f"\n📊 İstatistikler: {simulator.stats}")
+        simulator.stop()
+
+
+if __name__ == "__main__":
+    main()
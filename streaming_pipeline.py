@@ -0,0 +1,313 @@
+"""
+Uçtan uca akış hattı: toplayıcıdan eğitim verisine
+Toplanan ürünler dosya yazımı beklenmeden sınırlı kuyruklarla bağlı
+iş parçacıklarından geçer:
+
+  kaynak  → ham kayıt günlüğüne ekle (shopify_training_data/stream_products.jsonl)
+  istem   → temizleme + eğitim örneklerini oluşturma (token bütçesi dahil)
+  havuz   → yakın kopya filtresi + veri setine ekleme (indeksli JSONL)
+
+Kontrol noktası, veri setine yazılmış son ham kaydın bayt konumunu ve veri
+setinin o anki boyutunu tutar. Yeniden başlatıldığında veri seti bu boyuta
+geri kırpılır ve ham günlük kontrol noktasından itibaren yeniden oynatılır;
+böylece hiçbir kayıt kaybolmaz veya iki kez yazılmaz. Kuyruklar sınırlı
+olduğundan bellek kullanımı tarama süresinden bağımsızdır.
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+from data_preprocessor import DataPreprocessor, example_id
+from jsonl_index import JsonlIndex
+from near_duplicate import NearDuplicateRemover
+
+DEFAULT_RAW_LOG = "shopify_training_data/stream_products.jsonl"
+DEFAULT_DATASET_FILE = "model_training_data/shopify_stream_dataset.jsonl"
+DEFAULT_CHECKPOINT = "model_training_data/stream_checkpoint.json"
+
+# Kuyruk sonu işareti
+_END = object()
+
+
+class StreamingPipeline:
+    """Toplayıcı → istem oluşturma → kopya filtresi → veri seti akışı"""
+
+    def __init__(self, preprocessor=None, raw_log=DEFAULT_RAW_LOG, dataset_file=DEFAULT_DATASET_FILE,
+                 checkpoint_path=DEFAULT_CHECKPOINT, queue_size=64, dedup_threshold=0.8,
+                 checkpoint_every=50, checkpoint_interval=10.0):
+        self.preprocessor = preprocessor or DataPreprocessor()
+        self.raw_log = raw_log
+        self.dataset_file = dataset_file
+        self.checkpoint_path = checkpoint_path
+        self.queue_size = queue_size
+        self.checkpoint_every = checkpoint_every
+        self.checkpoint_interval = checkpoint_interval
+
+        # Akışta örnekler tek tek geldiği için küçük toplu işlem boyutu
+        self.remover = NearDuplicateRemover(threshold=dedup_threshold, batch_size=16)
+        self.index = None
+        self.checkpoint = {'raw_offset': 0, 'dataset_bytes': 0, 'raw_records': 0, 'examples': 0}
+
+        self.stop_event = threading.Event()
+        self.errors = []
+        self.stats = {'records': 0, 'examples': 0, 'duplicates': 0, 'started_at': None}
+
+    # Kontrol noktası
+
+    def load_checkpoint(self):
+        if os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path, 'r', encoding='utf-8') as f:
+                self.checkpoint.update(json.load(f))
+        return self.checkpoint
+
+    def save_checkpoint(self, raw_offset):
+        self.checkpoint.update({
+            'raw_offset': raw_offset,
+            'dataset_bytes': self.index.indexed_bytes,
+            'examples': len(self.index),
+            'updated_at': datetime.now().isoformat()
+        })
+        temp_path = self.checkpoint_path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.checkpoint, f, indent=2)
+        os.replace(temp_path, self.checkpoint_path)
+
+    @staticmethod
+    def _truncate_to_last_line(path):
+        """Yarım kalmış son satırı at (yazım sırasında kesilmişse)"""
+        with open(path, 'rb+') as f:
+            size = f.seek(0, os.SEEK_END)
+            position = size
+            while position > 0:
+                step = min(1 << 16, position)
+                f.seek(position - step)
+                block = f.read(step)
+                newline = block.rfind(b'\n')
+                if newline != -1:
+                    position = position - step + newline + 1
+                    break
+                position -= step
+            if position != size:
+                f.truncate(position)
+
+    def recover(self, collector=None):
+        """Kontrol noktasına dön: veri setini kırp, kopya indeksini ve toplayıcıyı tohumla"""
+        os.makedirs(os.path.dirname(self.raw_log) or ".", exist_ok=True)
+        os.makedirs(os.path.dirname(self.dataset_file) or ".", exist_ok=True)
+        self.load_checkpoint()
+
+        if os.path.exists(self.raw_log):
+            self._truncate_to_last_line(self.raw_log)
+        else:
+            open(self.raw_log, 'a').close()
+
+        if not os.path.exists(self.dataset_file):
+            # Veri seti yoksa ham günlüğün tamamı yeniden işlenir
+            self.checkpoint.update({'raw_offset': 0, 'dataset_bytes': 0})
+            open(self.dataset_file, 'a').close()
+        elif os.path.getsize(self.dataset_file) > self.checkpoint['dataset_bytes']:
+            # Kontrol noktasından sonra yazılanlar ham günlükten yeniden üretilecek
+            with open(self.dataset_file, 'rb+') as f:
+                f.truncate(self.checkpoint['dataset_bytes'])
+
+        self.index = JsonlIndex(self.dataset_file)
+        self.index.refresh()
+
+        # Kopya indeksini mevcut örneklerle doldur
+        for _ in self.remover.filter(self.preprocessor.iter_file_records(self.dataset_file)):
+            pass
+
+        # Toplayıcı daha önce çekilmiş ürünleri tekrar çekmesin (günlük tek geçişte akış hâlinde okunur)
+        if collector is not None and collector.quality_filter is not None:
+            collector.quality_filter.seed(self._iter_seen_records(collector))
+
+        print(f"🔄 Kontrol noktası: ham konum {self.checkpoint['raw_offset']}, "
+              f"veri setinde {len(self.index)} örnek")
+
+    def _iter_seen_records(self, collector):
+        """Ham günlük kayıtları; geçerken URL'ler toplayıcının görülenlerine eklenir"""
+        for record in self.preprocessor.iter_file_records(self.raw_log):
+            if record.get('url'):
+                collector.scraped_urls.add(record['url'])
+            yield record
+
+    def iter_replay(self):
+        """Ham günlükte kontrol noktasından sonra kalan kayıtlar: (bitiş konumu, kayıt)"""
+        with open(self.raw_log, 'rb') as f:
+            f.seek(self.checkpoint['raw_offset'])
+            position = self.checkpoint['raw_offset']
+            for line in f:
+                position += len(line)
+                if line.strip():
+                    yield position, json.loads(line)
+
+    # Aşamalar
+
+    def _put(self, target, item):
+        """Kuyruk doluysa bekle; durdurulursa bırak"""
+        while True:
+            try:
+                target.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                if self.stop_event.is_set():
+                    return False
+
+    def _get(self, source):
+        """Durdurulduğunda kuyruk boşalınca akış sonu say"""
+        while True:
+            try:
+                return source.get(timeout=0.5)
+            except queue.Empty:
+                if self.stop_event.is_set():
+                    return _END
+
+    def _stage(self, name, function, *args):
+        def runner():
+            try:
+                function(*args)
+            except Exception as e:
+                print(f"❌ Akış aşaması hatası ({name}): {e}")
+                self.errors.append((name, e))
+                self.stop_event.set()
+        return threading.Thread(target=runner, name=f"stream-{name}", daemon=True)
+
+    def _source(self, products, output):
+        try:
+            for item in self.iter_replay():
+                if self.stop_event.is_set() or not self._put(output, item):
+                    return
+
+            with open(self.raw_log, 'ab') as log:
+                position = log.seek(0, os.SEEK_END)
+                for product in products:
+                    line = (json.dumps(product, ensure_ascii=False) + '\n').encode('utf-8')
+                    log.write(line)
+                    log.flush()
+                    position += len(line)
+                    self.checkpoint['raw_records'] += 1
+                    if not self._put(output, (position, product)) or self.stop_event.is_set():
+                        return
+        finally:
+            self._put(output, _END)
+
+    def _prompts(self, source, output):
+        try:
+            while True:
+                # Durdurulunca yeni kayıt işlenmez; yazılanlar hep ham günlüğün bir öneki olur
+                item = self._get(source)
+                if item is _END or self.stop_event.is_set():
+                    return
+                position, record = item
+                examples = self.preprocessor.create_training_prompts(record)
+                for example in examples:
+                    example['id'] = example_id(example)
+                self.stats['records'] += 1
+                if not self._put(output, (position, examples)):
+                    return
+        finally:
+            self._put(output, _END)
+
+    def _sink(self, source):
+        last_position = self.checkpoint['raw_offset']
+        pending = 0
+        last_checkpoint = time.monotonic()
+
+        while True:
+            item = self._get(source)
+            if item is _END:
+                break
+
+            # Kuyrukta bekleyenleri de alıp tek seferde yaz
+            batch = [item]
+            while len(batch) < 32:
+                try:
+                    item = source.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _END:
+                    source.put(_END)
+                    break
+                batch.append(item)
+
+            examples = [example for _, group in batch for example in group]
+            kept = list(self.remover.filter(examples))
+            self.index.append(kept)
+
+            self.stats['examples'] += len(kept)
+            self.stats['duplicates'] += len(examples) - len(kept)
+            last_position = batch[-1][0]
+            pending += len(batch)
+
+            if pending >= self.checkpoint_every or time.monotonic() - last_checkpoint >= self.checkpoint_interval:
+                self.save_checkpoint(last_position)
+                self.print_progress()
+                pending = 0
+                last_checkpoint = time.monotonic()
+
+        self.save_checkpoint(last_position)
+
+    # Çalıştırma
+
+    def run(self, products, collector=None):
+        """Ürün akışını (ör. collector.iter_products) eğitim verisine dönüştür"""
+        self.recover(collector)
+        self.stats['started_at'] = time.monotonic()
+
+        raw_queue = queue.Queue(maxsize=self.queue_size)
+        example_queue = queue.Queue(maxsize=self.queue_size)
+        threads = [
+            self._stage("source", self._source, products, raw_queue),
+            self._stage("prompts", self._prompts, raw_queue, example_queue),
+            self._stage("sink", self._sink, example_queue)
+        ]
+        for thread in threads:
+            thread.start()
+
+        try:
+            while any(thread.is_alive() for thread in threads):
+                for thread in threads:
+                    thread.join(timeout=0.5)
+        except KeyboardInterrupt:
+            print("\n⚠️ Akış durduruluyor, kuyruktakiler yazılıyor...")
+            self.stop_event.set()
+            for thread in threads:
+                thread.join()
+
+        self.index.close()
+        self.print_progress()
+        if self.errors:
+            raise RuntimeError(f"Akış hattı hatası: {self.errors[0][0]}: {self.errors[0][1]}")
+        return self.stats
+
+    def print_progress(self):
+        elapsed = time.monotonic() - (self.stats['started_at'] or time.monotonic())
+        rate = self.stats['records'] / elapsed if elapsed > 0 else 0
+        print(f"🌊 Akış: {self.stats['records']} kayıt ({rate:.1f}/sn), {self.stats['examples']} örnek yazıldı, "
+              f"{self.stats['duplicates']} kopya atlandı → {self.dataset_file}")
+
+
+def main():
+    """Toplayıcıyı akış hattına bağla"""
+    from data_collector import ShopifyDataCollector, DEFAULT_KEYWORDS
+
+    collector = ShopifyDataCollector(mode=os.getenv('COLLECTOR_MODE', 'selenium'))
+    collector.selected_ai_model = collector.select_ai_model()
+    pipeline = StreamingPipeline(
+        queue_size=int(os.getenv('STREAM_QUEUE_SIZE', '64')),
+        dedup_threshold=float(os.getenv('DEDUP_THRESHOLD', '0.8'))
+    )
+
+    try:
+        stats = pipeline.run(collector.iter_products(DEFAULT_KEYWORDS, max_products_per_keyword=30), collector)
+        print(f"✅ Akış tamamlandı: {stats['examples']} eğitim örneği")
+    finally:
+        collector.close()
+
+
+if __name__ == "__main__":
+    main()
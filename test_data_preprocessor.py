@@ -0,0 +1,30 @@
+import io
+import json
+
+import pytest
+
+from data_preprocessor import iter_json_array
+
+
+SAMPLES = [
+    [1.5e10, 2],
+    [0, -1, 3.25, -4.5E-3, 12345678901234567890, 1e5],
+    ["a,b", "]", {"x": [1, 2.0, {"y": None}]}, True, False, None],
+    [{"title": "Çanta", "price": "19.90", "tags": ["deri", "el yapımı"]}, 7.0],
+    [],
+]
+
+
+@pytest.mark.parametrize("sample", SAMPLES)
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 4, 5, 7, 11, 64])
+@pytest.mark.parametrize("indent", [None, 2])
+def test_iter_json_array_chunk_boundaries(sample, chunk_size, indent):
+    """Parça sınırı nereye düşerse düşsün tüm elemanlar aynen okunmalı"""
+    text = json.dumps(sample, ensure_ascii=False, indent=indent)
+    assert list(iter_json_array(io.StringIO(text), chunk_size=chunk_size)) == sample
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 64])
+def test_iter_json_array_rejects_malformed_number(chunk_size):
+    with pytest.raises(ValueError):
+        list(iter_json_array(io.StringIO("[1.5x, 2]"), chunk_size=chunk_size))
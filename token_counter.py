@@ -0,0 +1,250 @@
+"""
+Token sayımı ve bağlam bütçesi
+Eğitim örneklerinin uzunluğunu karakter yerine yerel bir tokenizer ile
+ölçer. Tokenizer değiştirilebilir:
+  approx            - kelime/noktalama parçaları, parça başına ~4 karakter (bağımlılıksız)
+  byte              - UTF-8 bayt sayısı (her tokenizer için üst sınır)
+  tiktoken[:isim]   - tiktoken kodlaması (varsayılan cl100k_base)
+  hf:<tokenizer.json> - HuggingFace tokenizers dosyası (ör. llama3.1 tokenizer.json)
+Bağlam bütçesini aşan örnekler kırpılır veya atılır. approx dışındaki
+tokenizer'lar token kimlikleri de üretir (encode), paketleme bunlarla yapılır.
+"""
+
+import json
+import math
+import os
+import re
+from collections import Counter
+
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
+try:
+    from tokenizers import Tokenizer as HFTokenizerModel
+    HF_TOKENIZERS_AVAILABLE = True
+except ImportError:
+    HF_TOKENIZERS_AVAILABLE = False
+
+DEFAULT_NUM_CTX = 4096
+DEFAULT_MODELFILE = "Modelfile_shopify"
+# modelfile_autotune.py çıktısı ve model_trainer.py derleme kaydı
+DEFAULT_TUNING_PATH = "model_tuning.json"
+DEFAULT_BUILD_CACHE = "model_builds.json"
+DEFAULT_MODEL_NAME = "shopify-gpt"
+# Sohbet şablonu etiketleri (<|im_start|>system ... <|im_start|>assistant) için pay
+TEMPLATE_OVERHEAD_TOKENS = 16
+APPROX_PIECE_PATTERN = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+APPROX_CHARS_PER_TOKEN = 4
+NUM_CTX_PATTERN = re.compile(r"^\s*PARAMETER\s+num_ctx\s+(\d+)", re.MULTILINE | re.IGNORECASE)
+# tokenizer.json içinde aranan metin sonu (EOS) tokenları
+HF_EOS_TOKENS = ("<|eot_id|>", "<|end_of_text|>", "<|endoftext|>", "<|im_end|>", "</s>", "<eos>")
+
+
+class ApproxTokenizer:
+    """Bağımlılıksız tahmin: her kelime parçası en az 1, uzunsa ~4 karakterde 1 token"""
+
+    name = "approx"
+
+    @staticmethod
+    def _piece_tokens(match):
+        return max(1, math.ceil((match.end() - match.start()) / APPROX_CHARS_PER_TOKEN))
+
+    def count(self, text):
+        return sum(self._piece_tokens(match) for match in APPROX_PIECE_PATTERN.finditer(text or ''))
+
+    def truncate(self, text, max_tokens):
+        total = 0
+        for match in APPROX_PIECE_PATTERN.finditer(text or ''):
+            tokens = self._piece_tokens(match)
+            if total + tokens > max_tokens:
+                # Uzun parça kalan token kadar karakterden bölünür
+                return text[:match.start() + (max_tokens - total) * APPROX_CHARS_PER_TOKEN]
+            total += tokens
+        return text
+
+
+class ByteTokenizer:
+    """UTF-8 bayt sayısı; gerçek token sayısının kesin üst sınırı"""
+
+    name = "byte"
+    vocab_size = 258
+    eos_id = 256
+    pad_id = 257
+
+    def encode(self, text):
+        return list((text or '').encode('utf-8'))
+
+    def count(self, text):
+        return len((text or '').encode('utf-8'))
+
+    def truncate(self, text, max_tokens):
+        return (text or '').encode('utf-8')[:max_tokens].decode('utf-8', errors='ignore')
+
+
+class TiktokenTokenizer:
+    def __init__(self, encoding_name="cl100k_base"):
+        if not TIKTOKEN_AVAILABLE:
+            raise RuntimeError("tiktoken tokenizer için: pip install tiktoken")
+        self.encoding = tiktoken.get_encoding(encoding_name)
+        self.name = f"tiktoken:{encoding_name}"
+        self.vocab_size = self.encoding.n_vocab
+        self.eos_id = self.encoding.eot_token
+        self.pad_id = self.eos_id
+
+    def encode(self, text):
+        return self.encoding.encode(text or '', disallowed_special=())
+
+    def count(self, text):
+        return len(self.encoding.encode(text or '', disallowed_special=()))
+
+    def truncate(self, text, max_tokens):
+        tokens = self.encoding.encode(text or '', disallowed_special=())
+        return text if len(tokens) <= max_tokens else self.encoding.decode(tokens[:max_tokens])
+
+
+class HFTokenizer:
+    def __init__(self, path):
+        if not HF_TOKENIZERS_AVAILABLE:
+            raise RuntimeError("tokenizer.json desteği için: pip install tokenizers")
+        self.tokenizer = HFTokenizerModel.from_file(path)
+        self.name = f"hf:{path}"
+        self.vocab_size = self.tokenizer.get_vocab_size()
+        eos_ids = [self.tokenizer.token_to_id(token) for token in HF_EOS_TOKENS]
+        self.eos_id = next((token_id for token_id in eos_ids if token_id is not None), self.vocab_size - 1)
+        self.pad_id = self.eos_id
+
+    def encode(self, text):
+        return self.tokenizer.encode(text or '', add_special_tokens=False).ids
+
+    def count(self, text):
+        return len(self.tokenizer.encode(text or '', add_special_tokens=False).ids)
+
+    def truncate(self, text, max_tokens):
+        encoding = self.tokenizer.encode(text or '', add_special_tokens=False)
+        if len(encoding.ids) <= max_tokens:
+            return text
+        if max_tokens <= 0:
+            return ''
+        # Karakter konumları sayesinde metin yeniden çözülmeden kesilir
+        return text[:encoding.offsets[max_tokens - 1][1]]
+
+
+def get_tokenizer(spec=None):
+    """'approx', 'byte', 'tiktoken[:isim]' veya 'hf:<yol>' tanımından tokenizer oluştur"""
+    spec = spec or os.getenv('PREPROCESS_TOKENIZER', 'approx')
+    kind, _, argument = spec.partition(':')
+
+    if kind == 'approx':
+        return ApproxTokenizer()
+    if kind == 'byte':
+        return ByteTokenizer()
+    if kind == 'tiktoken':
+        return TiktokenTokenizer(argument or "cl100k_base")
+    if kind == 'hf':
+        return HFTokenizer(argument)
+    raise ValueError(f"Bilinmeyen tokenizer: {spec}")
+
+
+def _load_json(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def read_tuned_num_ctx(model_name=DEFAULT_MODEL_NAME, tuning_path=DEFAULT_TUNING_PATH,
+                       build_cache_path=DEFAULT_BUILD_CACHE):
+    """
+    model_tuning.json'daki ayarlı num_ctx. Ayar yalnızca ölçüldüğü model,
+    temel model ve nicemleme düzeyi son derlemeyle eşleşiyorsa geçerlidir.
+    """
+    tuning = _load_json(tuning_path)
+    num_ctx = tuning.get('parameters', {}).get('num_ctx')
+    if not num_ctx or tuning.get('model') != model_name:
+        return None
+
+    build = _load_json(build_cache_path).get(model_name, {})
+    if (build.get('base_model'), build.get('quantization')) != (tuning.get('base_model'), tuning.get('quantization')):
+        return None
+    return int(num_ctx)
+
+
+def read_num_ctx(modelfile_path=DEFAULT_MODELFILE, default=DEFAULT_NUM_CTX, model_name=DEFAULT_MODEL_NAME):
+    """
+    Bağlam uzunluğu: geçerli ayar varsa model_tuning.json, yoksa Modelfile'daki
+    'PARAMETER num_ctx' değeri
+    """
+    tuned = read_tuned_num_ctx(model_name)
+    if tuned:
+        return tuned
+
+    try:
+        with open(modelfile_path, 'r', encoding='utf-8') as f:
+            match = NUM_CTX_PATTERN.search(f.read())
+        return int(match.group(1)) if match else default
+    except OSError:
+        return default
+
+
+class TokenBudget:
+    """
+    Örnek başına token bütçesi. Toplam = talimat + girdi + çıktı + şablon payı.
+    overflow='truncate': istem bütçeye sığıyorsa çıktı kalan tokena kırpılır
+    overflow='drop': bütçeyi aşan örnek atılır
+    """
+
+    def __init__(self, tokenizer=None, max_tokens=None, overflow='truncate', overhead_tokens=TEMPLATE_OVERHEAD_TOKENS):
+        if overflow not in ('truncate', 'drop'):
+            raise ValueError("overflow 'truncate' veya 'drop' olmalı")
+        self.tokenizer = tokenizer or get_tokenizer()
+        self.max_tokens = max_tokens or read_num_ctx()
+        self.overflow = overflow
+        self.overhead_tokens = overhead_tokens
+        self.counts = Counter()
+
+    def settings(self):
+        return {
+            'tokenizer': self.tokenizer.name,
+            'max_tokens': self.max_tokens,
+            'overflow': self.overflow,
+            'overhead_tokens': self.overhead_tokens
+        }
+
+    def apply(self, example):
+        """Örneğe token sayılarını ekle; bütçeyi aşıyorsa kırp veya None döndür"""
+        prompt_tokens = (
+            self.tokenizer.count(example.get('instruction', '')) +
+            self.tokenizer.count(example.get('input', '')) +
+            self.overhead_tokens
+        )
+        output_tokens = self.tokenizer.count(example.get('output', ''))
+
+        if prompt_tokens + output_tokens > self.max_tokens:
+            remaining = self.max_tokens - prompt_tokens
+            if self.overflow == 'drop' or remaining <= 0:
+                self.counts['dropped'] += 1
+                return None
+            example['output'] = self.tokenizer.truncate(example.get('output', ''), remaining)
+            output_tokens = self.tokenizer.count(example['output'])
+            example['truncated'] = True
+            self.counts['truncated'] += 1
+        else:
+            self.counts['kept'] += 1
+
+        example['input_tokens'] = prompt_tokens
+        example['output_tokens'] = output_tokens
+        example['token_count'] = prompt_tokens + output_tokens
+        self.counts['tokens'] += example['token_count']
+        return example
+
+    def pop_counts(self):
+        """Sayaçları döndür ve sıfırla (işçi süreçlerinden toplamak için)"""
+        counts, self.counts = self.counts, Counter()
+        return counts
+
+    def summary(self):
+        return {**self.settings(), **{key: self.counts.get(key, 0) for key in ('kept', 'truncated', 'dropped', 'tokens')}}